@@ -4,7 +4,10 @@ from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
-from database import get_db_connection
+from database import get_db
+from auth_cache import principal_cache
+from password_hasher import PasswordHasher
+from settings import PASSWORD_HASHER_MAX_WORKERS, PASSWORD_HASHER_MAX_QUEUE
 import os
 
 # JWT 설정
@@ -13,15 +16,18 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# async 핸들러에서는 이벤트 루프를 막지 않도록 password_hasher 를 사용한다
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=PASSWORD_HASHER_MAX_WORKERS,
+    max_queue=PASSWORD_HASHER_MAX_QUEUE,
+)
 security = HTTPBearer(
     scheme_name="JWT",
     description="Enter your JWT token",
     auto_error=True
 )
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -32,32 +38,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db=Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token = credentials.credentials
+    # 이미 검증한 토큰이면 DB 를 거치지 않는다
+    user_dict = principal_cache.get(token)
+    if user_dict is not None:
+        return user_dict
+
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    with get_db_connection() as (conn, cur):
-        cur.execute("SELECT * FROM administrator WHERE name = %s", (username,))
-        user = cur.fetchone()
-        
-        if user is None:
-            raise credentials_exception
-            
-        user_dict = {
-            "id": user[0],
-            "username": user[1],
-            "password": user[2]
-        }
-        
-        return user_dict
\ No newline at end of file
+
+    generation = principal_cache.generation()
+    # 핸들러와 같은 요청 단위 커넥션을 쓴다
+    conn, cur = db
+    cur.execute("SELECT ID, name FROM administrator WHERE name = %s", (username,))
+    user = cur.fetchone()
+
+    if user is None:
+        raise credentials_exception
+
+    user_dict = {
+        "id": user[0],
+        "username": user[1]
+    }
+    principal_cache.put(token, user_dict, payload.get("exp"), generation)
+
+    return user_dict
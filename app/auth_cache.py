@@ -0,0 +1,97 @@
+"""검증된 JWT → 인증 주체(principal) 캐시
+
+보호된 요청마다 administrator 테이블을 조회하지 않도록, 서명 검증과 조회를 마친 토큰의
+principal 을 짧은 TTL 동안 보관한다. 항목은 TTL 과 토큰의 exp 중 먼저 오는 시각에 만료된다.
+
+관리자를 지우거나 이름을 바꾸는 API 는 없으므로 사용자별 무효화는 두지 않는다. DB 에서 직접 관리자를
+지우면 그 관리자의 토큰은 AUTH_CACHE_TTL_SECONDS 가 지날 때까지 통과한다 (즉시 막으려면 invalidate_all).
+"""
+from collections import OrderedDict
+import hmac
+import threading
+import time
+
+from settings import AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_SIZE
+
+
+class PrincipalCache:
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl  # 초, 0 이면 캐시하지 않음
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # 조회 도중 관리자 정보가 바뀐 경우 오래된 principal 을 저장하지 않도록 세대 번호를 둔다
+        self._generation = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _key(token):
+        # JWS 의 마지막 구간(서명)을 키로 쓰고, 적중 시 토큰 전체를 비교한다
+        return token.rsplit('.', 1)[-1]
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not hmac.compare_digest(entry[0], token):
+                entry = None
+            if entry is not None and time.time() >= entry[2]:
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, token, principal, expires_at, generation):
+        """expires_at 은 토큰의 exp (epoch 초), 없으면 None"""
+        if not self.ttl:
+            return
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        key = self._key(token)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (token, principal, deadline)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+principal_cache = PrincipalCache(max_size=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
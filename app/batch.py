@@ -0,0 +1,109 @@
+"""일괄 생성 엔드포인트 공통: 요청 본문(JSON 배열 또는 NDJSON) 읽기와 항목 검증
+
+일괄 생성은 모든 항목을 먼저 검증하고, 하나라도 실패하면 아무것도 쓰지 않고 400 과 함께
+항목별 오류 목록 [{"index": i, "detail": ...}, ...] 을 돌려준다.
+"""
+import codecs
+import json
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+from settings import BATCH_CREATE_MAX_ITEMS, DATABASE_INSERT_CHUNK_SIZE
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _too_many():
+    return HTTPException(status_code=413, detail=f"Too many items (max {BATCH_CREATE_MAX_ITEMS})")
+
+
+async def _read_ndjson(request):
+    """한 줄에 JSON 객체 하나씩. 본문 전체를 bytes 로 모으지 않고 줄 단위로 읽는다"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    items = []
+    buffer = ""
+    line_num = 0
+
+    def parse(line):
+        nonlocal line_num
+        line_num += 1
+        if not line.strip():
+            return
+        if len(items) >= BATCH_CREATE_MAX_ITEMS:
+            raise _too_many()
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Line {line_num}: invalid JSON ({e})")
+
+    try:
+        async for chunk in request.stream():
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                parse(line)
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Request body must be UTF-8")
+    parse(buffer)
+    return items
+
+
+async def batch_items(request: Request):
+    """요청 본문의 항목 목록 (FastAPI 의존성)
+
+    Content-Type 이 application/x-ndjson 이면 NDJSON, 그 외에는 JSON 배열로 읽는다.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type in NDJSON_MEDIA_TYPES:
+        return await _read_ndjson(request)
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON ({e})")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+    if len(items) > BATCH_CREATE_MAX_ITEMS:
+        raise _too_many()
+    return items
+
+
+def validate_items(items, model):
+    """각 항목을 model 로 검증해 (models, errors) 를 돌려준다. 실패한 항목의 자리는 None"""
+    models = []
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            models.append(None)
+            errors.append({"index": index, "detail": "Item must be a JSON object"})
+            continue
+        try:
+            models.append(model(**item))
+        except ValidationError as e:
+            models.append(None)
+            errors.append({
+                "index": index,
+                "detail": "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()
+                ),
+            })
+    return models, errors
+
+
+def raise_for_errors(errors):
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+
+def existing_ids(cur, table, column, values, chunk_size=DATABASE_INSERT_CHUNK_SIZE):
+    """values 중 table.column 에 있는 값의 집합 (IN 목록을 chunk_size 개씩 나눠 조회)"""
+    values = list(dict.fromkeys(values))
+    found = set()
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cur.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})", tuple(chunk))
+        found.update(row[0] for row in cur.fetchall())
+    return found
@@ -0,0 +1,112 @@
+"""혼잡도 저장 형식(CONGESTION_STORAGE)별 쓰기, 삭제, 형식 변환
+
+- rows: congestion 테이블에 (승강장, 시간대) 마다 한 행 (승강장당 39행)
+- profile: congestion_profile 테이블에 승강장마다 한 행, 39개 시간대 값을 histogram.pack_profile 로 묶은 BINARY
+
+읽기는 histogram.load_line_inputs / load_network_inputs 가 같은 설정을 보고 형식을 고른다.
+"""
+import numpy as np
+
+from database import execute_many
+from histogram import BASE_SECONDS, format_seconds, pack_profile, unpack_profiles
+from settings import CONGESTION_STORAGE
+
+STORAGE_ROWS = 'rows'
+STORAGE_PROFILE = 'profile'
+STORAGES = (STORAGE_ROWS, STORAGE_PROFILE)
+
+if CONGESTION_STORAGE not in STORAGES:
+    raise ValueError(f"CONGESTION_STORAGE must be one of {', '.join(STORAGES)}: {CONGESTION_STORAGE}")
+
+# 시:분 기준 시간대 -> profile 안의 위치
+PROFILE_INDEX = {seconds: index for index, seconds in enumerate(BASE_SECONDS.tolist())}
+
+
+def insert_rows(cur, rows):
+    """rows: (station_ID, bound_to, "HH:MM:SS", congest_status)"""
+    execute_many(
+        cur,
+        "INSERT INTO congestion (platform_station_ID, platform_bound_to, time_slot, congest_status) "
+        "VALUES (%s, %s, %s, %s)",
+        rows
+    )
+
+
+def insert_profiles(cur, rows):
+    """rows: (station_ID, bound_to, pack_profile 값)"""
+    execute_many(
+        cur,
+        "INSERT INTO congestion_profile (platform_station_ID, platform_bound_to, profile) VALUES (%s, %s, %s)",
+        rows
+    )
+
+
+def delete_line(cur, line_id):
+    """노선의 혼잡도를 두 형식 모두에서 지운다 (승강장을 지우기 전에 외래 키를 비운다)"""
+    for table in ("congestion", "congestion_profile"):
+        cur.execute(f"""
+            DELETE FROM {table}
+            WHERE platform_station_ID IN (
+                SELECT ID FROM station WHERE line_ID = %s
+            )
+        """, (line_id,))
+
+
+def migrate_line(cur, line_id, storage):
+    """노선의 혼잡도를 다른 형식에서 storage 형식으로 옮겨 쓰고 옮긴 승강장 수를 돌려준다
+
+    30분 격자(BASE_SECONDS)에 없는 시간대 행은 히스토그램과 export 가 모두 무시하므로 profile 로 옮기지 않고,
+    값이 NULL 이거나 없는 시간대는 0 으로 옮긴다. storage 형식의 기존 데이터를 지우고 다시 쓰므로
+    지금 읽고 있는 형식(CONGESTION_STORAGE)으로 옮기면 안 된다. 원래 형식의 데이터는 남겨 둔다.
+    """
+    if storage == STORAGE_PROFILE:
+        cur.execute("""
+            SELECT c.platform_station_ID, c.platform_bound_to, TIME_TO_SEC(c.time_slot), c.congest_status
+            FROM congestion c
+            JOIN station s ON c.platform_station_ID = s.ID
+            WHERE s.line_ID = %s
+        """, (line_id,))
+        profiles = {}
+        for station_id, bound_to, seconds, value in cur.fetchall():
+            values = profiles.get((station_id, bound_to))
+            if values is None:
+                values = profiles[(station_id, bound_to)] = np.zeros(len(BASE_SECONDS))
+            index = PROFILE_INDEX.get(int(seconds))
+            if index is not None and value is not None:
+                values[index] = value
+        cur.execute("""
+            DELETE FROM congestion_profile
+            WHERE platform_station_ID IN (SELECT ID FROM station WHERE line_ID = %s)
+        """, (line_id,))
+        insert_profiles(cur, [(station_id, bound_to, pack_profile(values))
+                              for (station_id, bound_to), values in profiles.items()])
+        count = len(profiles)
+    else:
+        cur.execute("""
+            SELECT c.platform_station_ID, c.platform_bound_to, c.profile
+            FROM congestion_profile c
+            JOIN station s ON c.platform_station_ID = s.ID
+            WHERE s.line_ID = %s
+        """, (line_id,))
+        profile_rows = cur.fetchall()
+        slots = [format_seconds(seconds) for seconds in BASE_SECONDS.tolist()]
+        rows = []
+        for (station_id, bound_to, _), values in zip(profile_rows, unpack_profiles(row[2] for row in profile_rows)):
+            rows.extend((station_id, bound_to, slot, value) for slot, value in zip(slots, values.tolist()))
+        cur.execute("""
+            DELETE FROM congestion
+            WHERE platform_station_ID IN (SELECT ID FROM station WHERE line_ID = %s)
+        """, (line_id,))
+        insert_rows(cur, rows)
+        count = len(profile_rows)
+
+    return count
+
+
+def delete_storage(cur, line_id, storage):
+    """노선의 혼잡도를 storage 형식에서만 지운다 (형식을 바꾼 뒤 이전 형식을 비울 때)"""
+    table = "congestion_profile" if storage == STORAGE_PROFILE else "congestion"
+    cur.execute(f"""
+        DELETE FROM {table}
+        WHERE platform_station_ID IN (SELECT ID FROM station WHERE line_ID = %s)
+    """, (line_id,))
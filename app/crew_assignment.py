@@ -0,0 +1,155 @@
+"""열차-기관사 최적 배치
+
+한 노선의 열차마다 기관사 한 명을 배치하는 최소 비용 배정 문제를 최소 비용 흐름으로 풀어 정확한 최적해를 구한다.
+
+    열차 t ──(쌍별 비용이 음수인 쌍: 기존 배치 유지, 선호)──▶ 기관사 m ──(k 번째 배정 비용)──▶ 싱크
+       └──(0)──▶ 공용 노드 ──(0)──────────────────────────────▲
+
+모든 열차-기관사 쌍을 간선으로 두면 열차 수 × 기관사 수의 조밀한 비용 행렬이 되지만 (3000 × 3500 에서
+linear_sum_assignment 6초, min_weight_full_bipartite_matching 8초), 쌍별 비용이 없는 쌍은 모두 공용 노드를
+거치게 해서 간선 수를 (열차 수 + 쌍별 비용 수 + 기관사 수 × 최대 배정 수) 로 줄인다.
+흐름 보존 제약 행렬은 완전 단모듈(totally unimodular)이므로 LP(HiGHS) 의 기본 최적해가 곧 정수 배정이다.
+"""
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix
+
+
+class InfeasibleAssignment(ValueError):
+    """기관사 수 × 최대 배정 수가 열차 수보다 적은 경우"""
+
+
+def assignment_costs(train_ids, motorman_ids, existing_pairs, other_load, max_per_motorman,
+                     preserve_weight, balance_weight, extra_costs=()):
+    """배정 비용을 쌍별 비용과 기관사별 k 번째 배정 비용으로 나눠 만든다
+
+    existing_pairs: 이 노선에서 유지하고 싶은 기존 (열차, 기관사) 쌍, preserve_weight 만큼 비용이 줄어든다
+    other_load: {기관사 ID: 다른 노선에서 맡은 열차 수}
+    balance_weight: 기관사의 (다른 노선 배정 수 + k) 번째 배정에 드는 비용 배율. 한계 비용이 커지므로 고르게 나눠진다
+    extra_costs: (열차 ID, 기관사 ID, 비용) 목록. 쌍별 비용에 더한다 (음수면 선호)
+    """
+    trains = set(train_ids)
+    motormen = set(motorman_ids)
+    pair_costs = {}
+    for pair in existing_pairs:
+        if pair[0] in trains and pair[1] in motormen:
+            pair_costs[pair] = pair_costs.get(pair, 0.0) - preserve_weight
+    for train_id, motorman_id, cost in extra_costs:
+        if train_id in trains and motorman_id in motormen:
+            pair = (train_id, motorman_id)
+            pair_costs[pair] = pair_costs.get(pair, 0.0) + cost
+
+    slots = max(1, min(max_per_motorman, len(train_ids)))
+    load = np.array([other_load.get(motorman_id, 0) for motorman_id in motorman_ids], dtype=np.float64)
+    slot_costs = balance_weight * (load[:, None] + np.arange(slots)[None, :])
+    return pair_costs, slot_costs
+
+
+def _solve_flow(train_ids, motorman_ids, pair_costs, slot_costs, no_hub=()):
+    """최소 비용 흐름 LP 를 풀어 (쌍별 간선으로 배정된 {열차: 기관사}, 공용 노드를 거친 열차 목록,
+    {기관사: 공용 노드에서 받은 열차 수}, 목적 함수 값) 을 돌려준다. no_hub 의 열차는 공용 노드로 가는 간선이 없다
+    """
+    T = len(train_ids)
+    M, S = slot_costs.shape
+    train_index = {train_id: i for i, train_id in enumerate(train_ids)}
+    motorman_index = {motorman_id: i for i, motorman_id in enumerate(motorman_ids)}
+    pairs = list(pair_costs)
+    pair_train = np.array([train_index[t] for t, _ in pairs], dtype=np.int64)
+    pair_motorman = np.array([motorman_index[m] for _, m in pairs], dtype=np.int64)
+    pair_cost = np.array([pair_costs[pair] for pair in pairs], dtype=np.float64)
+    E = len(pairs)
+
+    # 변수: [쌍별 간선 E | 열차→공용 T | 공용→기관사 M | 기관사 m 의 k 번째 배정 M*S]
+    # 제약: 열차마다 유출 1 (T 행), 공용 노드 보존 (1 행), 기관사마다 보존 (M 행)
+    pair_vars = np.arange(E)
+    hub_in = E + np.arange(T)
+    hub_out = E + T + np.arange(M)
+    slot_vars = E + T + M + np.arange(M * S)
+    hub_row = T
+    motorman_rows = T + 1 + np.arange(M)
+
+    rows = np.concatenate([
+        pair_train, np.arange(T),                      # 열차: 쌍별 간선 + 공용 노드 간선 = 1
+        np.full(T, hub_row), np.full(M, hub_row),      # 공용 노드: 유입 - 유출 = 0
+        motorman_rows[pair_motorman], motorman_rows,   # 기관사: 유입 - 배정 = 0
+        np.repeat(motorman_rows, S),
+    ])
+    cols = np.concatenate([pair_vars, hub_in, hub_in, hub_out, pair_vars, hub_out, slot_vars])
+    vals = np.concatenate([
+        np.ones(E), np.ones(T), np.ones(T), -np.ones(M), np.ones(E), np.ones(M), -np.ones(M * S),
+    ])
+    A_eq = csr_matrix((vals, (rows, cols)), shape=(T + 1 + M, E + T + M + M * S))
+    b_eq = np.concatenate([np.ones(T), [0.0], np.zeros(M)])
+    c = np.concatenate([pair_cost, np.zeros(T + M), np.asarray(slot_costs, dtype=np.float64).ravel()])
+    hub_upper = np.ones(T)
+    hub_upper[[train_index[train_id] for train_id in no_hub]] = 0
+    upper = np.concatenate([np.ones(E), hub_upper, np.full(M, np.inf), np.ones(M * S)])
+
+    result = linprog(c, A_eq=A_eq, b_eq=b_eq, bounds=np.column_stack([np.zeros_like(upper), upper]),
+                     method="highs")
+    if result.status != 0:
+        raise InfeasibleAssignment(result.message)
+    x = np.rint(result.x).astype(np.int64)
+
+    assigned = {pair[0]: pair[1] for pair, used in zip(pairs, x[:E].tolist()) if used}
+    hub_trains = [train_ids[i] for i in np.flatnonzero(x[E:E + T]).tolist()]
+    hub_counts = dict(zip(motorman_ids, x[E + T:E + T + M].tolist()))
+    return assigned, hub_trains, hub_counts, float(result.fun)
+
+
+def _hand_out(hub_trains, hub_counts, penalties):
+    """공용 노드를 거친 열차에 기관사를 나눠 준다. 비용이 양수인 쌍을 피할 수 없으면 None
+
+    어느 열차가 어느 기관사를 받아도 비용이 같으므로, 피해야 할 기관사가 많은 열차부터 고른다.
+    """
+    remaining = {motorman_id: count for motorman_id, count in hub_counts.items() if count}
+    assignment = {}
+    for train_id in sorted(hub_trains, key=lambda train_id: -len(penalties.get(train_id, ()))):
+        avoid = penalties.get(train_id, ())
+        motorman_id = next((m for m in remaining if m not in avoid), None)
+        if motorman_id is None:
+            return None
+        assignment[train_id] = motorman_id
+        remaining[motorman_id] -= 1
+        if not remaining[motorman_id]:
+            del remaining[motorman_id]
+    return assignment
+
+
+def solve_assignment(train_ids, motorman_ids, pair_costs, slot_costs):
+    """열차마다 기관사 한 명을 배정하는 최소 비용 해
+
+    pair_costs: {(열차 ID, 기관사 ID): 비용}, 없는 쌍은 0
+    slot_costs: (기관사 수, 최대 배정 수) 배열, 기관사 m 의 k 번째 배정 비용 (k 에 대해 감소하지 않아야 한다)
+    반환: ({열차 ID: 기관사 ID}, 총 비용)
+
+    비용이 0 이상인 쌍은 공용 노드를 거치는 것보다 나을 수 없으므로 비용이 음수인 쌍만 간선으로 두고 푼다.
+    이 LP 는 양수 비용을 무시하므로 실제 문제의 하한이고, 공용 노드를 거친 열차를 양수 비용 쌍을 피해
+    나눠 줄 수 있으면 그대로 최적해다. 나눠 줄 수 없으면 (드물다) 양수 비용 쌍이 있는 열차에만
+    모든 기관사로 가는 간선을 두고 공용 노드를 막아 다시 푼다.
+    """
+    T = len(train_ids)
+    M, S = slot_costs.shape
+    if T == 0:
+        return {}, 0.0
+    if T > M * S:
+        raise InfeasibleAssignment(f"{T} trains need at least {T} motorman slots, only {M * S} available")
+
+    penalties = {}
+    for (train_id, motorman_id), cost in pair_costs.items():
+        if cost > 0:
+            penalties.setdefault(train_id, set()).add(motorman_id)
+    preferred = {pair: cost for pair, cost in pair_costs.items() if cost < 0}
+
+    assigned, hub_trains, hub_counts, objective = _solve_flow(train_ids, motorman_ids, preferred, slot_costs)
+    handed_out = _hand_out(hub_trains, hub_counts, penalties)
+    if handed_out is None:
+        exact_costs = dict(preferred)
+        for train_id in penalties:
+            for motorman_id in motorman_ids:
+                exact_costs[(train_id, motorman_id)] = pair_costs.get((train_id, motorman_id), 0.0)
+        assigned, hub_trains, hub_counts, objective = _solve_flow(
+            train_ids, motorman_ids, exact_costs, slot_costs, no_hub=penalties)
+        handed_out = _hand_out(hub_trains, hub_counts, {})
+    assigned.update(handed_out)
+    return assigned, objective
@@ -1,17 +1,282 @@
-from settings import DATABASE_HOST, DATABASE_ID, DATABASE_PASSWORD, DATABASE_NAME
+from settings import (
+    DATABASE_HOST, DATABASE_ID, DATABASE_PASSWORD, DATABASE_NAME,
+    DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE, DATABASE_POOL_RECYCLE,
+    DATABASE_POOL_TIMEOUT, DATABASE_POOL_PING_INTERVAL, DATABASE_INSERT_CHUNK_SIZE,
+    QUERY_TRACE_ENABLED,
+)
 import pymysql
+from pymysql.constants import SERVER_STATUS
 from contextlib import contextmanager
+from collections import deque
+import threading
+import time
+
+import metrics
+import query_trace
+
+
+class PoolTimeout(pymysql.err.OperationalError):
+    """풀에서 제한 시간 안에 커넥션을 받지 못한 경우"""
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used_at")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used_at = now
+
+
+class ConnectionPool:
+    """pymysql 커넥션 풀
+
+    - 최대 max_size 개까지 커넥션을 만들고, 모두 사용 중이면 timeout 초 동안 반납을 기다린다.
+    - recycle 초보다 오래된 커넥션은 반납/대여 시점에 닫고 새로 만든다.
+    - ping_interval 초 이상 놀던 커넥션은 대여 전에 ping 으로 상태를 확인한다.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, recycle=3600, timeout=30.0, ping_interval=30):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.recycle = recycle
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._warmed = False
+
+        self._created = 0
+        self._closed = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+        self._checkouts = 0
+        self._timeouts = 0
+
+    def _open(self):
+        try:
+            return _PooledConnection(self._connect())
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._available.notify()
+            raise
+
+    def _discard(self, pooled):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._closed += 1
+            self._available.notify()
+
+    def _warm_up(self):
+        # 최초 대여 시점에 min_size 만큼 미리 연결해 둔다 (import 시점에는 DB가 없을 수 있음)
+        with self._lock:
+            if self._warmed:
+                return
+            self._warmed = True
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            pooled = self._open()
+            with self._lock:
+                self._created += 1
+                self._idle.append(pooled)
+                self._available.notify()
+
+    def _is_healthy(self, pooled, now):
+        if self.recycle and now - pooled.created_at > self.recycle:
+            with self._lock:
+                self._recycled += 1
+            return False
+        if self.ping_interval is not None and now - pooled.last_used_at > self.ping_interval:
+            try:
+                pooled.conn.ping(reconnect=False)
+            except Exception:
+                with self._lock:
+                    self._failed_health_checks += 1
+                return False
+        return True
+
+    def acquire(self):
+        if not self._warmed:
+            self._warm_up()
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            pooled = None
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"Timed out after {self.timeout}s waiting for a database connection")
+                    self._waiting += 1
+                    try:
+                        self._available.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if pooled is None:
+                pooled = self._open()
+                with self._lock:
+                    self._created += 1
+            elif not self._is_healthy(pooled, time.monotonic()):
+                self._discard(pooled)
+                continue
+
+            with self._lock:
+                self._in_use += 1
+                self._checkouts += 1
+            return pooled
+
+    def release(self, pooled):
+        with self._lock:
+            self._in_use -= 1
+
+        conn = pooled.conn
+        try:
+            # 커밋되지 않은 트랜잭션(읽기 스냅샷 포함)을 다음 사용자에게 넘기지 않는다
+            if conn.open and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                conn.rollback()
+        except Exception:
+            self._discard(pooled)
+            return
+
+        now = time.monotonic()
+        if not conn.open or (self.recycle and now - pooled.created_at > self.recycle):
+            if conn.open:
+                with self._lock:
+                    self._recycled += 1
+            self._discard(pooled)
+            return
+
+        pooled.last_used_at = now
+        with self._lock:
+            self._idle.append(pooled)
+            self._available.notify()
+
+    def close(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "created": self._created,
+                "closed": self._closed,
+                "recycled": self._recycled,
+                "failed_health_checks": self._failed_health_checks,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+            }
+
+
+def _connect():
+    return pymysql.connect(host=DATABASE_HOST, user=DATABASE_ID, password=DATABASE_PASSWORD, db=DATABASE_NAME, charset='utf8')
+
+
+pool = ConnectionPool(
+    _connect,
+    min_size=DATABASE_POOL_MIN_SIZE,
+    max_size=DATABASE_POOL_MAX_SIZE,
+    recycle=DATABASE_POOL_RECYCLE,
+    timeout=DATABASE_POOL_TIMEOUT,
+    ping_interval=DATABASE_POOL_PING_INTERVAL,
+)
 
-def mysql_create_session():
-    conn = pymysql.connect(host=DATABASE_HOST, user=DATABASE_ID, password=DATABASE_PASSWORD, db=DATABASE_NAME, charset='utf8')
-    cur = conn.cursor()
-    return conn, cur
 
 @contextmanager
-def get_db_connection():
-    conn, cur = mysql_create_session()
+def get_db_connection(cursor=None):
+    """풀에서 커넥션을 빌려 (conn, cur) 를 넘겨준다
+
+    cursor 에 pymysql.cursors.SSCursor 를 넘기면 결과를 버퍼링하지 않고 스트리밍하는 커서를 쓴다.
+    커서는 실행 시간과 쿼리 수를 metrics 에 기록하는 InstrumentedCursor 로 감싸서 넘긴다.
+    QUERY_TRACE_ENABLED 이면 문장별 시간/행 수를 남기는 query_trace.TracingCursor 로 한 번 더 감싼다.
+    """
+    start = time.perf_counter()
+    pooled = pool.acquire()
+    metrics.record_pool_wait(time.perf_counter() - start)
+    conn = pooled.conn
+    cur = metrics.InstrumentedCursor(conn.cursor(cursor))
+    if QUERY_TRACE_ENABLED:
+        unbuffered = cursor is not None and issubclass(cursor, pymysql.cursors.SSCursor)
+        cur = query_trace.TracingCursor(cur, conn, unbuffered)
     try:
         yield conn, cur
     finally:
-        conn.close()
+        try:
+            cur.close()
+        finally:
+            pool.release(pooled)
+
+
+def execute_many(cur, sql, rows, chunk_size=DATABASE_INSERT_CHUNK_SIZE):
+    """rows 를 chunk_size 개씩 나눠 executemany 로 실행
+
+    "INSERT ... VALUES (%s, ...)" 형태의 sql 은 pymysql 이 다중 행 INSERT 한 문장으로 묶어 보낸다.
+    """
+    for start in range(0, len(rows), chunk_size):
+        cur.executemany(sql, rows[start:start + chunk_size])
+
+
+def insert_returning_ids(cur, sql, rows, chunk_size=DATABASE_INSERT_CHUNK_SIZE):
+    """execute_many 처럼 다중 행 INSERT 로 넣고, 새로 만들어진 AUTO_INCREMENT ID 를 rows 순서대로 돌려준다
+
+    InnoDB 는 행 수가 정해진 다중 행 INSERT 한 문장에 연속된 AUTO_INCREMENT 값을 배정하고
+    (innodb_autoinc_lock_mode 와 무관), lastrowid 는 그 중 첫 값이다.
+    chunk 하나가 pymysql 의 한 문장 최대 길이(약 1MB)를 넘지 않아야 한다.
+    """
+    if not rows:
+        return []
+    cur.execute("SELECT @@auto_increment_increment")
+    step = cur.fetchone()[0]
+    ids = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cur.executemany(sql, chunk)
+        first_id = cur.lastrowid
+        ids.extend(range(first_id, first_id + step * len(chunk), step))
+    return ids
+
+
+def get_db():
+    """요청 단위 커넥션 의존성
+
+    같은 요청 안에서 get_current_user 와 라우터 핸들러가 하나의 커넥션을 공유하고,
+    요청이 끝날 때 한 번만 풀에 반납한다.
+    """
+    with get_db_connection() as (conn, cur):
+        yield conn, cur
+
 
+def get_pool_stats():
+    return pool.stats()
@@ -0,0 +1,75 @@
+"""혼잡도 CDF 역변환으로 열차 출발 시각 계산"""
+from typing import List, Sequence
+import numpy as np
+
+DAY_SECONDS = 24 * 3600
+
+
+def invert_cdfs(times_list: Sequence[np.ndarray], cdfs_list: Sequence[np.ndarray],
+                train_counts: Sequence[int]) -> List[np.ndarray]:
+    """여러 노선의 CDF 를 한 번에 역변환해 노선별 출발 시각(자정 기준 초) 배열을 돌려준다
+
+    노선 i 의 목표 CDF 는 0/N, 1/N, ..., (N-1)/N 이고, 목표 CDF 를 포함하는 구간
+    [times[k-1], times[k]] 에서 선형 보간한다. 자정을 넘어가는 구간은 24시간을 더해 보간한 뒤
+    다시 24시간 안으로 되돌린다.
+    """
+    lines = len(times_list)
+    lengths = np.array([len(cdfs) for cdfs in cdfs_list], dtype=np.int64)
+    counts = np.asarray(train_counts, dtype=np.int64)
+    width = int(lengths.max()) if lines else 0
+
+    # 노선마다 길이가 다른 히스토그램을 (노선, 구간) 배열로 맞춘다. 빈 칸의 CDF 는 +inf
+    times = np.zeros((lines, width), dtype=np.int64)
+    cdfs = np.full((lines, width), np.inf)
+    for i, (line_times, line_cdfs) in enumerate(zip(times_list, cdfs_list)):
+        times[i, :lengths[i]] = line_times
+        cdfs[i, :lengths[i]] = line_cdfs
+
+    line = np.repeat(np.arange(lines), counts)
+    targets = np.concatenate([np.arange(n) / n for n in counts.tolist()]) if lines else np.zeros(0)
+    last = lengths[line] - 1
+
+    # 1 번 구간부터 CDF 가 목표 이상이 되는 첫 위치 (마지막 구간에서 멈춤)
+    below = (cdfs[line, 1:] < targets[:, None]).sum(axis=1)
+    index = np.minimum(1 + below, last)
+
+    t1 = times[line, index - 1]
+    t2 = times[line, index]
+    t2 = np.where(t2 < t1, t2 + DAY_SECONDS, t2)
+    cdf1 = cdfs[line, index - 1]
+    cdf2 = cdfs[line, index]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (targets - cdf1) / (cdf2 - cdf1)
+        interpolated = np.where(np.abs(cdf2 - cdf1) < 1e-10, t1, t1 + (t2 - t1) * ratio)
+
+    while (interpolated >= DAY_SECONDS).any():
+        interpolated = np.where(interpolated >= DAY_SECONDS, interpolated - DAY_SECONDS, interpolated)
+    seconds = np.floor(interpolated).astype(np.int64)
+
+    return np.split(seconds, np.cumsum(counts)[:-1]) if lines else []
+
+
+def invert_cdf(times: np.ndarray, cdfs: np.ndarray, train_count: int) -> np.ndarray:
+    """한 노선의 N 대 열차 출발 시각"""
+    return invert_cdfs([times], [cdfs], [train_count])[0]
+
+
+def arrival_matrix(departure_seconds: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """[열차, 역] 도착 시각(자정 기준 초). offsets 는 출발역부터 각 역까지의 누적 소요시간(초)"""
+    return (np.asarray(departure_seconds, dtype=np.int64)[:, None]
+            + np.asarray(offsets, dtype=np.int64)[None, :]) % DAY_SECONDS
+
+
+def format_clock(seconds: np.ndarray) -> list:
+    """초 배열을 같은 모양의 "HH:MM:SS" 중첩 리스트로 변환"""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    hours, remainder = np.divmod(seconds, 3600)
+    minutes, secs = np.divmod(remainder, 60)
+    flat = [f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in zip(hours.ravel().tolist(), minutes.ravel().tolist(),
+                                                        secs.ravel().tolist())]
+    if seconds.ndim <= 1:
+        return flat
+    width = seconds.shape[-1]
+    return [flat[start:start + width] for start in range(0, len(flat), width)]
+
@@ -0,0 +1,104 @@
+"""노선 열차 수(N) 산정
+
+출발 시각은 혼잡도 CDF 를 0/N, 1/N, ... 에서 역변환해 정한다 (departure.invert_cdfs). 역변환에 쓰는 CDF 는
+30분 구간 중앙 사이를 선형 보간한 값이라, 실제 혼잡도(구간 안에서 고르게 분포)로 보면 혼잡 시간대의
+열차는 1/N 보다 많은 몫을 맡는다. 열차 한 대의 몫은 그 열차의 출발부터 다음 열차 출발까지 쌓이는 혼잡도가
+하루 전체 혼잡도에서 차지하는 비율이고 (마지막 열차는 운행 종료까지), 여기서는 그 최댓값(최대 분담률)을 본다.
+
+히스토그램은 노선마다 한 번만 계산하고, 후보 N 여러 개를 invert_cdfs 한 번으로 함께 계산한다.
+"""
+from dataclasses import dataclass
+import math
+from typing import Optional
+import numpy as np
+
+from departure import invert_cdfs
+from histogram import Histogram, SLOT_SECONDS, DAY_SECONDS
+
+# invert_cdfs 한 번에 넘기는 열차 수 (후보 N 의 합)
+_CHUNK_TRAINS = 65536
+# smallest_fleet 첫 묶음의 열차 수 (답이 1/target 가까이에 있으면 여기서 끝난다, 묶음마다 두 배로 늘린다)
+_FIRST_SCAN_TRAINS = 2048
+
+
+@dataclass
+class DemandCurve:
+    """한 노선의 출발 시각 역변환 입력과 실제 혼잡도 누적 분포"""
+    start_seconds: np.ndarray    # 히스토그램 구간 시작 시각 (invert_cdfs 입력)
+    cdf: np.ndarray
+    edge_seconds: np.ndarray     # 30분 구간 경계 (첫 시각 기준으로 자정을 넘기면 24시간을 더한 값)
+    edge_share: np.ndarray       # 경계까지 쌓인 혼잡도 비율
+    total: float                 # 하루 전체 혼잡도 합
+
+    @classmethod
+    def from_histogram(cls, histogram: Histogram) -> "DemandCurve":
+        start = int(histogram.start_seconds[0])
+        # 양 끝(05:15 / 01:15)은 혼잡도가 0 인 경계값이므로 구간은 그 사이의 30분 구간들이다
+        centers = _unwrap(histogram.start_seconds[1:-1], start)
+        totals = np.asarray(histogram.totals[1:-1], dtype=np.float64)
+        total = float(totals.sum())
+        running = np.cumsum(totals) / total
+        edge_seconds = np.column_stack([centers - SLOT_SECONDS // 2, centers + SLOT_SECONDS // 2]).ravel()
+        edge_share = np.column_stack([running - totals / total, running]).ravel()
+        return cls(histogram.start_seconds, histogram.cdf, edge_seconds, edge_share, total)
+
+
+def _unwrap(seconds, start):
+    # 첫 시각보다 이른 시각은 다음 날로 본다
+    seconds = np.asarray(seconds, dtype=np.int64)
+    return np.where(seconds < start, seconds + DAY_SECONDS, seconds)
+
+
+def peak_shares(curve: DemandCurve, train_counts) -> np.ndarray:
+    """후보 N 마다 열차 한 대가 맡는 혼잡도 비율의 최댓값"""
+    counts = np.asarray(train_counts, dtype=np.int64)
+    # 후보 N 의 합이 _CHUNK_TRAINS 를 넘지 않도록 묶어서 invert_cdfs 에 넘긴다
+    groups = np.cumsum(counts) // _CHUNK_TRAINS
+    bounds = np.flatnonzero(np.diff(groups)) + 1
+    return np.concatenate([np.zeros(0)] + [_peak_shares(curve, chunk) for chunk in np.split(counts, bounds) if chunk.size])
+
+
+def _peak_shares(curve, counts):
+    departures = invert_cdfs([curve.start_seconds] * len(counts), [curve.cdf] * len(counts), counts)
+    # 후보를 이어 붙인 하나의 배열에서 열차별 몫을 구하고 후보별 최댓값을 reduceat 으로 모은다
+    seconds = np.concatenate([_unwrap(d, int(curve.start_seconds[0])) for d in departures])
+    share_at = np.interp(seconds, curve.edge_seconds, curve.edge_share)
+    ends = np.cumsum(counts)
+    following = np.append(share_at[1:], 1.0)
+    following[ends - 1] = 1.0
+    shares = following - share_at
+    return np.maximum.reduceat(shares, ends - counts)
+
+
+def smallest_fleet(curve: DemandCurve, target: float, max_trains: int) -> Optional[int]:
+    """최대 분담률이 target 이하가 되는 가장 작은 N (max_trains 까지 없으면 None)
+
+    출발 시각이 30분 구간 경계와 어떻게 맞물리는지에 따라 최대 분담률이 N 에 대해 오르내리므로
+    (톱니 모양) 이분 탐색은 답을 건너뛸 수 있다. 최대 분담률은 평균인 1/N 이상이므로 1/target 부터
+    차례로 확인하되, 처음에는 작은 묶음으로 계산하고 답이 없을 때마다 묶음을 두 배로 늘린다.
+
+    답이 없으면 1/target ~ max_trains 의 모든 후보를 계산하므로 최악의 경우 출발 시각을 약
+    (max_trains² - (1/target)²) / 2 개 만든다 (FLEET_SIZE_MAX_TRAINS=2000 이면 약 200만 개, 수백 ms).
+    """
+    n = max(1, math.ceil(1 / target - 1e-9))
+    budget = _FIRST_SCAN_TRAINS
+    while n <= max_trains:
+        # 후보 N 의 합(만들 출발 시각 수)이 budget 을 넘지 않는 만큼 (최소 한 개)
+        candidates = np.arange(n, max_trains + 1)
+        candidates = candidates[:max(1, int(np.searchsorted(np.cumsum(candidates), budget, side='right')))]
+        passing = np.flatnonzero(peak_shares(curve, candidates) <= target)
+        if passing.size:
+            return int(candidates[passing[0]])
+        n = int(candidates[-1]) + 1
+        budget = min(budget * 2, _CHUNK_TRAINS)
+    return None
+
+
+def sweep(curve: DemandCurve, max_trains: int, points: int) -> list:
+    """1 ~ max_trains 사이 N 에 대한 [{"train_count", "peak_share", "peak_load"}, ...] 곡선"""
+    counts = np.unique(np.linspace(1, max_trains, min(points, max_trains)).round().astype(np.int64))
+    shares = peak_shares(curve, counts)
+    return [
+        {"train_count": count, "peak_share": round(share, 6), "peak_load": round(share * curve.total, 2)}
+        for count, share in zip(counts.tolist(), shares.tolist())
+    ]
@@ -0,0 +1,330 @@
+"""혼잡도 히스토그램 계산 엔진
+
+sql_procedures/ 의 GetRoundTripHistogram / GetCircularHistogram 과 같은 결과를
+노선 단위로 한 번 읽어 온 배열 위에서 계산한다.
+"""
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+
+from settings import CONGESTION_STORAGE
+
+SLOT_SECONDS = 1800
+DAY_SECONDS = 24 * 3600
+# 혼잡도 시간대를 하루 기준 30분 단위 인덱스(0 ~ 47)로 저장하고, 48 은 "데이터 없음"
+DAY_SLOTS = DAY_SECONDS // SLOT_SECONDS
+
+# 프로시저의 time_slots: 05:30 ~ 23:30 (slot_id 1 ~ 37), 00:00 / 00:30 (slot_id 38, 39)
+BASE_SECONDS = np.array(
+    [19800 + SLOT_SECONDS * i for i in range(37)] + [0, SLOT_SECONDS],
+    dtype=np.int64,
+)
+# congestion_profile.profile: BASE_SECONDS 순서의 혼잡도 39개를 little-endian float64 로 이어 붙인 값
+# (float32 로 줄이면 ROUND(x, 4) 결과가 프로시저와 달라질 수 있다)
+PROFILE_DTYPE = np.dtype('<f8')
+PROFILE_BYTES = PROFILE_DTYPE.itemsize * len(BASE_SECONDS)
+FIRST_START_SECONDS = 5 * 3600 + 15 * 60  # 05:15 초기값
+LAST_START_SECONDS = 1 * 3600 + 15 * 60   # 01:15 초기값
+
+
+@dataclass
+class LineInputs:
+    """히스토그램 계산에 필요한 한 노선의 입력 데이터"""
+    line_id: int
+    station_ids: np.ndarray      # 노선의 역 ID (오름차순)
+    station_names: List[str]
+    eta_ids: np.ndarray          # eta 테이블 station_ID (오름차순, 노선 앞뒤의 이웃 한 행씩 포함)
+    eta_seconds: np.ndarray      # eta_ids 에 대응하는 소요시간(초)
+    platforms: np.ndarray        # [역, bound_to] 승강장 존재 여부 (bool)
+    congestion: np.ndarray       # [역, bound_to, 하루 30분 슬롯] 혼잡도 (없거나 NULL 이면 0)
+
+
+@dataclass
+class Histogram:
+    start_seconds: np.ndarray    # 각 구간의 시작 시각 (자정 기준 초, 24시 미만)
+    totals: np.ndarray
+    pdf: np.ndarray              # 전체 혼잡도 합이 0 이면 NaN
+    cdf: np.ndarray
+
+    def rows(self):
+        """프로시저 결과셋과 같은 (start_time, total_congestion, pdf_value, cdf_value) 목록"""
+        result = []
+        for start, total, pdf, cdf in zip(self.start_seconds.tolist(), self.totals.tolist(),
+                                          self.pdf.tolist(), self.cdf.tolist()):
+            result.append((
+                format_seconds(start),
+                total,
+                None if pdf != pdf else pdf,
+                None if cdf != cdf else cdf,
+            ))
+        return result
+
+
+def format_seconds(seconds: int) -> str:
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def pack_profile(values) -> bytes:
+    """BASE_SECONDS 순서의 혼잡도 값 39개를 congestion_profile.profile 값으로"""
+    values = np.asarray(values, dtype=PROFILE_DTYPE)
+    if values.shape != BASE_SECONDS.shape:
+        raise ValueError(f"congestion profile needs {len(BASE_SECONDS)} values, got {values.size}")
+    return values.tobytes()
+
+
+def unpack_profiles(blobs) -> np.ndarray:
+    """profile 값 목록을 (행, 39) 배열로 (bytes 를 한 번에 이어 붙여 변환한다)"""
+    blobs = list(blobs)
+    if any(len(blob) != PROFILE_BYTES for blob in blobs):
+        raise ValueError(f"congestion profile must be {PROFILE_BYTES} bytes")
+    return np.frombuffer(b"".join(blobs), dtype=PROFILE_DTYPE).reshape(len(blobs), len(BASE_SECONDS))
+
+
+def build_line_inputs(line_id, stations, eta_rows, platform_rows, congestion_rows, profile_rows=()) -> LineInputs:
+    """조회 결과 행들로 LineInputs 를 만든다
+
+    stations: (ID, name) / eta_rows: (station_ID, 초) / platform_rows: (station_ID, bound_to)
+    congestion_rows: (station_ID, bound_to, 초, congest_status)
+    profile_rows: (station_ID, bound_to, profile) - CONGESTION_STORAGE=profile 일 때
+    """
+    stations = sorted(stations, key=lambda row: row[0])
+    station_ids = np.array([row[0] for row in stations], dtype=np.int64)
+    station_names = [row[1] for row in stations]
+
+    eta_rows = sorted(eta_rows, key=lambda row: row[0])
+    eta_ids = np.array([row[0] for row in eta_rows], dtype=np.int64)
+    eta_seconds = np.array([int(row[1]) for row in eta_rows], dtype=np.int64)
+
+    platforms = np.zeros((len(station_ids), 2), dtype=bool)
+    if platform_rows:
+        rows = np.array([(row[0], int(row[1])) for row in platform_rows], dtype=np.int64)
+        index = np.searchsorted(station_ids, rows[:, 0])
+        platforms[index, rows[:, 1]] = True
+
+    congestion = np.zeros((len(station_ids), 2, DAY_SLOTS), dtype=np.float64)
+    if congestion_rows:
+        ids = np.array([row[0] for row in congestion_rows], dtype=np.int64)
+        bounds = np.array([int(row[1]) for row in congestion_rows], dtype=np.int64)
+        seconds = np.array([int(row[2]) for row in congestion_rows], dtype=np.int64)
+        values = np.array([0.0 if row[3] is None else float(row[3]) for row in congestion_rows])
+        # 30분 격자 위의 시간대만 도착 시간대와 일치할 수 있다
+        on_grid = (seconds % SLOT_SECONDS == 0) & (seconds >= 0) & (seconds < DAY_SECONDS)
+        index = np.searchsorted(station_ids, ids)
+        congestion[index[on_grid], bounds[on_grid], seconds[on_grid] // SLOT_SECONDS] = values[on_grid]
+    if profile_rows:
+        index = np.searchsorted(station_ids, np.array([row[0] for row in profile_rows], dtype=np.int64))
+        bounds = np.array([int(row[1]) for row in profile_rows], dtype=np.int64)
+        congestion[index[:, None], bounds[:, None], (BASE_SECONDS // SLOT_SECONDS)[None, :]] = \
+            unpack_profiles(row[2] for row in profile_rows)
+
+    return LineInputs(
+        line_id=line_id,
+        station_ids=station_ids,
+        station_names=station_names,
+        eta_ids=eta_ids,
+        eta_seconds=eta_seconds,
+        platforms=platforms,
+        congestion=congestion,
+    )
+
+
+def load_line_inputs(cur, line_id: int) -> LineInputs:
+    """한 노선의 역, 소요시간, 승강장, 혼잡도를 한 번씩만 조회한다"""
+    cur.execute("SELECT ID, name FROM station WHERE line_ID = %s ORDER BY ID", (line_id,))
+    stations = cur.fetchall()
+
+    eta_rows = []
+    if stations:
+        first_id, last_id = stations[0][0], stations[-1][0]
+        # 프로시저의 LEAD() 는 eta 테이블 전체를 station_ID 순으로 훑으므로 노선 앞뒤 이웃 행도 필요하다
+        cur.execute("""
+            (SELECT station_ID, TIME_TO_SEC(ET) FROM eta WHERE station_ID < %s ORDER BY station_ID DESC LIMIT 1)
+            UNION ALL
+            (SELECT station_ID, TIME_TO_SEC(ET) FROM eta WHERE station_ID BETWEEN %s AND %s)
+            UNION ALL
+            (SELECT station_ID, TIME_TO_SEC(ET) FROM eta WHERE station_ID > %s ORDER BY station_ID LIMIT 1)
+        """, (first_id, first_id, last_id, last_id))
+        eta_rows = cur.fetchall()
+
+    cur.execute("""
+        SELECT p.station_ID, p.bound_to
+        FROM platform p
+        JOIN station s ON p.station_ID = s.ID
+        WHERE s.line_ID = %s
+    """, (line_id,))
+    platform_rows = cur.fetchall()
+
+    cur.execute(f"""
+        SELECT {_congestion_columns()}
+        JOIN station s ON c.platform_station_ID = s.ID
+        WHERE s.line_ID = %s
+    """, (line_id,))
+    congestion_rows = cur.fetchall()
+
+    return _build_stored_inputs(line_id, stations, eta_rows, platform_rows, congestion_rows)
+
+
+def _build_stored_inputs(line_id, stations, eta_rows, platform_rows, congestion_rows):
+    # congestion_rows 는 _congestion_columns() 로 읽은 행
+    if CONGESTION_STORAGE == 'profile':
+        return build_line_inputs(line_id, stations, eta_rows, platform_rows, (), congestion_rows)
+    return build_line_inputs(line_id, stations, eta_rows, platform_rows, congestion_rows)
+
+
+def _congestion_columns():
+    # CONGESTION_STORAGE 에 따라 시간대별 행 또는 승강장별 profile 을 읽는다 (별칭 c)
+    if CONGESTION_STORAGE == 'profile':
+        return "c.platform_station_ID, c.platform_bound_to, c.profile FROM congestion_profile c"
+    return ("c.platform_station_ID, c.platform_bound_to, TIME_TO_SEC(c.time_slot), c.congest_status "
+            "FROM congestion c")
+
+
+def station_sequence(inputs: LineInputs, route_shape: str, bound_to: int):
+    """프로시저의 seq_number 순서대로 (역 인덱스, bound_to, 소요시간 초) 배열을 돌려준다"""
+    ids = inputs.station_ids
+    eta_ids = inputs.eta_ids
+    eta_seconds = inputs.eta_seconds
+    n = len(ids)
+
+    own_et = np.zeros(n, dtype=np.int64)
+    next_et = np.zeros(n, dtype=np.int64)
+    prev_et = np.zeros(n, dtype=np.int64)
+    if len(eta_ids):
+        pos = np.searchsorted(eta_ids, ids)
+        safe = np.minimum(pos, len(eta_ids) - 1)
+        has_eta = eta_ids[safe] == ids
+        own_et[has_eta] = eta_seconds[safe[has_eta]]
+        # LEAD(eta.ET) OVER (ORDER BY station_ID) / OVER (ORDER BY -station_ID)
+        has_next = has_eta & (pos + 1 < len(eta_ids))
+        next_et[has_next] = eta_seconds[pos[has_next] + 1]
+        has_prev = has_eta & (pos >= 1)
+        prev_et[has_prev] = eta_seconds[pos[has_prev] - 1]
+
+    if route_shape == 'CIRCULAR':
+        if bound_to == 1:
+            order = np.arange(n)
+            et = own_et
+        else:
+            order = np.arange(n)[::-1]
+            et = prev_et[order]
+        bounds = np.full(n, bound_to, dtype=np.int64)
+    else:
+        # 상행(bound_to = 1)은 역 ID 오름차순, 마지막 역 제외 / 하행(bound_to = 0)은 역 ID 내림차순
+        last = ids[-1] if n else None
+        up = np.flatnonzero(inputs.platforms[:, 1] & (ids != last))
+        down = np.flatnonzero(inputs.platforms[:, 0])[::-1]
+        order = np.concatenate([up, down])
+        bounds = np.concatenate([np.ones(len(up), dtype=np.int64), np.zeros(len(down), dtype=np.int64)])
+        et = np.concatenate([own_et[up], next_et[down]])
+
+    return order, bounds, et
+
+
+def compute_histogram(inputs: LineInputs, route_shape: str, bound_to: int) -> Histogram:
+    """GetRoundTripHistogram(lineId) / GetCircularHistogram(lineId, boundTo) 와 같은 히스토그램"""
+    order, bounds, et = station_sequence(inputs, route_shape, bound_to)
+    cumulated = np.cumsum(et)
+
+    # 역 × 출발 시각 도착 시간대 인덱스 (DAY_SLOTS 는 일치하는 혼잡도가 없는 경우)
+    profiles = np.concatenate(
+        [inputs.congestion[order, bounds], np.zeros((len(order), 1))], axis=1
+    )
+    if route_shape == 'CIRCULAR':
+        arrival = BASE_SECONDS[None, :] + cumulated[:, None]
+        valid = arrival < DAY_SECONDS
+        slots = np.where(valid, arrival // SLOT_SECONDS, DAY_SLOTS)
+        present = valid.any(axis=0)
+    else:
+        slots = BASE_SECONDS[None, :] // SLOT_SECONDS + (cumulated // SLOT_SECONDS)[:, None]
+        slots = np.minimum(slots, DAY_SLOTS)
+        present = np.full(len(BASE_SECONDS), len(order) > 0)
+
+    totals = np.take_along_axis(profiles, slots, axis=1).sum(axis=0)
+
+    start_seconds = np.concatenate([
+        [FIRST_START_SECONDS],
+        (BASE_SECONDS + SLOT_SECONDS // 2)[present],
+        [LAST_START_SECONDS],
+    ])
+    totals = np.concatenate([[0.0], totals[present], [0.0]])
+
+    running = np.cumsum(totals)
+    grand_total = running[-1]
+    preceding = np.concatenate([[0.0], running[:-1]])
+    if grand_total == 0:
+        pdf = np.full(len(totals), np.nan)
+        cdf = np.full(len(totals), np.nan)
+    else:
+        pdf = _round4(totals / grand_total)
+        cdf = _round4((preceding + totals * 0.5) / grand_total)
+
+    return Histogram(start_seconds=start_seconds, totals=totals, pdf=pdf, cdf=cdf)
+
+
+def _round4(values: np.ndarray) -> np.ndarray:
+    # MySQL ROUND(x, 4) 와 같은 값을 내도록 원소별로 round 를 사용 (배열 길이는 41 이하)
+    return np.array([round(value, 4) for value in values.tolist()])
+
+
+def load_network_inputs(cur, line_ids=None):
+    """여러 노선의 입력 데이터를 노선 수와 관계없이 네 번의 조회로 읽어 {line_id: LineInputs} 로 돌려준다
+
+    line_ids 가 None 이면 모든 노선을 읽는다.
+    """
+    if line_ids is None:
+        condition, params = "", ()
+    else:
+        line_ids = list(line_ids)
+        if not line_ids:
+            return {}
+        condition = f"WHERE s.line_ID IN ({', '.join(['%s'] * len(line_ids))})"
+        params = tuple(line_ids)
+
+    cur.execute(f"SELECT s.ID, s.name, s.line_ID FROM station s {condition} ORDER BY s.ID", params)
+    stations_by_line = {}
+    for station_id, name, line_id in cur.fetchall():
+        stations_by_line.setdefault(line_id, []).append((station_id, name))
+
+    # LEAD() 가 노선 경계 너머의 행을 참조하므로 eta 는 테이블 전체를 한 번 읽어 노선별로 잘라 쓴다
+    cur.execute("SELECT station_ID, TIME_TO_SEC(ET) FROM eta ORDER BY station_ID")
+    eta_rows = cur.fetchall()
+    eta_ids = np.array([row[0] for row in eta_rows], dtype=np.int64)
+
+    cur.execute(f"""
+        SELECT s.line_ID, p.station_ID, p.bound_to
+        FROM platform p
+        JOIN station s ON p.station_ID = s.ID
+        {condition}
+    """, params)
+    platforms_by_line = {}
+    for line_id, station_id, bound_to in cur.fetchall():
+        platforms_by_line.setdefault(line_id, []).append((station_id, bound_to))
+
+    cur.execute(f"""
+        SELECT s.line_ID, {_congestion_columns()}
+        JOIN station s ON c.platform_station_ID = s.ID
+        {condition}
+    """, params)
+    congestion_by_line = {}
+    for row in cur.fetchall():
+        congestion_by_line.setdefault(row[0], []).append(row[1:])
+
+    result = {}
+    for line_id in (line_ids if line_ids is not None else sorted(stations_by_line)):
+        stations = stations_by_line.get(line_id, [])
+        line_eta_rows = []
+        if stations:
+            # load_line_inputs 와 같이 노선 구간과 앞뒤 이웃 한 행씩
+            start = max(int(np.searchsorted(eta_ids, stations[0][0], side='left')) - 1, 0)
+            stop = int(np.searchsorted(eta_ids, stations[-1][0], side='right')) + 1
+            line_eta_rows = eta_rows[start:stop]
+        result[line_id] = _build_stored_inputs(
+            line_id,
+            stations,
+            line_eta_rows,
+            platforms_by_line.get(line_id, []),
+            congestion_by_line.get(line_id, []),
+        )
+    return result
@@ -1,7 +1,29 @@
 # app/main.py
+from contextlib import asynccontextmanager
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import motorman, train, line, train_motorman, line_csv, administrator, scheduler
+from fastapi.responses import PlainTextResponse
+from database import get_pool_stats
+from settings import QUERY_TRACE_ENABLED, SNAPSHOT_DIR
+import metrics
+import query_trace
+import schedule_batch
+import snapshot
+from routers import motorman, train, line, train_motorman, line_csv, administrator, scheduler, stats
+
+@asynccontextmanager
+async def lifespan(app):
+    # 스냅샷이 없거나 DB 와 버전이 다르면 새로 만든다 (여러 워커가 동시에 시작해도 한 번만 만든다)
+    if SNAPSHOT_DIR:
+        threading.Thread(target=snapshot.rebuild_in_background, daemon=True).start()
+    # 여러 노선 출발 시각 일괄 계산 프로세스 풀
+    schedule_batch.start()
+    try:
+        yield
+    finally:
+        schedule_batch.shutdown()
+
 
 app = FastAPI(
     title="Subway Scheduler API",
@@ -11,15 +33,25 @@ app = FastAPI(
     ],
     swagger_ui_init_oauth={
         "usePkceWithAuthorizationCodeGrant": True,
-    }
+    },
+    lifespan=lifespan,
 )
 
+# 요청 단위 지연 시간 / DB 시간 / 쿼리 수 수집 (/metrics 로 노출)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# 문장별 실행 시간 추적, 느린 쿼리(EXPLAIN 포함) / N+1 패턴 로그
+if QUERY_TRACE_ENABLED:
+    app.add_middleware(query_trace.QueryTraceMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 목록 조회 페이지네이션 헤더를 브라우저에서 읽을 수 있도록 노출
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 app.include_router(motorman.router, prefix="/motorman", tags=["Motorman"])
@@ -28,4 +60,14 @@ app.include_router(line.router, prefix="/line", tags=["Line"])
 app.include_router(train_motorman.router, prefix="/train_motorman", tags=["TrainMotorman"])
 app.include_router(line_csv.router, prefix="/line_csv", tags=["LineCSV"])
 app.include_router(administrator.router, prefix="/administrator", tags=["Administrator"])
-app.include_router(scheduler.router, prefix="/scheduler", tags=["Scheduler"])
\ No newline at end of file
+app.include_router(scheduler.router, prefix="/scheduler", tags=["Scheduler"])
+app.include_router(stats.router, prefix="/stats", tags=["Stats"])
+
+
+# Prometheus 텍스트 형식 지표
+# 스크레이퍼가 JWT 없이 읽을 수 있도록 인증하지 않는다. 경로별 요청 수 / 지연 시간과 커넥션 풀 수치만
+# 담고 있으며, 외부에 노출하지 않도록 리버스 프록시나 네트워크에서 접근을 막아야 한다.
+# (쿼리 내용이나 캐시 상태 같은 세부 정보는 인증이 필요한 /stats 아래에 있다)
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(get_pool_stats()), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,273 @@
+"""요청/DB 지표 수집과 Prometheus 텍스트 형식 출력
+
+MetricsMiddleware 가 요청마다 RequestStats 를 contextvar 에 넣어 두면, get_db_connection 이 나눠 준
+InstrumentedCursor 와 커넥션 풀 대기 시간이 같은 요청의 RequestStats 에 누적된다.
+(스레드 풀에서 실행되는 동기 핸들러에도 contextvar 가 복사되어 같은 객체를 본다)
+"""
+from contextvars import ContextVar
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class RequestStats:
+    __slots__ = ("db_seconds", "queries", "pool_wait_seconds", "finished")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.pool_wait_seconds = 0.0
+        # record_request 로 기록한 뒤에는 더하지 않는다 (응답 뒤에 도는 BackgroundTasks 는 요청 밖으로 센다)
+        self.finished = False
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+def current_request():
+    """기록 중인 요청의 RequestStats, 요청 밖이거나 이미 기록한 요청이면 None"""
+    stats = _current.get()
+    if stats is None or stats.finished:
+        return None
+    return stats
+
+
+class _Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [버킷별 개수..., 합계, 개수]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labels, series in sorted(self._series.items()):
+            base = _format_labels(self.label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_with_le(base, _format_number(bound))} {count}")
+            lines.append(f"{self.name}_bucket{_with_le(base, '+Inf')} {series[-1]}")
+            lines.append(f"{self.name}_sum{base} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{base} {series[-1]}")
+
+
+class _Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}
+
+    def inc(self, labels, value=1):
+        self._series[labels] = self._series.get(labels, 0) + value
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} counter")
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _with_le(base, le):
+    if base:
+        return base[:-1] + f',le="{le}"}}'
+    return f'{{le="{le}"}}'
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+_lock = threading.Lock()
+
+REQUEST_DURATION = _Histogram(
+    "http_request_duration_seconds", "Request latency until the last response byte is sent.",
+    ("method", "route", "status"), LATENCY_BUCKETS)
+REQUEST_DB_SECONDS = _Histogram(
+    "http_request_db_seconds", "Time spent in database calls per request.",
+    ("method", "route"), LATENCY_BUCKETS)
+REQUEST_PYTHON_SECONDS = _Histogram(
+    "http_request_python_seconds", "Request time outside database calls and pool waits.",
+    ("method", "route"), LATENCY_BUCKETS)
+REQUEST_POOL_WAIT_SECONDS = _Histogram(
+    "http_request_db_pool_wait_seconds", "Time spent waiting for a pooled connection per request.",
+    ("method", "route"), LATENCY_BUCKETS)
+REQUEST_QUERIES = _Histogram(
+    "http_request_db_queries", "Database statements executed per request.",
+    ("method", "route"), QUERY_COUNT_BUCKETS)
+DB_QUERIES = _Counter(
+    "db_queries_total", "Database statements executed, by route (\"-\" outside requests).", ("route",))
+DB_SECONDS = _Counter(
+    "db_query_seconds_total", "Time spent in database calls, by route (\"-\" outside requests).", ("route",))
+POOL_WAIT = _Histogram(
+    "db_pool_wait_seconds", "Time to acquire a connection from the pool.", (), LATENCY_BUCKETS)
+
+_METRICS = (REQUEST_DURATION, REQUEST_DB_SECONDS, REQUEST_PYTHON_SECONDS, REQUEST_POOL_WAIT_SECONDS,
+            REQUEST_QUERIES, DB_QUERIES, DB_SECONDS, POOL_WAIT)
+
+
+def record_query(seconds):
+    stats = current_request()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.queries += 1
+    else:
+        # 백그라운드 작업 등 요청 밖의 쿼리
+        with _lock:
+            DB_QUERIES.inc(("-",))
+            DB_SECONDS.inc(("-",), seconds)
+
+
+def record_db_time(seconds):
+    """쿼리 수에는 넣지 않고 시간만 더한다 (스트리밍 커서의 fetch 등)"""
+    stats = current_request()
+    if stats is not None:
+        stats.db_seconds += seconds
+    else:
+        with _lock:
+            DB_SECONDS.inc(("-",), seconds)
+
+
+def record_pool_wait(seconds):
+    stats = current_request()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+    with _lock:
+        POOL_WAIT.observe((), seconds)
+
+
+def record_request(method, route, status, duration, stats):
+    stats.finished = True
+    python_seconds = max(duration - stats.db_seconds - stats.pool_wait_seconds, 0.0)
+    with _lock:
+        REQUEST_DURATION.observe((method, route, str(status)), duration)
+        REQUEST_DB_SECONDS.observe((method, route), stats.db_seconds)
+        REQUEST_PYTHON_SECONDS.observe((method, route), python_seconds)
+        REQUEST_POOL_WAIT_SECONDS.observe((method, route), stats.pool_wait_seconds)
+        REQUEST_QUERIES.observe((method, route), stats.queries)
+        DB_QUERIES.inc((route,), stats.queries)
+        DB_SECONDS.inc((route,), stats.db_seconds)
+
+
+def render(pool_stats=None):
+    lines = []
+    with _lock:
+        for metric in _METRICS:
+            metric.render(lines)
+    for key, value in (pool_stats or {}).items():
+        name = f"db_pool_{key}"
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentedCursor:
+    """pymysql 커서를 감싸 실행/읽기 시간을 현재 요청의 RequestStats 에 더한다"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed_query(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_query(time.perf_counter() - start)
+
+    def _timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_db_time(time.perf_counter() - start)
+
+    def execute(self, query, args=None):
+        return self._timed_query(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed_query(self._cursor.executemany, query, args)
+
+    def callproc(self, procname, args=()):
+        return self._timed_query(self._cursor.callproc, procname, args)
+
+    def fetchone(self):
+        return self._timed_fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(self._cursor.fetchall)
+
+    def nextset(self):
+        return self._timed_fetch(self._cursor.nextset)
+
+    def __iter__(self):
+        # SSCursor 는 반복하면서 서버에서 행을 읽으므로 fetchone 으로 시간을 잰다
+        return iter(self.fetchone, None)
+
+
+class MetricsMiddleware:
+    """순수 ASGI 미들웨어. 마지막 응답 바이트를 보낸 시점까지를 요청 시간으로 본다 (BackgroundTasks 제외)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        state = {"status": 500, "recorded": False}
+
+        def finish():
+            if state["recorded"]:
+                return
+            state["recorded"] = True
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            record_request(scope["method"], path, state["status"], time.perf_counter() - start, stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _current.reset(token)
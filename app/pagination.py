@@ -0,0 +1,55 @@
+"""목록 조회 엔드포인트 공통 처리: 기본 키 기준 keyset 페이지네이션과 열 선택(projection)
+
+- after: 이전 페이지 응답의 X-Next-Cursor 값. key 열이 이 값보다 큰 행부터 돌려준다.
+- limit: 페이지 크기. 없으면 기존처럼 전체를 돌려준다.
+- fields: 쉼표로 구분한 열 이름. key 열은 다음 커서를 만들 수 있도록 항상 포함한다.
+- include_total: 필터 조건에 맞는 전체 행 수를 X-Total-Count 헤더로 돌려준다.
+"""
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def select_columns(fields, allowed, key):
+    """fields 를 검증해 SELECT 할 열 목록을 만든다 (key 열이 맨 앞)"""
+    if not fields:
+        return list(allowed)
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return [key] + [field for field in dict.fromkeys(requested) if field != key]
+
+
+def fetch_page(cur, response, table, columns, key, conditions=(), params=(),
+               after=None, limit=None, include_total=False):
+    """conditions(AND 로 묶을 WHERE 조건)에 맞는 행을 key 순서로 한 페이지 조회해 dict 목록으로 돌려준다
+
+    table / columns / key / conditions 는 호출하는 쪽에서 고정한 값만 넘겨야 한다 (SQL 에 그대로 들어간다).
+    다음 페이지가 있으면 response 에 X-Next-Cursor 헤더를 붙인다.
+    """
+    conditions = list(conditions)
+    params = list(params)
+
+    if include_total:
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cur.execute(f"SELECT COUNT(*) FROM {table}{where}", tuple(params))
+        response.headers[TOTAL_COUNT_HEADER] = str(cur.fetchone()[0])
+
+    if after is not None:
+        conditions.append(f"{key} > %s")
+        params.append(after)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY {key}"
+    if limit is not None:
+        # 한 행 더 읽어서 다음 페이지가 있는지 확인한다
+        sql += " LIMIT %s"
+        params.append(limit + 1)
+    cur.execute(sql, tuple(params))
+    rows = cur.fetchall()
+
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1][columns.index(key)])
+    return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,89 @@
+"""bcrypt 해싱/검증 전용 워커 풀
+
+bcrypt 한 번에 100 ~ 300ms 의 CPU 를 쓰므로 이벤트 루프에서 직접 호출하면 그동안 다른 요청을
+처리하지 못한다. 크기가 정해진 스레드 풀에서 실행하고, 대기열이 가득 차면 바로 거절해서
+로그인이 몰려도 출발 시각 조회 같은 다른 요청이 밀리지 않게 한다.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+from settings import PASSWORD_HASHER_MAX_WORKERS, PASSWORD_HASHER_MAX_QUEUE
+
+
+class PasswordHasherBusy(Exception):
+    """실행 중 + 대기 중인 작업이 한도를 넘은 경우"""
+
+
+class PasswordHasher:
+    def __init__(self, context, max_workers=2, max_queue=32):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self._context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+
+        self._pending = 0  # 제출했지만 끝나지 않은 작업 (실행 중 + 대기 중)
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_pending = 0
+
+    def _run(self, func, args, submitted_at):
+        started_at = time.monotonic()
+        with self._lock:
+            self._running += 1
+            self._wait_seconds += started_at - submitted_at
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.monotonic()
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+                self._run_seconds += finished_at - started_at
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PasswordHasherBusy("Too many password operations in progress")
+            self._pending += 1
+            self._max_pending = max(self._max_pending, self._pending)
+        try:
+            future = self._executor.submit(self._run, func, args, time.monotonic())
+        except RuntimeError:
+            # executor 가 종료된 경우
+            with self._lock:
+                self._pending -= 1
+            raise
+        return await asyncio.wrap_future(future)
+
+    async def verify(self, plain_password, hashed_password):
+        return await self._submit(self._context.verify, plain_password, hashed_password)
+
+    async def hash(self, plain_password):
+        return await self._submit(self._context.hash, plain_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "max_pending": self._max_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_seconds": self._wait_seconds / self._completed if self._completed else 0.0,
+                "avg_run_seconds": self._run_seconds / self._completed if self._completed else 0.0,
+            }
@@ -0,0 +1,266 @@
+"""쿼리 추적과 느린 쿼리 로그 (QUERY_TRACE_ENABLED=1 일 때만 사용)
+
+get_db_connection 이 나눠 주는 커서를 TracingCursor 로 한 번 더 감싸서 문장마다 실행 시간과 행 수를
+현재 요청의 QueryTrace 에 남긴다.
+
+- QUERY_TRACE_SLOW_MS 이상 걸린 문장은 EXPLAIN 결과와 함께 WARNING 으로 남기고 최근 목록에 보관한다.
+- 한 요청 안에서 같은 모양(리터럴/플레이스홀더를 지운 SQL)의 문장이 QUERY_TRACE_N_PLUS_ONE_THRESHOLD 번
+  이상 실행되면 N+1 패턴으로 보고 요청이 끝날 때 WARNING 으로 남긴다.
+- 요청 밖(BackgroundTasks 등)에서 쓰인 커서는 커서 하나를 추적 단위로 본다.
+"""
+from collections import deque
+from contextvars import ContextVar
+import json
+import logging
+import re
+import threading
+import time
+
+from settings import (
+    QUERY_TRACE_SLOW_MS, QUERY_TRACE_EXPLAIN, QUERY_TRACE_N_PLUS_ONE_THRESHOLD,
+    QUERY_TRACE_MAX_STATEMENTS, QUERY_TRACE_RECENT_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(sql):
+    """리터럴과 플레이스홀더를 ? 로 바꾸고 IN (?, ?, ...) 목록과 공백을 접은 SQL"""
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = shape.replace("%s", "?")
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class StatementRecord:
+    __slots__ = ("shape", "sql", "args", "seconds", "rows", "plan")
+
+    def __init__(self, shape, sql, args, seconds, rows):
+        self.shape = shape
+        self.sql = sql
+        self.args = args
+        self.seconds = seconds
+        self.rows = rows
+        self.plan = None
+
+    def to_dict(self):
+        return {
+            "sql": _WHITESPACE.sub(" ", self.sql).strip(),
+            "duration_ms": round(self.seconds * 1000, 3),
+            "rows": self.rows,
+            "plan": self.plan,
+        }
+
+
+class QueryTrace:
+    """추적 단위(요청 또는 요청 밖의 커서 하나)에서 실행된 문장 목록"""
+
+    def __init__(self, label, scope=None):
+        self._label = label
+        self._scope = scope
+        self.statements = []  # 최대 QUERY_TRACE_MAX_STATEMENTS 개까지만 보관
+        self.dropped = 0
+        self.shapes = {}  # shape -> [실행 횟수, 총 시간]
+        self.total_seconds = 0.0
+
+    @property
+    def label(self):
+        # 라우팅이 끝난 뒤에는 경로 대신 라우트 템플릿으로 표시한다
+        route = self._scope.get("route") if self._scope is not None else None
+        if getattr(route, "path", None):
+            return f"{self._scope['method']} {route.path}"
+        return self._label
+
+    def add(self, record):
+        counter = self.shapes.get(record.shape)
+        if counter is None:
+            counter = self.shapes[record.shape] = [0, 0.0]
+        counter[0] += 1
+        counter[1] += record.seconds
+        self.total_seconds += record.seconds
+        if len(self.statements) < QUERY_TRACE_MAX_STATEMENTS:
+            self.statements.append(record)
+        else:
+            self.dropped += 1
+
+    def repeated_shapes(self):
+        return [
+            (shape, count, seconds)
+            for shape, (count, seconds) in self.shapes.items()
+            if count >= QUERY_TRACE_N_PLUS_ONE_THRESHOLD
+        ]
+
+    def finish(self):
+        for shape, count, seconds in self.repeated_shapes():
+            logger.warning(
+                "possible N+1 in %s: statement executed %d times (%.1f ms total): %s",
+                self.label, count, seconds * 1000, shape,
+            )
+            _remember({
+                "kind": "n_plus_one",
+                "label": self.label,
+                "shape": shape,
+                "count": count,
+                "duration_ms": round(seconds * 1000, 3),
+            })
+        if logger.isEnabledFor(logging.DEBUG) and self.shapes:
+            logger.debug(
+                "%s: %d statements (%d shapes), %.1f ms in database",
+                self.label, sum(count for count, _ in self.shapes.values()), len(self.shapes),
+                self.total_seconds * 1000,
+            )
+
+
+_current = ContextVar("query_trace", default=None)
+
+_recent_lock = threading.Lock()
+_recent = deque(maxlen=QUERY_TRACE_RECENT_SIZE)
+
+
+def _remember(entry):
+    entry["at"] = time.time()
+    with _recent_lock:
+        _recent.append(entry)
+
+
+def recent():
+    """최근 느린 쿼리 / N+1 기록 (오래된 것부터)"""
+    with _recent_lock:
+        return list(_recent)
+
+
+def explain(conn, sql, args):
+    """같은 커넥션의 별도 커서로 EXPLAIN 을 실행해 [{열: 값}, ...] 으로 돌려준다"""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN " + sql, args)
+            columns = [column[0] for column in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+
+class TracingCursor:
+    """커서를 감싸 문장별 실행 시간/행 수를 QueryTrace 에 남긴다
+
+    버퍼링 커서는 느린 문장 직후에 EXPLAIN 을 실행하고, 결과를 읽는 중에는 같은 커넥션으로
+    다른 문장을 보낼 수 없는 스트리밍 커서(SSCursor)는 close() 시점에 몰아서 실행한다.
+    """
+
+    def __init__(self, cursor, conn, unbuffered=False):
+        self._cursor = cursor
+        self._conn = conn
+        self._unbuffered = unbuffered
+        self._last = None
+        self._deferred = []
+        self._own_trace = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _trace(self):
+        trace = _current.get()
+        if trace is None:
+            if self._own_trace is None:
+                self._own_trace = QueryTrace("(outside request)")
+            trace = self._own_trace
+        return trace
+
+    def _record(self, call, sql, explain_args):
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            seconds = time.perf_counter() - start
+            rows = 0 if self._unbuffered else self._cursor.rowcount
+            record = StatementRecord(statement_shape(sql), sql, explain_args, seconds, rows)
+            self._last = record
+            trace = self._trace()
+            trace.add(record)
+            if seconds * 1000 >= QUERY_TRACE_SLOW_MS:
+                if self._unbuffered:
+                    self._deferred.append((trace.label, record))
+                else:
+                    self._report_slow(trace.label, record)
+
+    def _report_slow(self, label, record):
+        if QUERY_TRACE_EXPLAIN:
+            record.plan = explain(self._conn, record.sql, record.args)
+        logger.warning(
+            "slow query in %s (%.1f ms, %d rows): %s%s",
+            label, record.seconds * 1000, record.rows, _WHITESPACE.sub(" ", record.sql).strip(),
+            "" if record.plan is None else "\nplan: " + json.dumps(record.plan, ensure_ascii=False, default=str),
+        )
+        entry = record.to_dict()
+        entry["kind"] = "slow_query"
+        entry["label"] = label
+        _remember(entry)
+
+    def _count_rows(self, result, many):
+        if self._unbuffered and self._last is not None and result is not None:
+            self._last.rows += len(result) if many else 1
+        return result
+
+    def execute(self, query, args=None):
+        return self._record(lambda: self._cursor.execute(query, args), query, args)
+
+    def executemany(self, query, args):
+        # 다중 행 INSERT 는 첫 행으로 EXPLAIN 한다
+        return self._record(lambda: self._cursor.executemany(query, args), query, args[0] if args else None)
+
+    def callproc(self, procname, args=()):
+        placeholders = ", ".join(["%s"] * len(args))
+        return self._record(lambda: self._cursor.callproc(procname, args), f"CALL {procname}({placeholders})", None)
+
+    def fetchone(self):
+        return self._count_rows(self._cursor.fetchone(), False)
+
+    def fetchmany(self, size=None):
+        return self._count_rows(self._cursor.fetchmany(size), True)
+
+    def fetchall(self):
+        return self._count_rows(self._cursor.fetchall(), True)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        try:
+            self._cursor.close()
+        finally:
+            deferred, self._deferred = self._deferred, []
+            for label, record in deferred:
+                self._report_slow(label, record)
+            if self._own_trace is not None:
+                self._own_trace.finish()
+                self._own_trace = None
+
+
+class QueryTraceMiddleware:
+    """요청마다 QueryTrace 를 contextvar 에 넣고, 응답이 끝나면 N+1 패턴을 보고한다"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace(f"{scope['method']} {scope['path']}", scope)
+        token = _current.set(trace)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            trace.finish()
+            _current.reset(token)
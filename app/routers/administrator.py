@@ -1,49 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from typing import List
-from database import mysql_create_session, get_db_connection
+from database import get_db_connection
 from datetime import timedelta
-from auth import verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, pwd_context
+from auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, password_hasher
+from password_hasher import PasswordHasherBusy
 
 from schemas import Administrator, AdministratorCreate, AdministratorUpdate
 import pymysql
 
 router = APIRouter()
 
-# 관리자 로그인
-@router.post("/administrator/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+# pymysql 호출은 블로킹이므로 이벤트 루프 밖(스레드 풀)에서 실행한다
+def _fetch_password(username: str):
     with get_db_connection() as (conn, cur):
-        try:
-            sql = "SELECT password FROM administrator WHERE name = %s"
-            cur.execute(sql, (form_data.username,))
+        sql = "SELECT password FROM administrator WHERE name = %s"
+        cur.execute(sql, (username,))
+        return cur.fetchone()
 
-            from_db = cur.fetchone()
-            password_from_db = from_db[0]
+def _insert_administrator(name: str, hashed_password: str):
+    with get_db_connection() as (conn, cur):
+        try:
+            sql = "INSERT INTO administrator (name, password) VALUES (%s, %s)"
+            cur.execute(sql, (name, hashed_password))  # 해싱된 비밀번호 저장
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
-            print(password_from_db)
+# 관리자 로그인
+@router.post("/administrator/login")
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    try:
+        from_db = await run_in_threadpool(_fetch_password, form_data.username)
+        password_from_db = from_db[0]
 
-            if not verify_password(form_data.password, password_from_db):
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+        if not await password_hasher.verify(form_data.password, password_from_db):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
 
-            access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-            access_token = create_access_token(data={"sub": form_data.username}, expires_delta=access_token_expires)
-            return {"access_token": access_token, "token_type": "bearer"}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        access_token = create_access_token(data={"sub": form_data.username}, expires_delta=access_token_expires)
+        return {"access_token": access_token, "token_type": "bearer"}
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # 관리자 회원가입
 @router.post("/administrator/signup")
 async def signup(administrator: AdministratorCreate):
-    with get_db_connection() as (conn, cur):
-        try:
-            # 비밀번호 해싱
-            hashed_password = pwd_context.hash(administrator.password)
-            
-            sql = "INSERT INTO administrator (name, password) VALUES (%s, %s)"
-            cur.execute(sql, (administrator.name, hashed_password))  # 해싱된 비밀번호 저장
-            conn.commit()
-            return {"message": "Administrator created successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    try:
+        # 비밀번호 해싱
+        hashed_password = await password_hasher.hash(administrator.password)
+
+        await run_in_threadpool(_insert_administrator, administrator.name, hashed_password)
+        return {"message": "Administrator created successfully"}
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
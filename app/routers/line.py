@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Depends
-from typing import List
-from database import mysql_create_session, get_db_connection
+from fastapi import APIRouter, Depends, HTTPException, Depends, BackgroundTasks, Query, Response
+from typing import List, Optional
+from database import get_db
 from auth import get_current_user
+from schedule_cache import schedule_cache
+import timetable_store
+from pagination import select_columns, fetch_page
+from settings import LIST_PAGE_MAX_SIZE
 from schemas import Line, LineCreate, LineUpdate
 import pymysql
 
@@ -9,75 +13,80 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-# 검색 없이 모든 호선 조회
-@router.get("/")
-def search_line():
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "SELECT * FROM line"
-            cur.execute(sql)
+LINE_COLUMNS = ("ID", "name", "route_shape")
 
-            columns = [column[0] for column in cur.description]
-            result = []
-            for row in cur.fetchall():
-                result.append(dict(zip(columns, row)))
-            return result
-        except pymysql.Error as e:
-            raise HTTPException(status_code=500, detail=str(e))
+# 검색 없이 모든 호선 조회 (ID 기준 keyset 페이지네이션)
+@router.get("/")
+def search_line(response: Response, after: Optional[int] = None,
+                limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX_SIZE),
+                fields: Optional[str] = None, include_total: bool = False, db=Depends(get_db)):
+    conn, cur = db
+    columns = select_columns(fields, LINE_COLUMNS, "ID")
+    try:
+        return fetch_page(cur, response, "line", columns, "ID",
+                          after=after, limit=limit, include_total=include_total)
+    except pymysql.Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # 호선 생성
 @router.post("/")
-def create_line(line: LineCreate):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "INSERT INTO line (name, route_shape) VALUES (%s, %s)"
-            cur.execute(sql, (line.name, line.route_shape))
-            conn.commit()
-            return {"message": "Line created successfully"}
-        except pymysql.Error as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+def create_line(line: LineCreate, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "INSERT INTO line (name, route_shape) VALUES (%s, %s)"
+        cur.execute(sql, (line.name, line.route_shape))
+        conn.commit()
+        return {"message": "Line created successfully"}
+    except pymysql.Error as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 # 호선 수정
 @router.put("/{line_id}")
-def update_line(line_id: int, line: LineUpdate):
-    with get_db_connection() as (conn, cur):
-        try:
-            updates = []
-            params = []
+def update_line(line_id: int, line: LineUpdate, background_tasks: BackgroundTasks, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        updates = []
+        params = []
+        
+        if line.route_shape:
+            updates.append("route_shape = %s")
+            params.append(line.route_shape)
+        if line.name:
+            updates.append("name = %s")
+            params.append(line.name)
+            
+        if not updates:  # 업데이트할 필드가 없는 경우
+            raise HTTPException(status_code=400, detail="No fields to update")
             
-            if line.route_shape:
-                updates.append("route_shape = %s")
-                params.append(line.route_shape)
-            if line.name:
-                updates.append("name = %s")
-                params.append(line.name)
-                
-            if not updates:  # 업데이트할 필드가 없는 경우
-                raise HTTPException(status_code=400, detail="No fields to update")
-                
-            sql = f"UPDATE line SET {', '.join(updates)} WHERE ID = %s"
-            params.append(line_id)
+        sql = f"UPDATE line SET {', '.join(updates)} WHERE ID = %s"
+        params.append(line_id)
+        
+        cur.execute(sql, tuple(params))
+        if line.route_shape and cur.rowcount:
+            timetable_store.mark_stale(cur, [line_id])
             
-            cur.execute(sql, tuple(params))
-                
-            conn.commit()
-            return {"message": "Line updated successfully"}
-        except pymysql.Error as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+        conn.commit()
+        if line.route_shape:  # 노선 형태가 바뀌면 히스토그램 계산 방식이 달라진다
+            schedule_cache.invalidate_line(line_id)
+            background_tasks.add_task(timetable_store.rebuild_lines, [line_id])
+        return {"message": "Line updated successfully"}
+    except pymysql.Error as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 # 호선 삭제
 @router.delete("/{line_id}")
-def delete_line(line_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "DELETE FROM line WHERE ID = %s"
-            cur.execute(sql, (line_id,))
-            conn.commit()
-            return {"message": "Line deleted successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+def delete_line(line_id: int, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "DELETE FROM line WHERE ID = %s"
+        cur.execute(sql, (line_id,))
+        conn.commit()
+        schedule_cache.invalidate_line(line_id)
+        return {"message": "Line deleted successfully"}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,34 +1,86 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
 import csv
+import codecs
+import itertools
 from fastapi.responses import StreamingResponse
-from io import StringIO, BytesIO
-from database import get_db_connection
+from database import get_db, get_db_connection, execute_many
 from datetime import datetime, timedelta, time
-from schemas import StationCreate, ETACreate, GarageCreate, CongestionCreate, PlatformCreate
+from schemas import StationCreate, ETACreate, GarageCreate
 from pydantic import ValidationError
 import pymysql
 from fastapi.responses import Response
 from auth import get_current_user
+from schedule_cache import schedule_cache
+import timetable_store
+import snapshot
+from settings import DATABASE_INSERT_CHUNK_SIZE, CONGESTION_STORAGE
+from histogram import BASE_SECONDS, pack_profile, unpack_profiles
+import congestion_store
 
 
 router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
+def changed_station_lines(cur, line_id, station_ranges):
+    """역/소요시간을 바꾼 뒤 입력이 달라지는 노선 목록
+
+    히스토그램은 eta 를 노선 경계 너머까지 LEAD 로 참조하므로 역 ID 구간이 이웃한 노선도 포함한다.
+    station_ranges 는 바뀌기 전후의 (최소 역 ID, 최대 역 ID) 목록이고 비어 있는 구간은 (None, None) 이다.
+    """
+    ranges = [r for r in station_ranges if r and r[0] is not None]
+    changed_lines = {line_id}
+    if ranges:
+        low = min(r[0] for r in ranges)
+        high = max(r[1] for r in ranges)
+        changed_lines.update(timetable_store.lines_near_stations(cur, low, high))
+    return sorted(changed_lines)
+
+
+def iter_csv_rows(file: UploadFile, encoding='euc-kr', chunk_size=64 * 1024):
+    """업로드 파일을 chunk_size 바이트씩 읽어 점진적으로 디코딩하고 (줄 번호, 행) 을 내보낸다
+
+    멀티바이트 문자가 청크 경계에 걸쳐도 incremental decoder 가 이어서 디코딩하므로
+    파일 전체를 메모리에 올리지 않는다. 첫 번째로 내보내는 값은 헤더 (0, fieldnames) 이다.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    state = {"line": 0}
+
+    def lines():
+        pending = ''
+        while True:
+            chunk = file.file.read(chunk_size)
+            try:
+                text = pending + decoder.decode(chunk, final=not chunk)
+            except UnicodeDecodeError as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid {encoding} encoding after line {state['line']}: {str(e)}"
+                )
+            if not chunk:
+                if text:
+                    yield text
+                return
+            parts = text.split('\n')
+            pending = parts.pop()
+            for part in parts:
+                yield part + '\n'
+
+    csv_reader = csv.DictReader(lines())
+    yield 0, csv_reader.fieldnames or []
+    for row in csv_reader:
+        state["line"] = csv_reader.line_num
+        yield csv_reader.line_num, row
+
+
 @router.post("/{line_id}/import/stations")
-async def upload_stations(line_id: int, file: UploadFile = File(...)):
+def upload_stations(line_id: int, background_tasks: BackgroundTasks, file: UploadFile = File(...), db=Depends(get_db)):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
-    
-    content = await file.read()
 
     # encoding = detect(content).get('encoding', 'utf-8')
     encoding = 'euc-kr'
 
-    text = content.decode(encoding)
-    csv_file = StringIO(text)
-    csv_reader = csv.DictReader(csv_file)
-
     def convert_time_format(time_str):
         try:
             # 입력값이 "분:초" 형식이라고 가정
@@ -39,85 +91,112 @@ async def upload_stations(line_id: int, file: UploadFile = File(...)):
         except (ValueError, TypeError):
             raise HTTPException(status_code=400, detail=f"Invalid time format: {time_str}")
 
-    with get_db_connection() as (conn, cur):
-        try:
-            # 해당 Line의 기존 데이터 삭제
-            cur.execute("DELETE FROM garage WHERE line_ID = %s", (line_id,))
-            cur.execute("DELETE FROM eta WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
-            cur.execute("DELETE FROM station WHERE line_ID = %s", (line_id,))
-
-            for index, row in enumerate(csv_reader):
-                try:
-                    station_id = int(row.get('역번호'))
-                    station_name = row.get('역명')
-                    eta_str = row.get('소요시간')
-
-                    if not all([station_id, station_name, eta_str]):
-                        raise HTTPException(status_code=400, detail="Missing required fields")
-
-                    # Station 데이터 검증
-                    station_data = StationCreate(
-                        name=station_name,
-                        line_ID=line_id
-                    )
-
-                    # 시간 형식 변환
-                    formatted_eta = convert_time_format(eta_str)
-
-                    # ETA 데이터 검증
-                    eta_data = ETACreate(
-                        station_ID=station_id,
-                        ET=formatted_eta
-                    )
-
-                    # Station 삽입
-                    cur.execute(
-                        "INSERT INTO station (ID, name, line_ID) VALUES (%s, %s, %s)",
-                        (station_id, station_data.name, station_data.line_ID)
-                    )
-                    
-                    # ETA 삽입
-                    cur.execute(
-                        "INSERT INTO eta (station_ID, ET) VALUES (%s, %s)",
-                        (eta_data.station_ID, eta_data.ET.strftime('%H:%M:%S'))
-                    )
-
-                    # 첫 번째 역을 Garage로 설정
-                    if index == 0:
-                        garage_data = GarageCreate(
-                            line_ID=line_id,
-                            station_ID=station_id
-                        )
-                        cur.execute(
-                            "INSERT INTO garage (line_ID, station_ID) VALUES (%s, %s)",
-                            (garage_data.line_ID, garage_data.station_ID)
-                        )
-
-                except ValidationError as e:
-                    raise HTTPException(status_code=400, detail=f"Validation error: {str(e)}")
+    conn, cur = db
+    station_rows = []
+    eta_rows = []
+
+    def flush():
+        # Station 을 먼저 삽입해야 ETA 외래 키가 맞는다
+        execute_many(cur, "INSERT INTO station (ID, name, line_ID) VALUES (%s, %s, %s)", station_rows)
+        execute_many(cur, "INSERT INTO eta (station_ID, ET) VALUES (%s, %s)", eta_rows)
+        station_rows.clear()
+        eta_rows.clear()
+
+    try:
+        cur.execute("SELECT MIN(ID), MAX(ID) FROM station WHERE line_ID = %s", (line_id,))
+        station_ranges = [cur.fetchone()]
+
+        # 해당 Line의 기존 데이터 삭제
+        cur.execute("DELETE FROM garage WHERE line_ID = %s", (line_id,))
+        cur.execute("DELETE FROM eta WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+        cur.execute("DELETE FROM station WHERE line_ID = %s", (line_id,))
+
+        garage_station_id = None
+        low = high = None
+        rows = iter_csv_rows(file, encoding)
+        next(rows)  # 헤더
+        for line_number, row in rows:
+            try:
+                station_id = int(row.get('역번호'))
+                station_name = row.get('역명')
+                eta_str = row.get('소요시간')
+
+                if not all([station_id, station_name, eta_str]):
+                    raise HTTPException(status_code=400, detail=f"Line {line_number}: Missing required fields")
+
+                # Station 데이터 검증
+                station_data = StationCreate(
+                    name=station_name,
+                    line_ID=line_id
+                )
 
-            conn.commit()
-            return {"message": "Stations and ETAs uploaded successfully"}
-        except Exception as e:
-            conn.rollback()
-            if isinstance(e, pymysql.Error):
-                raise HTTPException(status_code=400, detail=str(e))
-            else:
-                raise HTTPException(status_code=500, detail=str(e))
+                # 시간 형식 변환
+                formatted_eta = convert_time_format(eta_str)
+
+                # ETA 데이터 검증
+                eta_data = ETACreate(
+                    station_ID=station_id,
+                    ET=formatted_eta
+                )
+            except HTTPException as e:
+                if e.detail.startswith("Line "):
+                    raise
+                raise HTTPException(status_code=400, detail=f"Line {line_number}: {e.detail}")
+            except (ValidationError, ValueError, TypeError) as e:
+                raise HTTPException(status_code=400, detail=f"Line {line_number}: Validation error: {str(e)}")
+
+            station_rows.append((station_id, station_data.name, station_data.line_ID))
+            eta_rows.append((eta_data.station_ID, eta_data.ET.strftime('%H:%M:%S')))
+
+            # 첫 번째 역을 Garage로 설정
+            if garage_station_id is None:
+                garage_station_id = station_id
+            low = station_id if low is None else min(low, station_id)
+            high = station_id if high is None else max(high, station_id)
+
+            if len(station_rows) >= DATABASE_INSERT_CHUNK_SIZE:
+                flush()
+        flush()
+
+        if garage_station_id is not None:
+            garage_data = GarageCreate(
+                line_ID=line_id,
+                station_ID=garage_station_id
+            )
+            cur.execute(
+                "INSERT INTO garage (line_ID, station_ID) VALUES (%s, %s)",
+                (garage_data.line_ID, garage_data.station_ID)
+            )
+
+        station_ranges.append((low, high))
+        changed_lines = changed_station_lines(cur, line_id, station_ranges)
+        timetable_store.mark_stale(cur, changed_lines, data_changed=True)
+
+        conn.commit()
+        for changed_line in changed_lines:
+            schedule_cache.invalidate_line(changed_line)
+        # 스냅샷을 먼저 게시해야 시간표 재계산도 스냅샷에서 읽는다
+        background_tasks.add_task(snapshot.rebuild_in_background)
+        background_tasks.add_task(timetable_store.rebuild_lines, changed_lines)
+        return {"message": "Stations and ETAs uploaded successfully"}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        if isinstance(e, pymysql.Error):
+            raise HTTPException(status_code=400, detail=str(e))
+        else:
+            raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/{line_id}/import/congestion")
-async def upload_congestion(line_id: int, file: UploadFile = File(...)):
+def upload_congestion(line_id: int, background_tasks: BackgroundTasks, file: UploadFile = File(...), db=Depends(get_db)):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
-    
-    content = await file.read()
+
     # encoding = detect(content).get('encoding', 'utf-8')
     encoding = 'euc-kr'
-    
-    text = content.decode(encoding)
-    csv_file = StringIO(text)
-    csv_reader = csv.DictReader(csv_file)
 
     def convert_time_format(time_str: str) -> str:
         try:
@@ -128,238 +207,319 @@ async def upload_congestion(line_id: int, file: UploadFile = File(...)):
         except (ValueError, TypeError):
             raise HTTPException(status_code=400, detail=f"Invalid time format: {time_str}")
 
-    with get_db_connection() as (conn, cur):
-        try:
-            # 해당 Line의 기존 데이터 삭제
-            cur.execute("""
-                DELETE FROM congestion 
-                WHERE platform_station_ID IN (
-                    SELECT ID FROM station WHERE line_ID = %s
-                )
-            """, (line_id,))
-            cur.execute("""
-                DELETE FROM platform 
-                WHERE station_ID IN (
-                    SELECT ID FROM station WHERE line_ID = %s
+    conn, cur = db
+    platform_rows = []
+    congestion_rows = []  # CONGESTION_STORAGE=profile 이면 승강장별 (역, bound_to, profile)
+    profile_storage = CONGESTION_STORAGE == congestion_store.STORAGE_PROFILE
+
+    def flush():
+        # 승강장을 먼저 삽입해야 혼잡도 외래 키가 맞는다
+        execute_many(cur, "INSERT INTO platform (station_ID, bound_to) VALUES (%s, %s)", platform_rows)
+        if profile_storage:
+            congestion_store.insert_profiles(cur, congestion_rows)
+        else:
+            congestion_store.insert_rows(cur, congestion_rows)
+        platform_rows.clear()
+        congestion_rows.clear()
+
+    try:
+        rows = iter_csv_rows(file, encoding)
+
+        # 시간대 컬럼은 헤더에서 한 번만 해석한다
+        _, fieldnames = next(rows)
+        time_slot_columns = [
+            (column, convert_time_format(column))
+            for column in fieldnames if ':' in column
+        ]
+        if profile_storage:
+            # profile 은 30분 격자 시간대 39개만 담는다
+            profile_index = []
+            for column, formatted_time in time_slot_columns:
+                hours, minutes, _ = map(int, formatted_time.split(':'))
+                index = congestion_store.PROFILE_INDEX.get(hours * 3600 + minutes * 60)
+                if index is None:
+                    raise HTTPException(status_code=400, detail=f"Unsupported time slot: {column}")
+                profile_index.append(index)
+
+        # 해당 Line의 기존 데이터 삭제
+        congestion_store.delete_line(cur, line_id)
+        cur.execute("""
+            DELETE FROM platform 
+            WHERE station_ID IN (
+                SELECT ID FROM station WHERE line_ID = %s
+            )
+        """, (line_id,))
+
+        # 행을 읽는 대로 검증하고 청크 단위로 다중 행 INSERT
+        for line_number, row in rows:
+            station_id = row.get('역번호')
+            try:
+                station_id = int(station_id)
+                bound_to = row['상하구분']
+
+                if bound_to == '하선' or bound_to == '외선':
+                    bound_to_value = 0
+                elif bound_to == '상선' or bound_to == '내선':
+                    bound_to_value = 1
+                else:
+                    raise ValueError(f"Invalid bound_to value: {bound_to}")
+
+                platform_rows.append((station_id, bound_to_value))
+
+                # 시간대별 혼잡도 데이터 처리
+                values = [0.0] * len(BASE_SECONDS)
+                for position, (column, formatted_time) in enumerate(time_slot_columns):
+                    congestion_value = float(row[column] or 0)
+                    if not 0 <= congestion_value <= 1:
+                        raise ValueError(f"congest_status must be between 0 and 1: {congestion_value}")
+                    if profile_storage:
+                        values[profile_index[position]] = congestion_value
+                    else:
+                        congestion_rows.append((station_id, bound_to_value, formatted_time, congestion_value))
+                if profile_storage:
+                    congestion_rows.append((station_id, bound_to_value, pack_profile(values)))
+
+            except (ValueError, TypeError, KeyError) as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Line {line_number}: Value error in row {station_id}: {str(e)}"
                 )
-            """, (line_id,))
 
-            for row in csv_reader:
-                try:
-                    station_id = int(row['역번호'])
-                    station_name = row['역명']
-                    bound_to = row['상하구분']
+            if len(congestion_rows) >= DATABASE_INSERT_CHUNK_SIZE:
+                flush()
+        flush()
+        timetable_store.mark_stale(cur, [line_id], data_changed=True)
+
+        conn.commit()
+        schedule_cache.invalidate_line(line_id)
+        background_tasks.add_task(snapshot.rebuild_in_background)
+        background_tasks.add_task(timetable_store.rebuild_lines, [line_id])
+        return {"message": "Congestion data uploaded successfully"}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        if isinstance(e, pymysql.Error):
+            raise HTTPException(status_code=400, detail="Database Bad Request")
+        else:
+            raise HTTPException(status_code=500, detail=str(e))
 
-                    if bound_to == '하선' or bound_to == '외선':
-                        bound_to_value = 0
-                    elif bound_to == '상선' or bound_to == '내선':
-                        bound_to_value = 1
-                    else:
-                        raise HTTPException(status_code=400, detail=f"Invalid bound_to value: {bound_to}")
-
-                    # Platform 데이터 검증
-                    platform_data = PlatformCreate(
-                        station_ID=station_id,
-                        bound_to=bound_to_value
-                    )
-
-                    # Platform 삽입
-                    cur.execute(
-                        "INSERT INTO platform (station_ID, bound_to) VALUES (%s, %s)", 
-                        (platform_data.station_ID, platform_data.bound_to)
-                    )
-
-                    # 시간대별 혼잡도 데이터 처리
-                    time_slots = [col for col in row.keys() if ':' in col]
-                    for time_slot in time_slots:
-                        congestion_value = float(row[time_slot] or 0)
-                        formatted_time = convert_time_format(time_slot)
-
-                        # Congestion 데이터 검증
-                        congestion_data = CongestionCreate(
-                            platform_station_ID=station_id,
-                            platform_bound_to=bound_to_value,
-                            time_slot=datetime.strptime(formatted_time, '%H:%M:%S').time(),
-                            congest_status=congestion_value
-                        )
-
-                        # Congestion 삽입
-                        cur.execute("""
-                            INSERT INTO congestion (
-                                platform_station_ID, 
-                                platform_bound_to, 
-                                time_slot, 
-                                congest_status
-                            ) VALUES (%s, %s, %s, %s)
-                        """, (
-                            congestion_data.platform_station_ID,
-                            congestion_data.platform_bound_to,
-                            congestion_data.time_slot.strftime('%H:%M:%S'),
-                            congestion_data.congest_status
-                        ))
-
-                except ValidationError as e:
-                    raise HTTPException(status_code=400, detail=f"Validation error: {str(e)}")
-                except ValueError as e:
-                    raise HTTPException(status_code=400, detail=f"Value error in row {station_id}: {str(e)}")
+def encode_csv_lines(lines, encoding='euc-kr', batch_size=500):
+    """CSV 행 문자열을 batch_size 줄씩 묶어 인코딩하며 내보낸다 (전체를 메모리에 모으지 않음)"""
+    buffer = []
+    first = True
+    for line in lines:
+        buffer.append(line if first else '\n' + line)
+        first = False
+        if len(buffer) >= batch_size:
+            yield ''.join(buffer).encode(encoding)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode(encoding)
+
+
+def congestion_time_slots():
+    """혼잡도 CSV 시간대 (5:30부터 0:30까지, 30분 간격), 자정 기준 초"""
+    return BASE_SECONDS.tolist()
 
-            conn.commit()
-            return {"message": "Congestion data uploaded successfully"}
-        except Exception as e:
-            conn.rollback()
-            if isinstance(e, pymysql.Error):
-                raise HTTPException(status_code=400, detail="Database Bad Request")
-            else:
-                raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{line_id}/export/stations")
-async def export_stations(line_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
+def export_stations(line_id: int):
+    def generate_lines():
+        # 응답을 보내는 동안 커서에서 한 행씩 읽어 바로 CSV 행으로 만든다
+        with get_db_connection(cursor=pymysql.cursors.SSCursor) as (conn, cur):
             # 해당 라인의 역 정보와 소요시간 조회
             cur.execute("""
-                SELECT s.ID, s.name, e.ET
+                SELECT s.ID, s.name, TIME_TO_SEC(e.ET)
                 FROM station s
                 LEFT JOIN eta e ON s.ID = e.station_ID
                 WHERE s.line_ID = %s
                 ORDER BY s.ID
             """, (line_id,))
-            
-            # CSV 행 생성
-            csv_rows = []
+
             # 헤더 추가
-            csv_rows.append(','.join(['역번호', '역명', '소요시간']))
-            
-            rows = cur.fetchall()
-            for row in rows:
-                et_time = row[2]
-                if isinstance(et_time, timedelta):
-                    total_seconds = int(et_time.total_seconds())
-                    hours, remainder = divmod(total_seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    et_time = time(hours, minutes, seconds)
-                
-                row_data = [
-                    str(row[0]),  # 역번호
-                    row[1],       # 역명
-                    et_time.strftime('%M:%S') if et_time else '00:00'  # 소요시간
-                ]
-                csv_rows.append(','.join(row_data))
-            
-            # 모든 행을 줄바꿈으로 연결하고 EUC-KR로 인코딩
-            csv_content = '\n'.join(csv_rows).encode('euc-kr')
-            
-            return Response(
-                content=csv_content,
-                media_type="application/octet-stream",
-                headers={
-                    'Content-Disposition': f'attachment; filename="stations_line_{line_id}.csv"',
-                    'Content-Type': 'application/octet-stream'
-                }
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            yield ','.join(['역번호', '역명', '소요시간'])
+
+            for station_id, station_name, et_seconds in cur:
+                if et_seconds:
+                    minutes, seconds = divmod(int(et_seconds) % 3600, 60)
+                    formatted_et = f"{minutes:02d}:{seconds:02d}"
+                else:
+                    formatted_et = '00:00'
+                yield ','.join([str(station_id), station_name, formatted_et])
+
+    return StreamingResponse(
+        encode_csv_lines(generate_lines()),
+        media_type="application/octet-stream",
+        headers={
+            'Content-Disposition': f'attachment; filename="stations_line_{line_id}.csv"',
+            'Content-Type': 'application/octet-stream'
+        }
+    )
 
 @router.get("/{line_id}/export/congestion")
-async def export_congestion(line_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            # 라인의 route_shape 조회
+def export_congestion(line_id: int):
+    time_slots = congestion_time_slots()
+    # LEFT(time_slot, 5) 와 같이 시:분 기준으로 열 위치를 찾는다
+    slot_index = {seconds // 60: index for index, seconds in enumerate(time_slots)}
+
+    def generate_lines():
+        # route_shape 조회와 혼잡도 스트리밍을 한 커넥션에서 한다
+        with get_db_connection(cursor=pymysql.cursors.SSCursor) as (conn, cur):
             cur.execute("SELECT route_shape FROM line WHERE ID = %s", (line_id,))
-            route_shape = cur.fetchone()[0]
-
-            # 시간대 생성 (5:30부터 0:30까지, 30분 간격)
-            time_slots = []
-            current_time = time(5, 30)
-            while current_time != time(0, 30):
-                time_slots.append(current_time)
-                hours = current_time.hour
-                minutes = current_time.minute + 30
-                if minutes >= 60:
-                    hours = (hours + 1) % 24
-                    minutes = 0
-                current_time = time(hours, minutes)
-            time_slots.append(time(0, 30))
-
-            csv_rows = []
+            rows = cur.fetchall()
+            if not rows:
+                raise HTTPException(status_code=404, detail="No Such Line ID")
+            route_shape = rows[0][0]
+
+            # route_shape에 따라 bound_to 표기 설정
+            if route_shape == 'CIRCULAR':
+                upper_label, lower_label = '내선', '외선'
+            else:
+                upper_label, lower_label = '상선', '하선'
+
             # CSV 헤더 작성
-            header = ['역번호', '역명', '상하구분'] + [t.strftime('%H:%M') for t in time_slots]
-            csv_rows.append(','.join(map(str, header)))
-            
-            # 해당 라인의 역 목록 조회
+            header = ['역번호', '역명', '상하구분'] + [f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}" for seconds in time_slots]
+            yield ','.join(map(str, header))
+
+            if CONGESTION_STORAGE == congestion_store.STORAGE_PROFILE:
+                # 승강장마다 한 행이므로 접을 필요 없이 profile 을 풀어 쓴다
+                cur.execute("""
+                    SELECT s.ID, s.name, p.bound_to, c.profile
+                    FROM station s
+                    JOIN platform p ON s.ID = p.station_ID
+                    LEFT JOIN congestion_profile c
+                        ON c.platform_station_ID = p.station_ID AND c.platform_bound_to = p.bound_to
+                    WHERE s.line_ID = %s
+                    ORDER BY s.ID, p.bound_to
+                """, (line_id,))
+                for station_id, station_name, bound_to, profile in cur:
+                    values = [0] * len(time_slots) if profile is None else unpack_profiles([profile])[0].tolist()
+                    yield ','.join(map(str, [station_id, station_name, upper_label if bound_to == 1 else lower_label] + values))
+                return
+
+            # 역, 승강장, 혼잡도를 한 번에 조회해 승강장 단위로 행을 접는다
             cur.execute("""
-                SELECT DISTINCT s.ID, s.name, p.bound_to
+                SELECT s.ID, s.name, p.bound_to, TIME_TO_SEC(c.time_slot), c.congest_status
                 FROM station s
                 JOIN platform p ON s.ID = p.station_ID
+                LEFT JOIN congestion c
+                    ON c.platform_station_ID = p.station_ID AND c.platform_bound_to = p.bound_to
                 WHERE s.line_ID = %s
-                ORDER BY s.ID, p.bound_to
+                ORDER BY s.ID, p.bound_to, c.time_slot
             """, (line_id,))
-            
-            stations = cur.fetchall()
-            
-            # 각 역의 혼잡도 데이터 조회 및 CSV 행 작성
-            for station in stations:
-                station_id, station_name, bound_to = station
-                # route_shape에 따라 bound_to_str 설정
-                if route_shape == 'CIRCULAR':
-                    bound_to_str = '내선' if bound_to == 1 else '외선'
-                else:
-                    bound_to_str = '상선' if bound_to == 1 else '하선'
-                
-                # MySQL의 올바른 시간 포맷 사용
-                cur.execute("""
-                    SELECT LEFT(time_slot, 5) as time_slot, congest_status
-                    FROM congestion
-                    WHERE platform_station_ID = %s AND platform_bound_to = %s
-                    ORDER BY time_slot
-                """, (station_id, bound_to))
-                
-                congestion_data = dict(cur.fetchall())
-                
-                # CSV 행 데이터 생성
-                row_data = [station_id, station_name, bound_to_str]
-                for slot in time_slots:
-                    formatted_slot = slot.strftime('%H:%M')
-                    row_data.append(congestion_data.get(formatted_slot, 0))
-                
-                csv_rows.append(','.join(map(str, row_data)))
-            
-            # 모든 행을 줄바꿈으로 연결하고 EUC-KR로 인코딩
-            csv_content = '\n'.join(csv_rows).encode('euc-kr')
-            
-            return Response(
-                content=csv_content,
-                media_type="application/octet-stream",
-                headers={
-                    'Content-Disposition': f'attachment; filename="congestion_line_{line_id}.csv"',
-                    'Content-Type': 'application/octet-stream'
-                }
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+
+            current = None
+            values = None
+            for station_id, station_name, bound_to, slot_seconds, congest_status in cur:
+                if current != (station_id, bound_to):
+                    if current is not None:
+                        yield ','.join(map(str, current_row + values))
+                    current = (station_id, bound_to)
+                    current_row = [station_id, station_name, upper_label if bound_to == 1 else lower_label]
+                    values = [0] * len(time_slots)
+                if slot_seconds is not None:
+                    index = slot_index.get(int(slot_seconds) // 60)
+                    if index is not None:
+                        values[index] = congest_status
+            if current is not None:
+                yield ','.join(map(str, current_row + values))
+
+    # 헤더까지 먼저 만들어 route_shape 조회 오류는 스트리밍 전에 응답한다
+    # (한 번 시작한 제너레이터는 응답이 끝나거나 끊기면 close 되어 커넥션을 반납한다)
+    lines = generate_lines()
+    try:
+        header = next(lines)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        encode_csv_lines(itertools.chain([header], lines)),
+        media_type="application/octet-stream",
+        headers={
+            'Content-Disposition': f'attachment; filename="congestion_line_{line_id}.csv"',
+            'Content-Type': 'application/octet-stream'
+        }
+    )
 
 
 @router.delete("/{line_id}/delete/stations")
-async def delete_stations(line_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            cur.execute("DELETE FROM garage WHERE line_ID = %s", (line_id,))
-            cur.execute("DELETE FROM eta WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
-            cur.execute("DELETE FROM station WHERE line_ID = %s", (line_id,))
-            conn.commit()
-            return {"message": "Stations deleted successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+def delete_stations(line_id: int, background_tasks: BackgroundTasks, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        cur.execute("SELECT MIN(ID), MAX(ID) FROM station WHERE line_ID = %s", (line_id,))
+        station_range = cur.fetchone()
+
+        cur.execute("DELETE FROM garage WHERE line_ID = %s", (line_id,))
+        cur.execute("DELETE FROM eta WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+        cur.execute("DELETE FROM station WHERE line_ID = %s", (line_id,))
+        changed_lines = changed_station_lines(cur, line_id, [station_range])
+        timetable_store.mark_stale(cur, changed_lines, data_changed=True)
+        conn.commit()
+        for changed_line in changed_lines:
+            schedule_cache.invalidate_line(changed_line)
+        background_tasks.add_task(snapshot.rebuild_in_background)
+        background_tasks.add_task(timetable_store.rebuild_lines, changed_lines)
+        return {"message": "Stations deleted successfully"}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{line_id}/delete/congestion")
-async def delete_congestion(line_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            cur.execute("DELETE FROM congestion WHERE platform_station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
-            cur.execute("DELETE FROM platform WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+def delete_congestion(line_id: int, background_tasks: BackgroundTasks, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        congestion_store.delete_line(cur, line_id)
+        cur.execute("DELETE FROM platform WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+        timetable_store.mark_stale(cur, [line_id], data_changed=True)
+        conn.commit()
+        schedule_cache.invalidate_line(line_id)
+        background_tasks.add_task(snapshot.rebuild_in_background)
+        background_tasks.add_task(timetable_store.rebuild_lines, [line_id])
+        return {"message": "Congestion data deleted successfully"}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# 모든 노선의 혼잡도를 storage 형식으로 옮긴다 (노선마다 커밋)
+# 1) 지금 읽지 않는 형식으로 옮기고 2) CONGESTION_STORAGE 를 바꿔 재시작한 뒤
+# 3) 같은 storage 에 drop_source=true 로 실행하면 더 이상 읽지 않는 이전 형식만 지운다
+@router.post("/migrate/congestion")
+def migrate_congestion(storage: str, background_tasks: BackgroundTasks, drop_source: bool = False,
+                       db=Depends(get_db)):
+    if storage not in congestion_store.STORAGES:
+        raise HTTPException(status_code=400, detail=f"Invalid storage: {storage}")
+    if drop_source and storage != CONGESTION_STORAGE:
+        raise HTTPException(status_code=400,
+                            detail=f"drop_source requires CONGESTION_STORAGE={storage} (the source is still being read)")
+    if not drop_source and storage == CONGESTION_STORAGE:
+        raise HTTPException(status_code=400, detail=f"{storage} is already the active congestion storage")
+    conn, cur = db
+    try:
+        cur.execute("SELECT ID FROM line ORDER BY ID")
+        line_ids = [row[0] for row in cur.fetchall()]
+
+        if drop_source:
+            # 읽고 있는 형식은 건드리지 않으므로 버전을 올릴 필요가 없다
+            source = next(other for other in congestion_store.STORAGES if other != storage)
+            for line_id in line_ids:
+                congestion_store.delete_storage(cur, line_id, source)
+                conn.commit()
+            return {"storage": storage, "lines": len(line_ids), "dropped": source}
+
+        platforms = 0
+        for line_id in line_ids:
+            platforms += congestion_store.migrate_line(cur, line_id, storage)
+            timetable_store.mark_stale(cur, [line_id], data_changed=True)
             conn.commit()
-            return {"message": "Congestion data deleted successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+            schedule_cache.invalidate_line(line_id)
+        background_tasks.add_task(snapshot.rebuild_in_background)
+        background_tasks.add_task(timetable_store.rebuild_lines, line_ids)
+        return {"storage": storage, "lines": len(line_ids), "platforms": platforms}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
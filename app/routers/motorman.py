@@ -1,7 +1,11 @@
 # app/routers/motorman.py
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from database import mysql_create_session, get_db_connection
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
+from database import get_db, insert_returning_ids
+from pagination import select_columns, fetch_page, TOTAL_COUNT_HEADER
+from settings import LIST_PAGE_MAX_SIZE, MOTORMAN_SEARCH_NGRAM_SIZE, MOTORMAN_SEARCH_DEFAULT_LIMIT
+from batch import batch_items, validate_items, raise_for_errors
+import pymysql
 
 from schemas import Motorman, MotormanCreate, MotormanUpdate
 from auth import get_current_user
@@ -10,61 +14,138 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
+MOTORMAN_COLUMNS = ("ID", "name")
+MOTORMAN_NAME_MAX_LENGTH = 50  # motorman.name VARCHAR(50)
+
+# FULLTEXT 인덱스가 없는 테이블에 MATCH 를 쓴 경우
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+
+
+def _like_escape(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _name_search_query(term):
+    """검색어에 맞는 (WHERE 조건, 조건 인자, ORDER BY, 정렬 인자)
+
+    - ngram 토큰보다 짧은 검색어(한 글자 성 등)는 FULLTEXT 로 찾을 수 없으므로 LIKE '%검색어%' 로 찾는다.
+    - 그 외에는 ngram FULLTEXT 인덱스에서 검색어 전체를 구(phrase)로 찾는다 (LIKE '%검색어%' 와 같은 결과).
+    두 경우 모두 완전 일치, 앞부분 일치 순으로 정렬한다.
+    """
+    prefix = _like_escape(term) + "%"
+    if len(term) < MOTORMAN_SEARCH_NGRAM_SIZE:
+        # 짧은 검색어는 전체를 훑지만 limit 까지만 정렬해서 읽는다
+        return "name LIKE %s", ["%" + prefix], "name = %s DESC, name LIKE %s DESC, name, ID", [term, prefix]
+    phrase = '"' + term.replace('"', ' ') + '"'
+    match = "MATCH(name) AGAINST (%s IN BOOLEAN MODE)"
+    return match, [phrase], f"name = %s DESC, name LIKE %s DESC, {match} DESC, ID", [term, prefix, phrase]
+
+
+def _search_by_name(cur, response, term, columns, limit, include_total):
+    condition, params, order, order_params = _name_search_query(term)
+    try:
+        if include_total:
+            cur.execute(f"SELECT COUNT(*) FROM motorman WHERE {condition}", tuple(params))
+            response.headers[TOTAL_COUNT_HEADER] = str(cur.fetchone()[0])
+        sql = f"SELECT {', '.join(columns)} FROM motorman WHERE {condition} ORDER BY {order}"
+        args = params + order_params
+        if limit is not None:
+            sql += " LIMIT %s"
+            args.append(limit)
+        cur.execute(sql, tuple(args))
+    except pymysql.Error as e:
+        if e.args[0] != ER_FT_MATCHING_KEY_NOT_FOUND:
+            raise
+        # name_ngram_idx 가 아직 없는 DB 는 예전처럼 전체를 훑는다
+        sql = f"SELECT {', '.join(columns)} FROM motorman WHERE name LIKE %s ORDER BY name LIKE %s DESC, ID"
+        args = ["%" + _like_escape(term) + "%", _like_escape(term) + "%"]
+        if limit is not None:
+            sql += " LIMIT %s"
+            args.append(limit)
+        cur.execute(sql, tuple(args))
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+# 이름으로 기관사 조회
+# 이름 검색은 관련도 순으로 limit(기본 MOTORMAN_SEARCH_DEFAULT_LIMIT) 개까지, 이름 없이 조회하면 ID 기준 keyset 페이지네이션
 @router.get("/")
-def search_motorman(motorman_name: str = None ):
-    with get_db_connection() as (conn, cur):
-        try:
-            if motorman_name:
-                sql = "SELECT * FROM motorman WHERE name LIKE %s"
-                cur.execute(sql, (f"%{motorman_name}%",))
-            else:
-                sql = "SELECT * FROM motorman"
-                cur.execute(sql)
-
-            columns = [column[0] for column in cur.description]
-            result = []
-            for row in cur.fetchall():
-                result.append(dict(zip(columns, row)))
-            return result
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+def search_motorman(response: Response, motorman_name: str = None, after: Optional[int] = None,
+                    limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX_SIZE),
+                    fields: Optional[str] = None, include_total: bool = False, db=Depends(get_db)):
+    conn, cur = db
+    columns = select_columns(fields, MOTORMAN_COLUMNS, "ID")
+    term = (motorman_name or "").strip()
+    if term and after is not None:
+        raise HTTPException(status_code=400, detail="after cannot be used with motorman_name")
+    try:
+        if term:
+            return _search_by_name(cur, response, term, columns,
+                                   limit or MOTORMAN_SEARCH_DEFAULT_LIMIT, include_total)
+        return fetch_page(cur, response, "motorman", columns, "ID",
+                          after=after, limit=limit, include_total=include_total)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/")
-def create_motorman(motorman: MotormanCreate):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "INSERT INTO motorman (name) VALUES (%s)"
-            cur.execute(sql, (motorman.name,))
-            conn.commit()
-            new_id = cur.lastrowid
-            return {"id": new_id, "message": "Motorman created successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+def create_motorman(motorman: MotormanCreate, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "INSERT INTO motorman (name) VALUES (%s)"
+        cur.execute(sql, (motorman.name,))
+        conn.commit()
+        new_id = cur.lastrowid
+        return {"id": new_id, "message": "Motorman created successfully"}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# 기관사 일괄 생성 (JSON 배열 또는 NDJSON, 하나의 트랜잭션)
+@router.post("/batch")
+def create_motormen(items=Depends(batch_items), db=Depends(get_db)):
+    conn, cur = db
+    motormen, errors = validate_items(items, MotormanCreate)
+    for index, motorman in enumerate(motormen):
+        if motorman and not 0 < len(motorman.name) <= MOTORMAN_NAME_MAX_LENGTH:
+            errors.append({"index": index, "detail": f"name must be 1-{MOTORMAN_NAME_MAX_LENGTH} characters"})
+    errors.sort(key=lambda error: error["index"])
+    raise_for_errors(errors)
+    try:
+        ids = insert_returning_ids(cur, "INSERT INTO motorman (name) VALUES (%s)",
+                                   [(motorman.name,) for motorman in motormen])
+        conn.commit()
+        return {
+            "created": len(ids),
+            "items": [{"index": index, "ID": motorman_id, "name": motorman.name}
+                      for index, (motorman_id, motorman) in enumerate(zip(ids, motormen))]
+        }
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{motorman_id}")
-def update_motorman(motorman_id: int, motorman: MotormanUpdate):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "UPDATE motorman SET name = %s WHERE ID = %s"
-            cur.execute(sql, (motorman.name, motorman_id))
-            conn.commit()
-            return {"message": "Motorman updated successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+def update_motorman(motorman_id: int, motorman: MotormanUpdate, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "UPDATE motorman SET name = %s WHERE ID = %s"
+        cur.execute(sql, (motorman.name, motorman_id))
+        conn.commit()
+        return {"message": "Motorman updated successfully"}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{motorman_id}")
-def delete_motorman(motorman_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "DELETE FROM motorman WHERE ID = %s"
-            cur.execute(sql, (motorman_id,))
-            conn.commit()
-            return {"message": "Motorman deleted successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+def delete_motorman(motorman_id: int, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "DELETE FROM motorman WHERE ID = %s"
+        cur.execute(sql, (motorman_id,))
+        conn.commit()
+        return {"message": "Motorman deleted successfully"}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
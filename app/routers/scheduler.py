@@ -1,49 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response
 from database import get_db_connection
-from typing import List
-from datetime import datetime, time
+from histogram import compute_histogram, station_sequence
+from snapshot import load_line_inputs, load_network_inputs
+from departure import invert_cdf, arrival_matrix, format_clock
+from fleet_size import DemandCurve, peak_shares, smallest_fleet, sweep
+from timetable import Timetable
+from schedule_cache import schedule_cache
+from schedule_batch import run_schedules
+import timetable_store
+from settings import FLEET_SIZE_MAX_TRAINS
+from typing import List, Optional
+import numpy as np
+import json
 
 router = APIRouter()
 
-def str_to_time(time_str: str) -> time:
-    """시간 문자열을 time 객체로 변환 (24시 이상 처리)"""
-    hours, minutes, seconds = map(int, time_str.split(':'))
-    if hours >= 24:
-        hours -= 24
-    return time(hours, minutes, seconds)
-
-def interpolate_time(t1: time, t2: time, cdf1: float, cdf2: float, target_cdf: float) -> time:
-    """선형 보간법으로 목표 CDF 값에 해당하는 시간을 계산"""
-    # time 객체를 초로 변환
-    t1_seconds = (t1.hour * 3600 + t1.minute * 60 + t1.second)
-    t2_seconds = (t2.hour * 3600 + t2.minute * 60 + t2.second)
-    
-    # t2가 t1보다 작은 경우 (자정을 넘어가는 경우) 24시간을 더해줌
-    if t2_seconds < t1_seconds:
-        t2_seconds += 24 * 3600
-    
-    # 선형 보간
-    if abs(cdf2 - cdf1) < 1e-10:  # CDF 값이 너무 가까운 경우
-        interpolated_seconds = t1_seconds  # 첫 번째 시간 사용
-    else:
-        ratio = (target_cdf - cdf1) / (cdf2 - cdf1)
-        interpolated_seconds = t1_seconds + (t2_seconds - t1_seconds) * ratio
-    
-    # 24시간으로 정규화
-    while interpolated_seconds >= 24 * 3600:
-        interpolated_seconds -= 24 * 3600
-    
-    # 초를 time 객체로 변환
-    hours = int(interpolated_seconds // 3600)
-    minutes = int((interpolated_seconds % 3600) // 60)
-    seconds = int(interpolated_seconds % 60)
-    
-    return time(hours, minutes, seconds)
-
 @router.get("/line/{line_id}/departure-times")
-async def get_departure_times(line_id: int, bound_to: int):
+def get_departure_times(line_id: int, bound_to: int):
+    generation = schedule_cache.generation(line_id)
+
     with get_db_connection() as (conn, cur):
         try:
+            # 입력 데이터가 바뀌지 않았다면 (다른 워커에서 바뀐 경우 포함) 이전 계산 결과를 그대로 사용
+            input_version = timetable_store.input_versions(cur, [line_id])[line_id]
+            cached = schedule_cache.get(line_id, bound_to, input_version)
+            if cached is not None:
+                return Response(content=cached.to_json(), media_type="application/json")
+
             # 해당 노선의 열차 수 조회
             cur.execute("SELECT COUNT(*) FROM train WHERE line_ID = %s", (line_id,))
             N = cur.fetchone()[0]
@@ -58,73 +42,228 @@ async def get_departure_times(line_id: int, bound_to: int):
             cur.execute("SELECT route_shape FROM line WHERE ID = %s", (line_id,))
             route_shape = cur.fetchone()[0]
 
-            if route_shape == 'CIRCULAR':
-                cur.execute("CALL GetCircularHistogram(%s, %s)", (line_id, bound_to))
-            else:
-                cur.execute("CALL GetRoundTripHistogram(%s)", (line_id))
-            
-            histogram_data = cur.fetchall()
-            
-            # 다음 결과셋 비우기 (여러 결과 반환될 우려)
-            while cur.nextset():
-                pass
-            
-            # CDF 데이터 준비
-            times = []
-            cdfs = []
-            for row in histogram_data:
-                times.append(str_to_time(str(row[0])))  # 문자열을 time 객체로 변환
-                cdfs.append(float(row[3]))   # CDF 값을 float으로 변환
-
-            # 목표 CDF 값들 (1/N, 2/N, ..., N/N)
-            target_cdfs = [i / N for i in range(N)]
-            
-            # 각 목표 CDF 값에 대한 보간된 시간 계산
-            result = []
-            current_index = 1  # 현재 검사 중인 시간 구간의 인덱스
-            
-            for target_cdf in target_cdfs:
-
-                # 현재 구간부터 시작하여 목표 CDF를 포함하는 구간 찾기
-                while current_index < (len(cdfs) - 1) and cdfs[current_index] < target_cdf:
-                    current_index += 1
-
-                # 현재 구간에서 보간
-                interpolated_time = interpolate_time(
-                    times[current_index-1], times[current_index],
-                    cdfs[current_index-1], cdfs[current_index],
-                    target_cdf
-                )
-                result.append({
-                    "departure_time": interpolated_time.strftime("%H:%M:%S"),
-                    "cdf_value": round(target_cdf, 4)
-                })
-            
-            cur.execute("""
-                SELECT station.name, eta.ET FROM eta, station
-                WHERE eta.station_ID = station.ID
-                AND station.line_ID = %s
-            """, (line_id,))
-
-            etas = cur.fetchall()
-            result_2 = []
-            for eta in etas:
-                total_seconds = int(eta[1].total_seconds())  # timedelta를 초로 변환
-                minutes = total_seconds // 60
-                seconds = total_seconds % 60
-                formatted_et = f"{minutes:02d}:{seconds:02d}"  # MM:SS 형식으로 변환
-                result_2.append({
-                    "station_name": eta[0],
-                    "et": formatted_et
-                })
-            
-            return {
-                "line_id": line_id,
-                "train_count": N,
-                "departure_times": result,
-                "etas": result_2,
-                "route_shape": route_shape
-            }
-            
+            # GetRoundTripHistogram / GetCircularHistogram 과 같은 히스토그램을 앱에서 계산
+            line_inputs = load_line_inputs(cur, line_id)
+            histogram = compute_histogram(line_inputs, route_shape, bound_to)
+            if np.isnan(histogram.cdf).any():
+                raise HTTPException(status_code=404, detail="No congestion data for this line")
+
+            # 목표 CDF 값들 (0/N, 1/N, ..., (N-1)/N) 에 해당하는 출발 시각을 한 번에 보간
+            departure_seconds = invert_cdf(histogram.start_seconds, histogram.cdf, N)
+            timetable = Timetable.from_inputs(line_inputs, route_shape, departure_seconds)
+            schedule_cache.put(line_id, bound_to, timetable, generation, input_version)
+            return Response(content=timetable.to_json(), media_type="application/json")
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+def _ndjson(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode('utf-8') + b"\n"
+
+
+# 여러 노선의 출발 시각을 한 번에 계산해 노선별로 한 줄씩(NDJSON) 스트리밍
+@router.get("/departure-times")
+def get_network_departure_times(line_ids: Optional[List[int]] = Query(None), bound_to: Optional[int] = None):
+    if bound_to is not None and bound_to not in [1, 0]:
+        raise HTTPException(status_code=400, detail="Invalid bound_to value")
+    bounds = [bound_to] if bound_to is not None else [0, 1]
+
+    ready = []      # 캐시에 있거나 계산할 필요가 없는 결과 (직렬화된 줄)
+    missing = {}    # line_id -> 다시 계산해야 하는 bound_to 목록
+    generations = {}
+    with get_db_connection() as (conn, cur):
+        try:
+            sql = """
+                SELECT l.ID, l.route_shape, COUNT(t.ID), COALESCE(v.input_version, 0)
+                FROM line l
+                LEFT JOIN train t ON t.Line_ID = l.ID
+                LEFT JOIN timetable_version v ON v.line_ID = l.ID
+            """
+            params = ()
+            if line_ids:
+                sql += f" WHERE l.ID IN ({', '.join(['%s'] * len(line_ids))})"
+                params = tuple(line_ids)
+            sql += " GROUP BY l.ID, l.route_shape, v.input_version ORDER BY l.ID"
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            lines = {row[0]: (row[1], row[2]) for row in rows}
+            input_versions = {row[0]: row[3] for row in rows}
+
+            for line_id in (list(dict.fromkeys(line_ids)) if line_ids else list(lines)):
+                if line_id not in lines:
+                    ready.append(_ndjson({"line_id": line_id, "error": {"status_code": 404, "detail": "No Such Line ID"}}))
+                    continue
+                generations[line_id] = schedule_cache.generation(line_id)
+                for b in bounds:
+                    cached = schedule_cache.get(line_id, b, input_versions[line_id])
+                    if cached is not None:
+                        ready.append(cached.to_json(bound_to=b) + b"\n")
+                    else:
+                        missing.setdefault(line_id, []).append(b)
+
+            network_inputs = load_network_inputs(cur, list(missing)) if missing else {}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    jobs = []
+    for line_id, missing_bounds in missing.items():
+        route_shape, train_count = lines[line_id]
+        if route_shape == 'CIRCULAR':
+            for b in missing_bounds:
+                jobs.append(((line_id, (b,)), network_inputs[line_id], route_shape, b, train_count))
+        else:
+            # 왕복 노선 히스토그램은 bound_to 와 무관하므로 한 번만 계산한다
+            jobs.append(((line_id, tuple(missing_bounds)), network_inputs[line_id], route_shape, 1, train_count))
+
+    def stream():
+        yield from ready
+        for (line_id, job_bounds), result in run_schedules(jobs):
+            for b in job_bounds:
+                if isinstance(result, Exception):
+                    # 한 노선의 계산이 실패해도 나머지 노선은 계속 보낸다
+                    yield _ndjson({"line_id": line_id, "bound_to": b,
+                                   "error": {"status_code": 500, "detail": str(result)}})
+                elif isinstance(result, Timetable):
+                    schedule_cache.put(line_id, b, result, generations[line_id], input_versions[line_id])
+                    yield result.to_json(bound_to=b) + b"\n"
+                else:
+                    yield _ndjson({**result, "bound_to": b})
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# 미리 계산해 둔 시간표 조회 (fresh 가 false 면 재계산 중이거나 예약된 상태)
+@router.get("/line/{line_id}/timetable")
+def get_timetable(line_id: int, bound_to: int, background_tasks: BackgroundTasks):
+    if bound_to not in [1, 0]:
+        raise HTTPException(status_code=400, detail="Invalid bound_to value")
+
+    with get_db_connection() as (conn, cur):
+        try:
+            timetable = timetable_store.read_timetable(cur, line_id, bound_to)
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+
+    if timetable is None:
+        raise HTTPException(status_code=404, detail="No Such Line ID")
+    if not timetable["fresh"]:
+        # 서버 재시작 등으로 예약이 사라진 경우에도 조회하면 다시 계산된다
+        background_tasks.add_task(timetable_store.rebuild_lines, [line_id])
+    return timetable
+
+
+# 열차 × 역 도착 시각 표 (열차 단위 페이지)
+@router.get("/line/{line_id}/arrivals")
+def get_arrival_matrix(line_id: int, bound_to: int,
+                       offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    if bound_to not in [1, 0]:
+        raise HTTPException(status_code=400, detail="Invalid bound_to value")
+
+    with get_db_connection() as (conn, cur):
+        try:
+            cur.execute("SELECT route_shape FROM line WHERE ID = %s", (line_id,))
+            row = cur.fetchone()
+            if row is None:
+                raise HTTPException(status_code=404, detail="No Such Line ID")
+            route_shape = row[0]
+
+            cur.execute("SELECT COUNT(*) FROM train WHERE line_ID = %s", (line_id,))
+            N = cur.fetchone()[0]
+            if N == 0:
+                raise HTTPException(status_code=404, detail="No trains found for this line")
+
+            line_inputs = load_line_inputs(cur, line_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    histogram = compute_histogram(line_inputs, route_shape, bound_to)
+    if np.isnan(histogram.cdf).any():
+        raise HTTPException(status_code=404, detail="No congestion data for this line")
+    departure_seconds = invert_cdf(histogram.start_seconds, histogram.cdf, N)
+
+    # 프로시저와 같은 역 순서 (왕복 노선은 상행 후 하행), 출발역부터의 누적 소요시간
+    order, bounds, et = station_sequence(line_inputs, route_shape, bound_to)
+    offsets = np.cumsum(et)
+    page = slice(offset, offset + limit)
+    arrivals = arrival_matrix(departure_seconds[page], offsets)
+
+    stations = []
+    for index, station_bound, station_offset in zip(order.tolist(), bounds.tolist(), format_clock(offsets)):
+        stations.append({
+            "station_id": int(line_inputs.station_ids[index]),
+            "station_name": line_inputs.station_names[index],
+            "bound_to": station_bound,
+            "offset": station_offset
+        })
+
+    trains = []
+    for seq, departure_time, row in zip(range(offset, offset + len(arrivals)),
+                                        format_clock(departure_seconds[page]), format_clock(arrivals)):
+        trains.append({
+            "seq": seq,
+            "departure_time": departure_time,
+            "arrivals": row
+        })
+
+    return {
+        "line_id": line_id,
+        "bound_to": bound_to,
+        "route_shape": route_shape,
+        "train_count": N,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < N else None,
+        "stations": stations,
+        "trains": trains
+    }
+
+
+# 최대 분담률(열차 한 대가 맡는 혼잡도 비율의 최댓값)이 target 이하가 되는 최소 열차 수와 N 에 따른 곡선
+@router.get("/line/{line_id}/fleet-size")
+def get_fleet_size(line_id: int, bound_to: int, target: float = Query(..., gt=0, le=1),
+                   max_trains: int = Query(500, ge=1, le=FLEET_SIZE_MAX_TRAINS),
+                   points: int = Query(50, ge=1, le=500)):
+    if bound_to not in [1, 0]:
+        raise HTTPException(status_code=400, detail="Invalid bound_to value")
+
+    with get_db_connection() as (conn, cur):
+        try:
+            cur.execute("SELECT route_shape FROM line WHERE ID = %s", (line_id,))
+            row = cur.fetchone()
+            if row is None:
+                raise HTTPException(status_code=404, detail="No Such Line ID")
+            route_shape = row[0]
+
+            cur.execute("SELECT COUNT(*) FROM train WHERE line_ID = %s", (line_id,))
+            N = cur.fetchone()[0]
+
+            line_inputs = load_line_inputs(cur, line_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    # 히스토그램은 한 번만 계산하고 후보 N 은 모두 같은 곡선 위에서 평가한다
+    histogram = compute_histogram(line_inputs, route_shape, bound_to)
+    if np.isnan(histogram.cdf).any():
+        raise HTTPException(status_code=404, detail="No congestion data for this line")
+    curve = DemandCurve.from_histogram(histogram)
+
+    recommended = smallest_fleet(curve, target, max_trains)
+    current_share = float(peak_shares(curve, [N])[0]) if N else None
+    return {
+        "line_id": line_id,
+        "bound_to": bound_to,
+        "route_shape": route_shape,
+        "target": target,
+        "total_congestion": round(curve.total, 2),
+        "current_train_count": N,
+        "current_peak_share": None if current_share is None else round(current_share, 6),
+        "recommended_train_count": recommended,
+        "curve": sweep(curve, max_trains, points)
+    }
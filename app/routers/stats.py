@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+from database import get_pool_stats
+from schedule_cache import schedule_cache
+from auth_cache import principal_cache
+from auth import get_current_user, password_hasher
+from settings import QUERY_TRACE_ENABLED, SNAPSHOT_DIR
+import query_trace
+import snapshot
+
+router = APIRouter(
+    dependencies=[Depends(get_current_user)]
+)
+
+# DB 커넥션 풀 상태 조회
+@router.get("/db-pool")
+def db_pool_stats():
+    return get_pool_stats()
+
+# 출발 시각 캐시 적중률 조회
+@router.get("/schedule-cache")
+def schedule_cache_stats():
+    return schedule_cache.stats()
+
+# 인증 주체 캐시 적중률 조회
+@router.get("/auth-cache")
+def auth_cache_stats():
+    return principal_cache.stats()
+
+# 비밀번호 해싱 워커 풀 대기열 조회
+@router.get("/password-hasher")
+def password_hasher_stats():
+    return password_hasher.stats()
+
+# 최근 느린 쿼리 / N+1 패턴 기록 조회 (QUERY_TRACE_ENABLED 일 때만 쌓인다)
+@router.get("/slow-queries")
+def slow_query_stats():
+    return {"enabled": QUERY_TRACE_ENABLED, "entries": query_trace.recent()}
+
+# 이 워커가 열어 둔 입력 데이터 스냅샷 (SNAPSHOT_DIR 을 설정했을 때만)
+@router.get("/snapshot")
+def snapshot_stats():
+    snap = snapshot.current()
+    return {"enabled": bool(SNAPSHOT_DIR), "path": None if snap is None else snap.path,
+            "manifest": None if snap is None else snap.manifest}
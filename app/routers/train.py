@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Depends
+from fastapi import APIRouter, Depends, HTTPException, Depends, BackgroundTasks, Query, Response
 from typing import List
-from database import mysql_create_session, get_db_connection
+from database import get_db, insert_returning_ids
 from auth import get_current_user
+from schedule_cache import schedule_cache
+import timetable_store
+from pagination import select_columns, fetch_page
+from batch import batch_items, validate_items, raise_for_errors, existing_ids
+from settings import LIST_PAGE_MAX_SIZE
 
 from schemas import Train, TrainCreate, TrainUpdate
 from typing import Optional
@@ -11,71 +16,127 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-# 호선과 수용인원에 따른 열차 조회
+TRAIN_COLUMNS = ("ID", "Line_ID")
+
+# 호선과 수용인원에 따른 열차 조회 (ID 기준 keyset 페이지네이션)
 @router.get("/")
-def search_train(line_id: Optional[int] = None):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "SELECT * FROM train"
-            if line_id:
-                sql += " WHERE Line_ID = %s"
-                cur.execute(sql, (line_id,))
-            else:
-                cur.execute(sql)
-            
-            columns = [column[0] for column in cur.description]
-            result = []
-            for row in cur.fetchall():
-                result.append(dict(zip(columns, row)))
-            return result
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+def search_train(response: Response, line_id: Optional[int] = None, after: Optional[int] = None,
+                 limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX_SIZE),
+                 fields: Optional[str] = None, include_total: bool = False, db=Depends(get_db)):
+    conn, cur = db
+    columns = select_columns(fields, TRAIN_COLUMNS, "ID")
+    try:
+        conditions, params = [], []
+        if line_id:
+            conditions.append("Line_ID = %s")
+            params.append(line_id)
+        return fetch_page(cur, response, "train", columns, "ID", conditions, params,
+                          after=after, limit=limit, include_total=include_total)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # 열차 생성
 @router.post("/")
-def create_train(train: TrainCreate):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "INSERT INTO train (Line_ID) VALUES (%s)"
-            cur.execute(sql, (train.Line_ID,))
-            conn.commit()
-            return {"message": "Train created successfully"}
-        except pymysql.Error as e:
-            conn.rollback()
-            if e.args[0] == 1452:
-                raise HTTPException(status_code=404, detail="No Such Line ID")
-            elif e.args[0] == 3819:
-                raise HTTPException(status_code=400, detail="Capacity must be positive")
-            else:
-                raise HTTPException(status_code=500, detail=str(e))
+def create_train(train: TrainCreate, background_tasks: BackgroundTasks, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "INSERT INTO train (Line_ID) VALUES (%s)"
+        cur.execute(sql, (train.Line_ID,))
+        timetable_store.mark_stale(cur, [train.Line_ID])
+        conn.commit()
+        schedule_cache.invalidate_line(train.Line_ID)
+        background_tasks.add_task(timetable_store.rebuild_lines, [train.Line_ID])
+        return {"message": "Train created successfully"}
+    except pymysql.Error as e:
+        conn.rollback()
+        if e.args[0] == 1452:
+            raise HTTPException(status_code=404, detail="No Such Line ID")
+        elif e.args[0] == 3819:
+            raise HTTPException(status_code=400, detail="Capacity must be positive")
+        else:
+            raise HTTPException(status_code=500, detail=str(e))
+
+# 열차 일괄 생성 (JSON 배열 또는 NDJSON, 하나의 트랜잭션)
+@router.post("/batch")
+def create_trains(background_tasks: BackgroundTasks, items=Depends(batch_items), db=Depends(get_db)):
+    conn, cur = db
+    trains, errors = validate_items(items, TrainCreate)
+    try:
+        line_ids = existing_ids(cur, "line", "ID", [train.Line_ID for train in trains if train])
+        for index, train in enumerate(trains):
+            if train and train.Line_ID not in line_ids:
+                errors.append({"index": index, "detail": "No Such Line ID"})
+        errors.sort(key=lambda error: error["index"])
+        raise_for_errors(errors)
+
+        ids = insert_returning_ids(cur, "INSERT INTO train (Line_ID) VALUES (%s)",
+                                   [(train.Line_ID,) for train in trains])
+        changed_lines = sorted({train.Line_ID for train in trains})
+        timetable_store.mark_stale(cur, changed_lines)
+        conn.commit()
+        for changed_line in changed_lines:
+            schedule_cache.invalidate_line(changed_line)
+        if changed_lines:
+            background_tasks.add_task(timetable_store.rebuild_lines, changed_lines)
+        return {
+            "created": len(ids),
+            "items": [{"index": index, "ID": train_id, "Line_ID": train.Line_ID}
+                      for index, (train_id, train) in enumerate(zip(ids, trains))]
+        }
+    except HTTPException:
+        conn.rollback()
+        raise
+    except pymysql.Error as e:
+        conn.rollback()
+        if e.args[0] == 1452:  # 검증 후 노선이 삭제된 경우
+            raise HTTPException(status_code=404, detail="No Such Line ID")
+        else:
+            raise HTTPException(status_code=500, detail=str(e))
 
 # 열차 수정
 @router.put("/{train_id}")
-def update_train(train_id: int, train: TrainUpdate):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "UPDATE train SET Line_ID = %s WHERE ID = %s"
-            cur.execute(sql, (train.Line_ID, train_id))
-            conn.commit()
-            return {"message": "Train updated successfully"}
-        except pymysql.Error as e:
-            conn.rollback()
-            if e.args[0] == 1452:
-                raise HTTPException(status_code=404, detail="No Such Line ID")
-            elif e.args[0] == 3819:
-                raise HTTPException(status_code=400, detail="Capacity must be positive")
-            else:
-                raise HTTPException(status_code=500, detail=str(e))
+def update_train(train_id: int, train: TrainUpdate, background_tasks: BackgroundTasks, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        # 열차가 빠져나가는 노선도 열차 수가 바뀌므로 기존 노선을 먼저 조회
+        cur.execute("SELECT Line_ID FROM train WHERE ID = %s", (train_id,))
+        previous = cur.fetchone()
+
+        sql = "UPDATE train SET Line_ID = %s WHERE ID = %s"
+        cur.execute(sql, (train.Line_ID, train_id))
+        changed_lines = [train.Line_ID, previous[0]] if previous else []
+        timetable_store.mark_stale(cur, changed_lines)
+        conn.commit()
+        for changed_line in changed_lines:
+            schedule_cache.invalidate_line(changed_line)
+        background_tasks.add_task(timetable_store.rebuild_lines, changed_lines)
+        return {"message": "Train updated successfully"}
+    except pymysql.Error as e:
+        conn.rollback()
+        if e.args[0] == 1452:
+            raise HTTPException(status_code=404, detail="No Such Line ID")
+        elif e.args[0] == 3819:
+            raise HTTPException(status_code=400, detail="Capacity must be positive")
+        else:
+            raise HTTPException(status_code=500, detail=str(e))
 
 # 열차 삭제
 @router.delete("/{train_id}")
-def delete_train(train_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "DELETE FROM train WHERE ID = %s"
-            cur.execute(sql, (train_id,))
-            conn.commit()
-            return {"message": "Train deleted successfully"}
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+def delete_train(train_id: int, background_tasks: BackgroundTasks, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        cur.execute("SELECT Line_ID FROM train WHERE ID = %s", (train_id,))
+        previous = cur.fetchone()
+
+        sql = "DELETE FROM train WHERE ID = %s"
+        cur.execute(sql, (train_id,))
+        if previous:
+            timetable_store.mark_stale(cur, [previous[0]])
+        conn.commit()
+        if previous:
+            schedule_cache.invalidate_line(previous[0])
+            background_tasks.add_task(timetable_store.rebuild_lines, [previous[0]])
+        return {"message": "Train deleted successfully"}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
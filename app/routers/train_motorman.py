@@ -1,73 +1,214 @@
-from fastapi import APIRouter, Depends, HTTPException, Depends
+from fastapi import APIRouter, Depends, HTTPException, Depends, Query, Response
 from typing import List
-from database import mysql_create_session, get_db_connection
+from database import get_db, execute_many
 from auth import get_current_user
 
-from schemas import TrainMotorman, TrainMotormanCreate, TrainMotormanUpdate
+from schemas import TrainMotorman, TrainMotormanCreate, TrainMotormanUpdate, CrewAssignmentRequest
+from crew_assignment import assignment_costs, solve_assignment, InfeasibleAssignment
 from typing import Optional
+from pagination import select_columns, fetch_page
+from batch import batch_items, validate_items, raise_for_errors, existing_ids
+from settings import DATABASE_INSERT_CHUNK_SIZE, LIST_PAGE_MAX_SIZE
 import pymysql
 
 router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-# 열차 당 motorman 조회
+TRAIN_MOTORMAN_COLUMNS = ("Train_ID", "Motorman_ID")
+
+# 열차 당 motorman 조회 (Motorman_ID 기준 keyset 페이지네이션)
 @router.get("/by_train")
-def search_drive_by_train(train_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "SELECT * FROM train_motorman WHERE Train_ID = %s"
-            cur.execute(sql, (train_id,))
-
-            columns = [column[0] for column in cur.description]
-            result = []
-            for row in cur.fetchall():
-                result.append(dict(zip(columns, row)))
-            return result
-        except pymysql.Error as e:
-            raise HTTPException(status_code=500, detail=str(e))
+def search_drive_by_train(train_id: int, response: Response, after: Optional[int] = None,
+                          limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX_SIZE),
+                          fields: Optional[str] = None, include_total: bool = False, db=Depends(get_db)):
+    conn, cur = db
+    columns = select_columns(fields, TRAIN_MOTORMAN_COLUMNS, "Motorman_ID")
+    try:
+        return fetch_page(cur, response, "train_motorman", columns, "Motorman_ID",
+                          ["Train_ID = %s"], [train_id],
+                          after=after, limit=limit, include_total=include_total)
+    except pymysql.Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-# motorman 당 열차 조회
+# motorman 당 열차 조회 (Train_ID 기준 keyset 페이지네이션)
 @router.get("/by_motorman")
-def search_drive_by_motorman(motorman_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "SELECT * FROM train_motorman WHERE Motorman_ID = %s"
-            cur.execute(sql, (motorman_id,))
-
-            columns = [column[0] for column in cur.description]
-            result = []
-            for row in cur.fetchall():
-                result.append(dict(zip(columns, row)))
-            return result
-        except pymysql.Error as e:
-            raise HTTPException(status_code=500, detail=str(e))
+def search_drive_by_motorman(motorman_id: int, response: Response, after: Optional[int] = None,
+                             limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX_SIZE),
+                             fields: Optional[str] = None, include_total: bool = False, db=Depends(get_db)):
+    conn, cur = db
+    columns = select_columns(fields, TRAIN_MOTORMAN_COLUMNS, "Train_ID")
+    try:
+        return fetch_page(cur, response, "train_motorman", columns, "Train_ID",
+                          ["Motorman_ID = %s"], [motorman_id],
+                          after=after, limit=limit, include_total=include_total)
+    except pymysql.Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # 열차 배치 생성
 @router.post("/")
-def create_drive(drive: TrainMotormanCreate):
-    with get_db_connection() as (conn, cur):
+def create_drive(drive: TrainMotormanCreate, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "INSERT INTO train_motorman (Train_ID, Motorman_ID) VALUES (%s, %s)"
+        cur.execute(sql, (drive.Train_ID, drive.Motorman_ID))
+        conn.commit()
+        return {"message": "Train motorman created successfully"}
+    except pymysql.Error as e:
+        conn.rollback()
+        if e.args[0] == 1452:
+            raise HTTPException(status_code=404, detail="No Such Train ID or Motorman ID")
+        else:
+            raise HTTPException(status_code=500, detail=str(e))
+
+def _existing_pairs(cur, pairs, chunk_size=DATABASE_INSERT_CHUNK_SIZE):
+    """(Train_ID, Motorman_ID) 쌍 중 이미 배치된 것의 집합 (기본 키 범위 조회)"""
+    found = set()
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+        cur.execute(
+            f"SELECT Train_ID, Motorman_ID FROM train_motorman WHERE (Train_ID, Motorman_ID) IN ({placeholders})",
+            tuple(value for pair in chunk for value in pair)
+        )
+        found.update(cur.fetchall())
+    return found
+
+# 열차 배치 일괄 생성 (JSON 배열 또는 NDJSON, 하나의 트랜잭션)
+@router.post("/batch")
+def create_drives(items=Depends(batch_items), db=Depends(get_db)):
+    conn, cur = db
+    drives, errors = validate_items(items, TrainMotormanCreate)
+    try:
+        valid = [(index, drive) for index, drive in enumerate(drives) if drive]
+        train_ids = existing_ids(cur, "train", "ID", [drive.Train_ID for _, drive in valid])
+        motorman_ids = existing_ids(cur, "motorman", "ID", [drive.Motorman_ID for _, drive in valid])
+        pairs = list(dict.fromkeys((drive.Train_ID, drive.Motorman_ID) for _, drive in valid))
+        assigned = _existing_pairs(cur, pairs)
+
+        seen = set()
+        for index, drive in valid:
+            pair = (drive.Train_ID, drive.Motorman_ID)
+            if drive.Train_ID not in train_ids or drive.Motorman_ID not in motorman_ids:
+                errors.append({"index": index, "detail": "No Such Train ID or Motorman ID"})
+            elif pair in assigned:
+                errors.append({"index": index, "detail": "Already assigned"})
+            elif pair in seen:
+                errors.append({"index": index, "detail": "Duplicate item"})
+            seen.add(pair)
+        errors.sort(key=lambda error: error["index"])
+        raise_for_errors(errors)
+
+        execute_many(cur, "INSERT INTO train_motorman (Train_ID, Motorman_ID) VALUES (%s, %s)",
+                     [(drive.Train_ID, drive.Motorman_ID) for drive in drives])
+        conn.commit()
+        return {
+            "created": len(drives),
+            "items": [{"index": index, "Train_ID": drive.Train_ID, "Motorman_ID": drive.Motorman_ID}
+                      for index, drive in enumerate(drives)]
+        }
+    except HTTPException:
+        conn.rollback()
+        raise
+    except pymysql.Error as e:
+        conn.rollback()
+        if e.args[0] == 1452:
+            raise HTTPException(status_code=404, detail="No Such Train ID or Motorman ID")
+        else:
+            raise HTTPException(status_code=500, detail=str(e))
+
+def _delete_pairs(cur, pairs, chunk_size=DATABASE_INSERT_CHUNK_SIZE):
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+        cur.execute(
+            f"DELETE FROM train_motorman WHERE (Train_ID, Motorman_ID) IN ({placeholders})",
+            tuple(value for pair in chunk for value in pair)
+        )
+
+# 노선의 열차마다 기관사 한 명을 최소 비용으로 자동 배치 (기존 배치를 결과로 바꾼다)
+@router.post("/assign/{line_id}")
+def assign_crew(line_id: int, request: CrewAssignmentRequest, db=Depends(get_db)):
+    conn, cur = db
+    if request.max_trains_per_motorman < 1:
+        raise HTTPException(status_code=400, detail="max_trains_per_motorman must be positive")
+    if request.preserve_weight < 0 or request.balance_weight < 0:
+        raise HTTPException(status_code=400, detail="Weights must not be negative")
+    try:
+        cur.execute("SELECT ID FROM line WHERE ID = %s", (line_id,))
+        if cur.fetchone() is None:
+            raise HTTPException(status_code=404, detail="No Such Line ID")
+
+        cur.execute("SELECT ID FROM train WHERE Line_ID = %s ORDER BY ID", (line_id,))
+        train_ids = [row[0] for row in cur.fetchall()]
+        if request.motorman_ids is None:
+            cur.execute("SELECT ID FROM motorman ORDER BY ID")
+            motorman_ids = [row[0] for row in cur.fetchall()]
+        else:
+            motorman_ids = sorted(set(request.motorman_ids))
+            missing = set(motorman_ids) - existing_ids(cur, "motorman", "ID", motorman_ids)
+            if missing:
+                raise HTTPException(status_code=404, detail=f"No Such Motorman ID: {sorted(missing)}")
+
+        # 이 노선의 기존 배치와, 기관사별 다른 노선 배치 수
+        cur.execute("""
+            SELECT tm.Train_ID, tm.Motorman_ID
+            FROM train_motorman tm JOIN train t ON t.ID = tm.Train_ID
+            WHERE t.Line_ID = %s
+        """, (line_id,))
+        existing = set(cur.fetchall())
+        cur.execute("""
+            SELECT tm.Motorman_ID, COUNT(*)
+            FROM train_motorman tm JOIN train t ON t.ID = tm.Train_ID
+            WHERE t.Line_ID <> %s
+            GROUP BY tm.Motorman_ID
+        """, (line_id,))
+        other_load = dict(cur.fetchall())
+
+        pair_costs, slot_costs = assignment_costs(
+            train_ids, motorman_ids, existing, other_load, request.max_trains_per_motorman,
+            request.preserve_weight, request.balance_weight,
+            [(cost.Train_ID, cost.Motorman_ID, cost.cost) for cost in request.costs],
+        )
         try:
-            sql = "INSERT INTO train_motorman (Train_ID, Motorman_ID) VALUES (%s, %s)"
-            cur.execute(sql, (drive.Train_ID, drive.Motorman_ID))
+            assignment, total_cost = solve_assignment(train_ids, motorman_ids, pair_costs, slot_costs)
+        except InfeasibleAssignment as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        assigned = {(train_id, assignment[train_id]) for train_id in train_ids}
+        removed = sorted(existing - assigned)
+        added = sorted(assigned - existing)
+        if not request.dry_run:
+            _delete_pairs(cur, removed)
+            execute_many(cur, "INSERT INTO train_motorman (Train_ID, Motorman_ID) VALUES (%s, %s)", added)
             conn.commit()
-            return {"message": "Train motorman created successfully"}
-        except pymysql.Error as e:
-            conn.rollback()
-            if e.args[0] == 1452:
-                raise HTTPException(status_code=404, detail="No Such Train ID or Motorman ID")
-            else:
-                raise HTTPException(status_code=500, detail=str(e))
+        return {
+            "line_id": line_id,
+            "train_count": len(train_ids),
+            "motorman_count": len(motorman_ids),
+            "cost": total_cost,
+            "kept": len(assigned & existing),
+            "added": len(added),
+            "removed": len(removed),
+            "dry_run": request.dry_run,
+            "assignments": [{"Train_ID": train_id, "Motorman_ID": assignment[train_id]} for train_id in train_ids]
+        }
+    except HTTPException:
+        conn.rollback()
+        raise
+    except pymysql.Error as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 # 열차 배치 삭제
 @router.delete("/{train_id}/{motorman_id}")
-def delete_drive(train_id: int, motorman_id: int):
-    with get_db_connection() as (conn, cur):
-        try:
-            sql = "DELETE FROM train_motorman WHERE Train_ID = %s AND Motorman_ID = %s"
-            cur.execute(sql, (train_id, motorman_id))
-            conn.commit()
-            return {"message": "Train motorman deleted successfully"}
-        except pymysql.Error as e:
-            raise HTTPException(status_code=500, detail=str(e))
+def delete_drive(train_id: int, motorman_id: int, db=Depends(get_db)):
+    conn, cur = db
+    try:
+        sql = "DELETE FROM train_motorman WHERE Train_ID = %s AND Motorman_ID = %s"
+        cur.execute(sql, (train_id, motorman_id))
+        conn.commit()
+        return {"message": "Train motorman deleted successfully"}
+    except pymysql.Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
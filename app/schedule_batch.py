@@ -0,0 +1,115 @@
+"""여러 노선의 출발 시각을 프로세스 풀에서 병렬로 계산
+
+입력은 load_network_inputs 로 한 번에 읽고, 노선 × bound_to 단위 계산만 워커 프로세스로 보낸다.
+풀은 main 의 lifespan 에서 start / shutdown 하며, 시작하지 않았으면 요청 스레드에서 직접 계산한다.
+워커는 forkserver 로 만들어 스레드풀과 커넥션 풀을 가진 서버 프로세스를 fork 하지 않는다.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import multiprocessing
+import threading
+
+import numpy as np
+
+from histogram import compute_histogram
+from departure import invert_cdf
+from timetable import Timetable
+from settings import SCHEDULE_BATCH_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _new_executor():
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=SCHEDULE_BATCH_WORKERS, mp_context=multiprocessing.get_context(method))
+
+
+def start():
+    """프로세스 풀을 만든다 (워커 수가 0 이면 만들지 않는다)"""
+    global _executor
+    if SCHEDULE_BATCH_WORKERS == 0:
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = _new_executor()
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def get_executor():
+    """start 하지 않았으면 None (요청 스레드에서 직접 계산)"""
+    return _executor
+
+
+def _replace_broken(executor):
+    # 워커가 비정상 종료하면(메모리 부족 등) 풀 전체를 쓸 수 없으므로 새 풀로 바꾼다
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            logger.warning("schedule batch pool is broken, starting a new one")
+            _executor = _new_executor()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def compute_line_schedule(inputs, route_shape, bound_to, train_count):
+    """Timetable, 계산할 수 없으면 {"error": {...}}
+
+    워커 프로세스에서 실행되므로 모듈 최상위 함수이고 인자/결과는 pickle 가능해야 한다.
+    """
+    if train_count == 0:
+        return {"line_id": inputs.line_id, "bound_to": bound_to,
+                "error": {"status_code": 404, "detail": "No trains found for this line"}}
+
+    histogram = compute_histogram(inputs, route_shape, bound_to)
+    if np.isnan(histogram.cdf).any():
+        return {"line_id": inputs.line_id, "bound_to": bound_to,
+                "error": {"status_code": 404, "detail": "No congestion data for this line"}}
+
+    departure_seconds = invert_cdf(histogram.start_seconds, histogram.cdf, train_count)
+    return Timetable.from_inputs(inputs, route_shape, departure_seconds)
+
+
+def run_schedules(jobs):
+    """jobs: (key, inputs, route_shape, bound_to, train_count) 목록
+
+    끝나는 순서대로 (key, 결과) 를 내보낸다. 계산 중 예외가 나면 결과 자리에 그 예외를 내보내고
+    나머지 노선은 계속 계산한다.
+    """
+    executor = get_executor()
+    if executor is None or len(jobs) < 2:
+        for key, *args in jobs:
+            try:
+                result = compute_line_schedule(*args)
+            except Exception as e:
+                result = e
+            yield key, result
+        return
+
+    futures = {executor.submit(compute_line_schedule, *args): key for key, *args in jobs}
+    broken = False
+    try:
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                broken = True
+                result = e
+            except Exception as e:
+                result = e
+            yield futures[future], result
+    finally:
+        # 클라이언트가 중간에 끊으면 아직 시작하지 않은 계산은 취소
+        for future in futures:
+            future.cancel()
+        if broken:
+            _replace_broken(executor)
@@ -0,0 +1,91 @@
+"""계산된 출발 시각 응답 캐시
+
+(line_id, bound_to) 별로 get_departure_times 응답을 LRU 로 보관하고,
+노선의 입력 데이터(역/소요시간/혼잡도/열차/노선 형태)가 바뀌는 쓰기 직후 무효화한다.
+
+캐시는 워커 프로세스마다 따로 있고 무효화는 쓰기를 처리한 워커에서만 일어나므로, 항목마다 계산할 때의
+timetable_version.input_version 을 함께 저장하고 조회하는 쪽이 현재 값을 넘겨 다르면 버린다.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from settings import SCHEDULE_CACHE_MAX_SIZE, SCHEDULE_CACHE_TTL
+
+
+class ScheduleCache:
+    def __init__(self, max_size=256, ttl=0):
+        self.max_size = max_size
+        self.ttl = ttl  # 초, 0 이면 만료 없음 (다른 워커의 쓰기는 input_version 비교로 걸러진다)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # 계산 도중 무효화된 결과를 저장하지 않도록 노선별/전체 세대 번호를 둔다
+        self._epoch = 0
+        self._line_generations = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def generation(self, line_id):
+        """계산을 시작하기 전에 받아 두었다가 put 에 넘긴다"""
+        with self._lock:
+            return (self._epoch, self._line_generations.get(line_id, 0))
+
+    def get(self, line_id, bound_to, input_version):
+        """input_version 은 timetable_store.input_versions 로 조회한 현재 값"""
+        key = (line_id, bound_to)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] != input_version
+                                      or self.ttl and time.monotonic() - entry[1] > self.ttl):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, line_id, bound_to, value, generation, input_version):
+        key = (line_id, bound_to)
+        with self._lock:
+            if generation != (self._epoch, self._line_generations.get(line_id, 0)):
+                return
+            self._entries[key] = (value, time.monotonic(), input_version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate_line(self, line_id):
+        with self._lock:
+            self._line_generations[line_id] = self._line_generations.get(line_id, 0) + 1
+            for key in [key for key in self._entries if key[0] == line_id]:
+                del self._entries[key]
+            self._invalidations += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+schedule_cache = ScheduleCache(max_size=SCHEDULE_CACHE_MAX_SIZE, ttl=SCHEDULE_CACHE_TTL)
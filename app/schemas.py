@@ -205,6 +205,18 @@ class TrainMotormanInDBBase(TrainMotormanBase):
 class TrainMotorman(TrainMotormanInDBBase):
     pass
 
+# 열차-기관사 자동 배치 요청
+class TrainMotormanCost(TrainMotormanBase):
+    cost: float
+
+class CrewAssignmentRequest(BaseModel):
+    motorman_ids: Optional[List[int]] = None  # 배치할 수 있는 기관사 (없으면 전체)
+    max_trains_per_motorman: int = 1
+    preserve_weight: float = 10.0  # 이 노선의 기존 배치를 유지하면 줄어드는 비용
+    balance_weight: float = 1.0  # 기관사가 이미 맡은 열차 수에 따라 늘어나는 비용
+    costs: List[TrainMotormanCost] = []  # 쌍별 추가 비용 (음수면 선호)
+    dry_run: bool = False
+
 # 순환 참조 해결을 위한 모델 업데이트
 Line.update_forward_refs()
 Station.update_forward_refs()
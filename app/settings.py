@@ -10,3 +10,57 @@ DATABASE_PORT = os.getenv("DATABASE_PORT")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
 
 DATABASE_URL = f"mysql+pymysql://{DATABASE_ID}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
+
+# 다중 행 INSERT 한 번에 보낼 최대 행 수
+DATABASE_INSERT_CHUNK_SIZE = int(os.getenv("DATABASE_INSERT_CHUNK_SIZE", "1000"))
+
+# 커넥션 풀 설정
+DATABASE_POOL_MIN_SIZE = int(os.getenv("DATABASE_POOL_MIN_SIZE", "1"))
+DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "3600"))  # 초
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))  # 초
+DATABASE_POOL_PING_INTERVAL = int(os.getenv("DATABASE_POOL_PING_INTERVAL", "30"))  # 초
+
+# 출발 시각 캐시 설정
+SCHEDULE_CACHE_MAX_SIZE = int(os.getenv("SCHEDULE_CACHE_MAX_SIZE", "256"))
+SCHEDULE_CACHE_TTL = int(os.getenv("SCHEDULE_CACHE_TTL", "0"))  # 초, 0 이면 만료 없음 (다른 워커의 쓰기는 input_version 으로 감지)
+
+# 인증 주체(principal) 캐시 설정
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))  # 초, 0 이면 캐시하지 않음 (지운 관리자의 토큰도 이 시간 동안 통과한다)
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "1024"))
+
+# 비밀번호 해싱/검증 워커 풀 설정
+PASSWORD_HASHER_MAX_WORKERS = int(os.getenv("PASSWORD_HASHER_MAX_WORKERS", "2"))
+PASSWORD_HASHER_MAX_QUEUE = int(os.getenv("PASSWORD_HASHER_MAX_QUEUE", "32"))  # 실행 중인 작업 외에 기다릴 수 있는 수
+
+# 여러 노선 출발 시각 일괄 계산 프로세스 수 (uvicorn 워커마다 따로 만들어지므로 작게 둔다, 0 이면 프로세스 풀을 쓰지 않음)
+SCHEDULE_BATCH_WORKERS = int(os.getenv("SCHEDULE_BATCH_WORKERS", "2"))
+
+# 쿼리 추적 / 느린 쿼리 로그 (기본값은 꺼짐)
+QUERY_TRACE_ENABLED = os.getenv("QUERY_TRACE_ENABLED", "0").lower() in ("1", "true", "yes")
+QUERY_TRACE_SLOW_MS = float(os.getenv("QUERY_TRACE_SLOW_MS", "200"))  # 이 시간(ms) 이상 걸린 문장을 기록
+QUERY_TRACE_EXPLAIN = os.getenv("QUERY_TRACE_EXPLAIN", "1").lower() in ("1", "true", "yes")  # 느린 문장의 EXPLAIN 수집
+QUERY_TRACE_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_TRACE_N_PLUS_ONE_THRESHOLD", "10"))  # 한 요청에서 같은 모양의 문장 반복 횟수
+QUERY_TRACE_MAX_STATEMENTS = int(os.getenv("QUERY_TRACE_MAX_STATEMENTS", "500"))  # 요청당 보관할 문장 수
+QUERY_TRACE_RECENT_SIZE = int(os.getenv("QUERY_TRACE_RECENT_SIZE", "100"))  # /stats/slow-queries 에 보관할 기록 수
+
+# 목록 조회 페이지 크기 상한 (limit 파라미터)
+LIST_PAGE_MAX_SIZE = int(os.getenv("LIST_PAGE_MAX_SIZE", "1000"))
+
+# 기관사 이름 검색: MySQL ngram_token_size 와 같은 값 (이보다 짧은 검색어는 LIKE '%검색어%' 로 찾는다)
+MOTORMAN_SEARCH_NGRAM_SIZE = int(os.getenv("MOTORMAN_SEARCH_NGRAM_SIZE", "2"))
+# 기관사 이름 검색에서 limit 을 주지 않았을 때 돌려줄 최대 개수
+MOTORMAN_SEARCH_DEFAULT_LIMIT = int(os.getenv("MOTORMAN_SEARCH_DEFAULT_LIMIT", "50"))
+
+# 일괄 생성 엔드포인트 한 요청당 최대 항목 수
+BATCH_CREATE_MAX_ITEMS = int(os.getenv("BATCH_CREATE_MAX_ITEMS", "10000"))
+
+# 열차 수 산정 엔드포인트에서 검토할 수 있는 최대 열차 수
+FLEET_SIZE_MAX_TRAINS = int(os.getenv("FLEET_SIZE_MAX_TRAINS", "2000"))
+
+# 혼잡도 저장 형식: rows (congestion 테이블, 시간대마다 한 행) 또는 profile (congestion_profile 테이블, 승강장마다 한 행)
+# sql_procedures/ 의 프로시저는 rows 형식만 읽는다
+CONGESTION_STORAGE = os.getenv("CONGESTION_STORAGE", "rows").lower()
+
+# 노선 입력 데이터 스냅샷 디렉터리 (워커들이 mmap 으로 함께 읽는다). 비워 두면 사용하지 않는다
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
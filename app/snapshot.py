@@ -0,0 +1,244 @@
+"""노선 입력 데이터(역 순서, 소요시간, 승강장, 혼잡도) 스냅샷 (SNAPSHOT_DIR 을 설정했을 때만 사용)
+
+모든 노선의 LineInputs 를 이어 붙인 .npy 파일들을 SNAPSHOT_DIR/v000001/ 처럼 버전별 디렉터리에 쓰고
+SNAPSHOT_DIR/current 심볼릭 링크를 새 디렉터리로 바꿔(os.replace) 게시한다. 각 uvicorn 워커는 current 가
+가리키는 파일을 읽기 전용 mmap 으로 열기 때문에 워커 수와 관계없이 페이지 캐시의 한 벌을 함께 쓴다.
+
+역/소요시간/혼잡도를 바꾸는 line_csv 트랜잭션은 timetable_version.data_version 을 올리고, 스냅샷은 노선별로
+만들 때의 data_version 을 함께 저장한다. 버전이 다르면(다시 만드는 중이면) 그 노선만 DB 에서 읽는다.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from database import get_db_connection
+import histogram
+from histogram import LineInputs, DAY_SLOTS
+from settings import SNAPSHOT_DIR
+
+logger = logging.getLogger(__name__)
+
+CURRENT_LINK = "current"
+LOCK_FILE = ".lock"
+MANIFEST = "manifest.json"
+KEEP_VERSIONS = 2  # 게시한 버전과 직전 버전만 남긴다 (이미 mmap 한 파일은 지워도 열려 있는 동안 유효하다)
+
+# 노선 단위 배열은 line_ids 순서, 역/소요시간 단위 배열은 *_offsets 로 노선별 구간을 나눈다
+ARRAYS = (
+    "line_ids", "data_versions", "station_offsets", "eta_offsets",
+    "station_ids", "station_names", "eta_ids", "eta_seconds", "platforms", "congestion",
+)
+
+
+class Snapshot:
+    """current 가 가리키는 한 버전의 배열들 (읽기 전용 mmap)"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in ARRAYS}
+        self._index = {line_id: i for i, line_id in enumerate(self.arrays["line_ids"].tolist())}
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    def data_version(self, line_id):
+        index = self._index.get(line_id)
+        return None if index is None else int(self.arrays["data_versions"][index])
+
+    def line_inputs(self, line_id):
+        """mmap 위의 view 로 만든 LineInputs (역 이름만 목록으로 복사한다)"""
+        index = self._index[line_id]
+        a = self.arrays
+        stations = slice(int(a["station_offsets"][index]), int(a["station_offsets"][index + 1]))
+        etas = slice(int(a["eta_offsets"][index]), int(a["eta_offsets"][index + 1]))
+        return LineInputs(
+            line_id=line_id,
+            station_ids=a["station_ids"][stations],
+            station_names=a["station_names"][stations].tolist(),
+            eta_ids=a["eta_ids"][etas],
+            eta_seconds=a["eta_seconds"][etas],
+            platforms=a["platforms"][stations],
+            congestion=a["congestion"][stations],
+        )
+
+
+_lock = threading.Lock()
+_loaded = None  # (current 링크 대상, Snapshot)
+
+
+def current():
+    """게시된 최신 스냅샷, 없거나 사용하지 않으면 None
+
+    링크 대상이 바뀌었을 때만 새로 연다 (매 호출은 readlink 한 번).
+    """
+    global _loaded
+    if not SNAPSHOT_DIR:
+        return None
+    try:
+        target = os.readlink(os.path.join(SNAPSHOT_DIR, CURRENT_LINK))
+    except OSError:
+        return None
+    with _lock:
+        if _loaded is None or _loaded[0] != target:
+            try:
+                _loaded = (target, Snapshot(os.path.join(SNAPSHOT_DIR, target)))
+            except (OSError, ValueError) as e:
+                logger.warning("cannot open snapshot %s: %s", target, e)
+                return None
+        return _loaded[1]
+
+
+def _data_versions(cur, line_ids):
+    if not line_ids:
+        return {}
+    cur.execute(
+        f"SELECT line_ID, data_version FROM timetable_version "
+        f"WHERE line_ID IN ({', '.join(['%s'] * len(line_ids))})",
+        tuple(line_ids)
+    )
+    versions = dict(cur.fetchall())
+    return {line_id: versions.get(line_id, 0) for line_id in line_ids}
+
+
+def load_line_inputs(cur, line_id):
+    """histogram.load_line_inputs 와 같은 결과. 스냅샷이 최신이면 버전 확인 한 번만 조회한다"""
+    snap = current()
+    if snap is not None:
+        version = snap.data_version(line_id)
+        if version is not None and _data_versions(cur, [line_id])[line_id] == version:
+            return snap.line_inputs(line_id)
+    return histogram.load_line_inputs(cur, line_id)
+
+
+def load_network_inputs(cur, line_ids):
+    """histogram.load_network_inputs 와 같은 결과. 스냅샷과 버전이 다른 노선만 DB 에서 읽는다"""
+    line_ids = list(line_ids)
+    snap = current()
+    if snap is None:
+        return histogram.load_network_inputs(cur, line_ids)
+    result = {}
+    stale = []
+    for line_id, version in _data_versions(cur, line_ids).items():
+        if snap.data_version(line_id) == version:
+            result[line_id] = snap.line_inputs(line_id)
+        else:
+            stale.append(line_id)
+    if stale:
+        result.update(histogram.load_network_inputs(cur, stale))
+    return {line_id: result[line_id] for line_id in line_ids}
+
+
+def _write(path, version, line_ids, versions, inputs):
+    lines = [inputs[line_id] for line_id in line_ids]
+    station_counts = [len(line.station_ids) for line in lines]
+    eta_counts = [len(line.eta_ids) for line in lines]
+
+    def concat(name, dtype, shape=()):
+        parts = [getattr(line, name) for line in lines]
+        return np.concatenate(parts).astype(dtype) if parts else np.zeros((0,) + shape, dtype=dtype)
+
+    names = [name for line in lines for name in line.station_names]
+    arrays = {
+        "line_ids": np.array(line_ids, dtype=np.int64),
+        "data_versions": np.array([versions[line_id] for line_id in line_ids], dtype=np.int64),
+        "station_offsets": np.concatenate([[0], np.cumsum(station_counts)]).astype(np.int64),
+        "eta_offsets": np.concatenate([[0], np.cumsum(eta_counts)]).astype(np.int64),
+        "station_ids": concat("station_ids", np.int64),
+        "station_names": np.array(names, dtype=str),
+        "eta_ids": concat("eta_ids", np.int64),
+        "eta_seconds": concat("eta_seconds", np.int64),
+        "platforms": concat("platforms", bool, (2,)),
+        "congestion": concat("congestion", np.float64, (2, DAY_SLOTS)),
+    }
+    os.makedirs(path)
+    for name, array in arrays.items():
+        with open(os.path.join(path, f"{name}.npy"), "wb") as f:
+            np.save(f, array, allow_pickle=False)
+            f.flush()
+            os.fsync(f.fileno())
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump({"version": version, "lines": len(line_ids), "stations": int(sum(station_counts))}, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _publish(name):
+    # 새 심볼릭 링크를 만든 뒤 current 위로 rename 하므로 읽는 쪽은 항상 완성된 버전 하나를 본다
+    link = os.path.join(SNAPSHOT_DIR, CURRENT_LINK)
+    tmp_link = f"{link}.{os.getpid()}"
+    if os.path.lexists(tmp_link):
+        os.unlink(tmp_link)
+    os.symlink(name, tmp_link)
+    os.replace(tmp_link, link)
+
+
+def _versions_on_disk():
+    return sorted(
+        int(entry[1:]) for entry in os.listdir(SNAPSHOT_DIR)
+        if entry.startswith("v") and entry[1:].isdigit()
+    )
+
+
+def rebuild(force=False):
+    """모든 노선의 스냅샷을 새로 만들어 게시하고 게시한 버전을 돌려준다 (BackgroundTasks 에서 실행)
+
+    여러 워커가 동시에 요청해도 파일 잠금으로 한 번에 하나씩 만들고, 잠금을 얻은 뒤 읽은 노선별 data_version 이
+    게시된 스냅샷과 같으면 만들지 않는다 (force 가 아니면). 사용하지 않으면 None.
+    """
+    if not SNAPSHOT_DIR:
+        return None
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, LOCK_FILE), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with get_db_connection() as (conn, cur):
+            # 버전과 입력을 한 트랜잭션(같은 읽기 시점)에서 읽는다
+            conn.rollback()
+            cur.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            try:
+                cur.execute("""
+                    SELECT l.ID, COALESCE(v.data_version, 0)
+                    FROM line l
+                    LEFT JOIN timetable_version v ON v.line_ID = l.ID
+                    ORDER BY l.ID
+                """)
+                versions = dict(cur.fetchall())
+                snap = current()
+                if not force and snap is not None and snap.arrays["line_ids"].tolist() == list(versions) \
+                        and snap.arrays["data_versions"].tolist() == list(versions.values()):
+                    return snap.version
+                inputs = histogram.load_network_inputs(cur, list(versions))
+            finally:
+                conn.rollback()
+
+        on_disk = _versions_on_disk()
+        version = (on_disk[-1] if on_disk else 0) + 1
+        name = f"v{version:06d}"
+        tmp_path = os.path.join(SNAPSHOT_DIR, f".{name}.{os.getpid()}")
+        try:
+            _write(tmp_path, version, list(versions), versions, inputs)
+            os.rename(tmp_path, os.path.join(SNAPSHOT_DIR, name))
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        _publish(name)
+
+        for old in _versions_on_disk()[:-KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, f"v{old:06d}"), ignore_errors=True)
+        logger.info("published snapshot %s (%d lines)", name, len(versions))
+        return version
+
+
+def rebuild_in_background():
+    """BackgroundTasks 용. 실패하면 로그만 남긴다 (버전이 맞지 않는 노선은 DB 에서 읽으므로 결과는 맞다)"""
+    try:
+        rebuild()
+    except Exception:
+        logger.exception("snapshot rebuild failed")
@@ -0,0 +1,93 @@
+"""정수 초 배열 기반 출발 시각표
+
+스케줄러 내부에서는 시각을 운행일 기준 초(자정 이후 구간은 24시간 이상도 허용)로만 다루고,
+"HH:MM:SS" / "MM:SS" 문자열은 응답을 만들 때 한 번만 만든다.
+"""
+import json
+
+import numpy as np
+
+from departure import format_clock
+
+DAY_SECONDS = 24 * 3600
+
+
+class Timetable:
+    """한 노선·방향의 열차 출발 시각과 역별 소요시간
+
+    departure_seconds: 열차별 출발 시각 (운행일 기준 초, int32)
+    eta_seconds: 역별 소요시간 (초, int32), station_names 와 같은 순서
+    """
+    __slots__ = ("line_id", "route_shape", "departure_seconds", "station_names", "eta_seconds")
+
+    def __init__(self, line_id, route_shape, departure_seconds, station_names, eta_seconds):
+        self.line_id = line_id
+        self.route_shape = route_shape
+        self.departure_seconds = np.asarray(departure_seconds, dtype=np.int32)
+        self.station_names = tuple(station_names)
+        self.eta_seconds = np.asarray(eta_seconds, dtype=np.int32)
+
+    @classmethod
+    def from_inputs(cls, inputs, route_shape, departure_seconds):
+        """LineInputs 의 역 순서대로 eta 행이 있는 역만 포함한다"""
+        names = []
+        seconds = []
+        if len(inputs.eta_ids):
+            pos = np.minimum(np.searchsorted(inputs.eta_ids, inputs.station_ids), len(inputs.eta_ids) - 1)
+            has_eta = inputs.eta_ids[pos] == inputs.station_ids
+            names = [name for name, present in zip(inputs.station_names, has_eta.tolist()) if present]
+            seconds = inputs.eta_seconds[pos[has_eta]]
+        return cls(inputs.line_id, route_shape, departure_seconds, names, seconds)
+
+    @property
+    def train_count(self):
+        return len(self.departure_seconds)
+
+    @property
+    def nbytes(self):
+        return self.departure_seconds.nbytes + self.eta_seconds.nbytes
+
+    def departure_strings(self):
+        return format_clock(self.departure_seconds % DAY_SECONDS)
+
+    def cdf_values(self):
+        n = self.train_count
+        return [round(i / n, 4) for i in range(n)]
+
+    def eta_strings(self):
+        minutes, seconds = np.divmod(self.eta_seconds, 60)
+        return [f"{m:02d}:{s:02d}" for m, s in zip(minutes.tolist(), seconds.tolist())]
+
+    def to_dict(self):
+        """get_departure_times 응답 형식"""
+        return {
+            "line_id": self.line_id,
+            "train_count": self.train_count,
+            "departure_times": [
+                {"departure_time": departure_time, "cdf_value": cdf_value}
+                for departure_time, cdf_value in zip(self.departure_strings(), self.cdf_values())
+            ],
+            "etas": [
+                {"station_name": name, "et": et}
+                for name, et in zip(self.station_names, self.eta_strings())
+            ],
+            "route_shape": self.route_shape
+        }
+
+    def to_json(self, **extra):
+        """to_dict() 를 JSONResponse 와 같은 형식으로 직렬화한 bytes (중간 dict 를 만들지 않는다)"""
+        parts = [f'{{"line_id":{json.dumps(self.line_id)},"train_count":{self.train_count},"departure_times":[']
+        parts.append(','.join(
+            f'{{"departure_time":"{departure_time}","cdf_value":{cdf_value!r}}}'
+            for departure_time, cdf_value in zip(self.departure_strings(), self.cdf_values())
+        ))
+        parts.append('],"etas":[')
+        parts.append(','.join(
+            f'{{"station_name":{json.dumps(name, ensure_ascii=False)},"et":"{et}"}}'
+            for name, et in zip(self.station_names, self.eta_strings())
+        ))
+        parts.append(f'],"route_shape":{json.dumps(self.route_shape, ensure_ascii=False)}')
+        for key, value in extra.items():
+            parts.append(f',{json.dumps(key)}:{json.dumps(value, ensure_ascii=False, separators=(",", ":"))}')
+        parts.append('}')
+        return ''.join(parts).encode('utf-8')
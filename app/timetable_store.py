@@ -0,0 +1,225 @@
+"""노선별 출발 시각 시간표 저장소
+
+입력 데이터(역/소요시간/혼잡도/열차/노선 형태)를 바꾸는 쓰기 트랜잭션 안에서 mark_stale 로
+timetable_version.input_version 을 올리고, 커밋한 뒤 rebuild_lines 를 백그라운드로 실행해
+바뀐 노선의 시간표만 다시 계산해 timetable 에 게시한다.
+조회는 timetable 기본 키 (line_ID, bound_to, seq) 범위 조회 한 번으로 끝난다.
+"""
+from datetime import timedelta
+import logging
+import threading
+
+import numpy as np
+
+from database import get_db_connection, execute_many
+from histogram import compute_histogram, format_seconds
+from snapshot import load_line_inputs
+from departure import invert_cdf
+
+logger = logging.getLogger(__name__)
+
+STATUS_STALE = 'STALE'
+STATUS_BUILDING = 'BUILDING'
+STATUS_FRESH = 'FRESH'
+STATUS_FAILED = 'FAILED'
+
+_lock = threading.Lock()
+_running = set()
+_pending = set()
+
+
+def mark_stale(cur, line_ids, data_changed=False):
+    """입력을 바꾸는 트랜잭션 안에서 호출한다 (커밋은 호출한 쪽에서)
+
+    역/소요시간/혼잡도를 바꿨으면 data_changed 로 data_version 도 올린다 (snapshot 이 그 노선을 쓰지 않게 된다).
+    """
+    step = 1 if data_changed else 0
+    for line_id in sorted(set(line_ids)):
+        # 없는 노선 ID 는 건너뛴다
+        cur.execute("""
+            INSERT INTO timetable_version (line_ID, input_version, data_version, status)
+            SELECT ID, 1, %s, 'STALE' FROM line WHERE ID = %s
+            ON DUPLICATE KEY UPDATE
+                timetable_version.input_version = timetable_version.input_version + 1,
+                timetable_version.data_version = timetable_version.data_version + %s,
+                timetable_version.status = 'STALE'
+        """, (step, line_id, step))
+
+
+def input_versions(cur, line_ids):
+    """{line_id: input_version}, 버전 행이 없는 노선은 0 (기본 키 조회 한 번)"""
+    line_ids = list(line_ids)
+    if not line_ids:
+        return {}
+    cur.execute(
+        f"SELECT line_ID, input_version FROM timetable_version "
+        f"WHERE line_ID IN ({', '.join(['%s'] * len(line_ids))})",
+        tuple(line_ids)
+    )
+    versions = dict(cur.fetchall())
+    return {line_id: versions.get(line_id, 0) for line_id in line_ids}
+
+
+def lines_near_stations(cur, low, high):
+    """station_ID 가 [low, high] 구간인 eta 행이 바뀌었을 때 입력이 달라지는 노선
+
+    각 노선은 자기 역 구간에 앞뒤 eta 한 행씩을 더 읽으므로 (load_line_inputs),
+    구간 바로 앞/뒤 eta 행까지 걸치는 노선을 모두 돌려준다.
+    """
+    cur.execute("SELECT MAX(station_ID) FROM eta WHERE station_ID < %s", (low,))
+    below = cur.fetchone()[0]
+    cur.execute("SELECT MIN(station_ID) FROM eta WHERE station_ID > %s", (high,))
+    above = cur.fetchone()[0]
+    cur.execute("""
+        SELECT line_ID FROM station
+        GROUP BY line_ID
+        HAVING MAX(ID) >= %s AND MIN(ID) <= %s
+    """, (low if below is None else below, high if above is None else above))
+    return [row[0] for row in cur.fetchall()]
+
+
+def rebuild_lines(line_ids):
+    """BackgroundTasks 에서 실행. 같은 노선을 이미 계산 중이면 끝난 뒤 한 번 더 계산한다"""
+    for line_id in sorted(set(line_ids)):
+        with _lock:
+            if line_id in _running:
+                _pending.add(line_id)
+                continue
+            _running.add(line_id)
+        try:
+            while True:
+                try:
+                    rebuild_line(line_id)
+                except Exception as e:
+                    logger.exception("timetable rebuild failed for line %s", line_id)
+                    _mark_rebuild_failed(line_id, e)
+                with _lock:
+                    if line_id not in _pending:
+                        break
+                    _pending.discard(line_id)
+        finally:
+            with _lock:
+                _running.discard(line_id)
+                _pending.discard(line_id)
+
+
+def _mark_rebuild_failed(line_id, error):
+    # BUILDING 에 머물지 않도록 STALE 로 되돌리고 사유를 남긴다 (다음 조회 때 다시 예약된다)
+    try:
+        with get_db_connection() as (conn, cur):
+            cur.execute(
+                "UPDATE timetable_version SET status = %s, error = %s WHERE line_ID = %s AND status = %s",
+                (STATUS_STALE, str(error)[:255], line_id, STATUS_BUILDING)
+            )
+            conn.commit()
+    except Exception:
+        logger.exception("cannot reset timetable status for line %s", line_id)
+
+
+def rebuild_line(line_id):
+    with get_db_connection() as (conn, cur):
+        cur.execute("SELECT input_version FROM timetable_version WHERE line_ID = %s", (line_id,))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("SELECT ID FROM line WHERE ID = %s", (line_id,))
+            if cur.fetchone() is None:
+                return
+            cur.execute("INSERT IGNORE INTO timetable_version (line_ID) VALUES (%s)", (line_id,))
+            conn.commit()
+            cur.execute("SELECT input_version FROM timetable_version WHERE line_ID = %s", (line_id,))
+            row = cur.fetchone()
+        input_version = row[0]
+
+        cur.execute(
+            "UPDATE timetable_version SET status = 'BUILDING' WHERE line_ID = %s AND input_version = %s",
+            (line_id, input_version)
+        )
+        # 커밋 뒤의 조회는 새 스냅샷에서 읽으므로 입력은 input_version 시점 이후의 값이다
+        conn.commit()
+
+        cur.execute("SELECT route_shape FROM line WHERE ID = %s", (line_id,))
+        row = cur.fetchone()
+        if row is None:
+            return
+        route_shape = row[0]
+        cur.execute("SELECT COUNT(*) FROM train WHERE line_ID = %s", (line_id,))
+        train_count = cur.fetchone()[0]
+
+        rows, error = build_rows(cur, line_id, route_shape, train_count)
+
+        cur.execute("DELETE FROM timetable WHERE line_ID = %s", (line_id,))
+        execute_many(
+            cur,
+            "INSERT INTO timetable (line_ID, bound_to, seq, departure_time, cdf_value) VALUES (%s, %s, %s, %s, %s)",
+            rows
+        )
+        cur.execute("""
+            UPDATE timetable_version
+            SET status = %s, built_version = input_version, route_shape = %s, train_count = %s,
+                error = %s, built_at = NOW()
+            WHERE line_ID = %s AND input_version = %s
+        """, (STATUS_FAILED if error else STATUS_FRESH, route_shape, train_count, error, line_id, input_version))
+        if cur.rowcount == 0:
+            # 계산하는 동안 입력이 다시 바뀌었다. 새로 예약된 재계산이 게시한다
+            conn.rollback()
+        else:
+            conn.commit()
+
+
+def build_rows(cur, line_id, route_shape, train_count):
+    """timetable 에 넣을 (line_ID, bound_to, seq, departure_time, cdf_value) 행과 실패 사유"""
+    if train_count == 0:
+        return [], "No trains found for this line"
+
+    inputs = load_line_inputs(cur, line_id)
+    rows = []
+    departures = None
+    for bound_to in (0, 1):
+        # 왕복 노선의 히스토그램은 bound_to 와 무관하므로 한 번만 계산한다
+        if departures is None or route_shape == 'CIRCULAR':
+            histogram = compute_histogram(inputs, route_shape, bound_to)
+            if np.isnan(histogram.cdf).any():
+                return [], "No congestion data for this line"
+            departures = invert_cdf(histogram.start_seconds, histogram.cdf, train_count).tolist()
+        for seq, seconds in enumerate(departures):
+            rows.append((line_id, bound_to, seq, timedelta(seconds=seconds), round(seq / train_count, 4)))
+    return rows, None
+
+
+def read_timetable(cur, line_id, bound_to):
+    """게시된 시간표와 버전 정보, 노선이 없으면 None"""
+    cur.execute("""
+        SELECT v.status, v.input_version, v.built_version, v.route_shape, v.train_count, v.error, v.built_at,
+               t.departure_time, t.cdf_value
+        FROM line l
+        LEFT JOIN timetable_version v ON v.line_ID = l.ID
+        LEFT JOIN timetable t ON t.line_ID = l.ID AND t.bound_to = %s
+        WHERE l.ID = %s
+        ORDER BY t.seq
+    """, (bound_to, line_id))
+    rows = cur.fetchall()
+    if not rows:
+        return None
+
+    status, input_version, built_version, route_shape, train_count, error, built_at = rows[0][:7]
+    departure_times = []
+    for row in rows:
+        if row[7] is None:
+            continue
+        departure_times.append({
+            "departure_time": format_seconds(row[7].total_seconds()),
+            "cdf_value": row[8]
+        })
+    return {
+        "line_id": line_id,
+        "bound_to": bound_to,
+        "status": status or STATUS_STALE,
+        "input_version": input_version or 0,
+        "built_version": built_version,
+        "fresh": built_version is not None and built_version == input_version,
+        "built_at": built_at,
+        "route_shape": route_shape,
+        "train_count": train_count,
+        "error": error,
+        "departure_times": departure_times,
+    }
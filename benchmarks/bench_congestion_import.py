@@ -0,0 +1,163 @@
+"""혼잡도 CSV import 벤치마크
+
+    python benchmarks/bench_congestion_import.py [--stations 60] [--repeat 3] [--offline]
+
+DATABASE_* 환경 변수로 설정된 MySQL 에 임시 노선을 만들고, 셀마다 INSERT 하던 예전 방식과
+line_csv.upload_congestion 의 다중 행 INSERT 방식을 비교한다.
+서버로 보낸 문장 수는 세션 상태 변수 Questions 의 증가분으로 센다.
+
+--offline 은 MySQL 없이 pymysql 커서가 만든 문장을 서버로 보내지 않고 세기만 한다.
+문장 수와 보낸 바이트 수는 MySQL 에 보낼 때와 같고, 시간은 클라이언트(CSV 해석, 문장 생성) 몫만 잰다.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from io import BytesIO, StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pymysql  # noqa: E402
+from fastapi import BackgroundTasks, UploadFile  # noqa: E402
+
+import congestion_store  # noqa: E402
+from database import get_db_connection  # noqa: E402
+from routers.line_csv import upload_stations, upload_congestion  # noqa: E402
+from synthetic import generate_line_rows, stations_csv, congestion_csv  # noqa: E402
+
+
+def legacy_import(conn, cur, line_id, content):
+    """변경 전 upload_congestion 과 같은 순서로 승강장 1행, 혼잡도 셀 1개마다 INSERT"""
+    reader = csv.DictReader(StringIO(content.decode('euc-kr')))
+    cur.execute("DELETE FROM congestion WHERE platform_station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+    cur.execute("DELETE FROM platform WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+    for row in reader:
+        station_id = int(row['역번호'])
+        bound_to = 1 if row['상하구분'] in ('상선', '내선') else 0
+        cur.execute("INSERT INTO platform (station_ID, bound_to) VALUES (%s, %s)", (station_id, bound_to))
+        for column in [col for col in row.keys() if ':' in col]:
+            hours, minutes = map(int, column.split(':'))
+            cur.execute(
+                "INSERT INTO congestion (platform_station_ID, platform_bound_to, time_slot, congest_status) "
+                "VALUES (%s, %s, %s, %s)",
+                (station_id, bound_to, f"{hours:02d}:{minutes:02d}:00", float(row[column] or 0))
+            )
+    conn.commit()
+
+
+def questions(cur):
+    cur.execute("SHOW SESSION STATUS LIKE 'Questions'")
+    return int(cur.fetchone()[1])
+
+
+class OfflineCursor(pymysql.cursors.Cursor):
+    """문장을 서버로 보내지 않고 수와 크기만 센다 (executemany 의 다중 행 INSERT 묶음은 pymysql 그대로)"""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.statements = 0
+        self.sent_bytes = 0
+
+    def _query(self, q):
+        self.statements += 1
+        self.sent_bytes += len(q.encode(self.connection.encoding) if isinstance(q, str) else q)
+        self.rowcount = 0
+        self.lastrowid = 0
+        self._rows = ()
+        return 0
+
+
+class OfflineConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def measure(runs, repeat, count, overhead=0):
+    """runs: (이름, 함수) 목록, count(): 지금까지 보낸 문장 수 (count 자신이 보내는 문장 수가 overhead)"""
+    results = {}
+    for name, run in runs:
+        elapsed = []
+        statements = 0
+        for _ in range(repeat):
+            before = count()
+            start = time.perf_counter()
+            run()
+            elapsed.append(time.perf_counter() - start)
+            statements = count() - before - overhead
+        results[name] = {"best_ms": min(elapsed) * 1000, "statements": statements}
+    return results
+
+
+def import_runs(conn, cur, line_id, content):
+    return (
+        ("per_cell_insert", lambda: legacy_import(conn, cur, line_id, content)),
+        ("bulk_insert", lambda: upload_congestion(
+            line_id, BackgroundTasks(), file=UploadFile(BytesIO(content), filename="congestion.csv"),
+            db=(conn, cur))),
+    )
+
+
+def offline(args):
+    stations, _, _, congestion = generate_line_rows(1, 1, args.stations)
+    content = congestion_csv(stations, congestion)
+    connection = pymysql.connections.Connection(defer_connect=True, charset="utf8mb4")
+    connection.server_status = 0  # 접속하지 않았으므로 문자열 이스케이프가 읽는 서버 상태를 직접 둔다
+    cur = OfflineCursor(connection)
+    results = {"stations": args.stations, "cells": len(congestion), "offline": True}
+    results.update(measure(import_runs(OfflineConnection(), cur, 1, content), args.repeat, lambda: cur.statements))
+    for name in ("per_cell_insert", "bulk_insert"):
+        before = cur.sent_bytes
+        dict(import_runs(OfflineConnection(), cur, 1, content))[name]()
+        results[name]["sent_bytes"] = cur.sent_bytes - before
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--offline", action="store_true", help="MySQL 없이 문장 수 / 바이트 수 / 클라이언트 시간만 잰다")
+    args = parser.parse_args()
+
+    if args.offline:
+        print(json.dumps(offline(args), indent=2))
+        return
+
+    with get_db_connection() as (conn, cur):
+        cur.execute("INSERT INTO line (name, route_shape) VALUES (%s, 'ROUND-TRIP')", (f"bench-import-{os.getpid()}",))
+        line_id = cur.lastrowid
+        cur.execute("SELECT COALESCE(MAX(ID), 0) + 1 FROM station")
+        first_station_id = cur.fetchone()[0]
+        conn.commit()
+
+        stations, etas, _, congestion = generate_line_rows(line_id, first_station_id, args.stations)
+        upload_stations(line_id, BackgroundTasks(),
+                        file=UploadFile(BytesIO(stations_csv(stations, etas)), filename="stations.csv"), db=(conn, cur))
+        content = congestion_csv(stations, congestion)
+
+        results = {"stations": args.stations, "cells": len(congestion)}
+        try:
+            # SHOW STATUS 자신은 세지 않는다
+            results.update(measure(import_runs(conn, cur, line_id, content), args.repeat,
+                                   lambda: questions(cur), overhead=1))
+        finally:
+            congestion_store.delete_line(cur, line_id)
+            cur.execute("DELETE FROM platform WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+            cur.execute("DELETE FROM garage WHERE line_ID = %s", (line_id,))
+            cur.execute("DELETE FROM eta WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+            cur.execute("DELETE FROM station WHERE line_ID = %s", (line_id,))
+            cur.execute("DELETE FROM line WHERE ID = %s", (line_id,))
+            conn.commit()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""혼잡도 저장 형식 비교 (rows / profile)
+
+    python benchmarks/bench_congestion_storage.py [--stations 100] [--repeat 50] [--mysql]
+
+같은 합성 노선으로 시간대마다 한 행(congestion)과 승강장마다 한 행(congestion_profile) 을 비교한다.
+기본으로는 DB 없이 조회 결과 행을 LineInputs 로 다시 조립하는 비용만 잰다.
+--mysql 을 주면 DATABASE_* 환경 변수로 설정된 MySQL 에 임시 노선을 만들어 두 형식으로 import 한 뒤
+행 수, 테이블 크기(information_schema), load_line_inputs 지연 시간을 잰다.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import histogram  # noqa: E402
+from histogram import BASE_SECONDS, build_line_inputs, pack_profile  # noqa: E402
+from synthetic import generate_line_rows, stations_csv, congestion_csv  # noqa: E402
+
+
+def profile_rows_from(congestion):
+    """(역, bound_to, 초, 값) 행을 (역, bound_to, profile) 행으로"""
+    index = {seconds: i for i, seconds in enumerate(BASE_SECONDS.tolist())}
+    profiles = {}
+    for station_id, bound_to, seconds, value in congestion:
+        profiles.setdefault((station_id, bound_to), np.zeros(len(BASE_SECONDS)))[index[seconds]] = value
+    return [(station_id, bound_to, pack_profile(values)) for (station_id, bound_to), values in profiles.items()]
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def set_storage(storage):
+    # 설정은 import 시점에 읽으므로 벤치마크에서는 모듈 값을 직접 바꾼다
+    from routers import line_csv
+    histogram.CONGESTION_STORAGE = storage
+    line_csv.CONGESTION_STORAGE = storage
+
+
+def table_sizes(cur, table):
+    cur.execute(f"ANALYZE TABLE {table}")
+    cur.fetchall()
+    cur.execute("""
+        SELECT TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    rows, data, index = cur.fetchone()
+    return {"table_rows": rows, "data_bytes": data, "index_bytes": index}
+
+
+def mysql_comparison(stations, etas, congestion, repeat):
+    from fastapi import BackgroundTasks, UploadFile
+    from database import get_db_connection
+    from routers.line_csv import upload_stations, upload_congestion
+    import congestion_store
+
+    results = {}
+    with get_db_connection() as (conn, cur):
+        cur.execute("INSERT INTO line (name, route_shape) VALUES (%s, 'ROUND-TRIP')", (f"bench-storage-{os.getpid()}",))
+        line_id = cur.lastrowid
+        cur.execute("SELECT COALESCE(MAX(ID), 0) + 1 FROM station")
+        first_station_id = cur.fetchone()[0]
+        conn.commit()
+
+        offset = first_station_id - stations[0][0]
+        stations = [(station_id + offset, name, line_id) for station_id, name, _ in stations]
+        etas = [(station_id + offset, seconds) for station_id, seconds in etas]
+        congestion = [(station_id + offset, bound_to, seconds, value) for station_id, bound_to, seconds, value in congestion]
+        upload_stations(line_id, BackgroundTasks(),
+                        file=UploadFile(BytesIO(stations_csv(stations, etas)), filename="stations.csv"), db=(conn, cur))
+        content = congestion_csv(stations, congestion)
+        try:
+            for storage, table in (("rows", "congestion"), ("profile", "congestion_profile")):
+                set_storage(storage)
+                start = time.perf_counter()
+                upload_congestion(line_id, BackgroundTasks(),
+                                  file=UploadFile(BytesIO(content), filename="congestion.csv"), db=(conn, cur))
+                import_ms = (time.perf_counter() - start) * 1000
+                cur.execute(f"""
+                    SELECT COUNT(*) FROM {table}
+                    WHERE platform_station_ID IN (SELECT ID FROM station WHERE line_ID = %s)
+                """, (line_id,))
+                line_rows = cur.fetchone()[0]
+                results[storage] = {
+                    "line_rows": line_rows,
+                    "import_ms": import_ms,
+                    "load_line_inputs_ms": timed(lambda: histogram.load_line_inputs(cur, line_id), repeat) * 1000,
+                    **table_sizes(cur, table),
+                }
+        finally:
+            congestion_store.delete_line(cur, line_id)
+            cur.execute("DELETE FROM platform WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+            cur.execute("DELETE FROM garage WHERE line_ID = %s", (line_id,))
+            cur.execute("DELETE FROM eta WHERE station_ID IN (SELECT ID FROM station WHERE line_ID = %s)", (line_id,))
+            cur.execute("DELETE FROM station WHERE line_ID = %s", (line_id,))
+            cur.execute("DELETE FROM timetable_version WHERE line_ID = %s", (line_id,))
+            cur.execute("DELETE FROM line WHERE ID = %s", (line_id,))
+            conn.commit()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--mysql", action="store_true", help="설정된 MySQL 에서 import / 조회 / 크기 비교")
+    args = parser.parse_args()
+
+    stations, etas, platforms, congestion = generate_line_rows(1, 1, args.stations)
+    line_stations = [(row[0], row[1]) for row in stations]
+    profiles = profile_rows_from(congestion)
+
+    from_rows = build_line_inputs(1, line_stations, etas, platforms, congestion)
+    from_profiles = build_line_inputs(1, line_stations, etas, platforms, (), profiles)
+    assert np.array_equal(from_rows.congestion, from_profiles.congestion)
+
+    results = {
+        "stations": args.stations,
+        "rows": {
+            "rows": len(congestion),
+            "build_line_inputs_ms": timed(lambda: build_line_inputs(
+                1, line_stations, etas, platforms, congestion), args.repeat) * 1000,
+        },
+        "profile": {
+            "rows": len(profiles),
+            "build_line_inputs_ms": timed(lambda: build_line_inputs(
+                1, line_stations, etas, platforms, (), profiles), args.repeat) * 1000,
+        },
+    }
+    if args.mysql:
+        results["mysql"] = mysql_comparison(stations, etas, congestion, args.repeat)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
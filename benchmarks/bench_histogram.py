@@ -0,0 +1,191 @@
+"""히스토그램 엔진 벤치마크 / 프로시저 일치 확인
+
+    python benchmarks/bench_histogram.py [--stations 100] [--repeat 50]
+
+histogram.compute_histogram 을 sql_procedures/ 의 두 프로시저를 행 단위로 그대로 옮긴
+참조 구현과 비교한다. 결과가 다르면 AssertionError 로 종료한다.
+DATABASE_* 환경 변수가 설정되어 있고 --line-id 를 주면 실제 프로시저 호출 결과와도 비교한다.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from histogram import build_line_inputs, compute_histogram, load_line_inputs  # noqa: E402
+from synthetic import generate_line_rows  # noqa: E402
+
+TIME_SLOTS = [(19800 + 1800 * i, i + 1) for i in range(37)] + [(0, 38), (1800, 39)]
+
+
+def reference_histogram(line_id, route_shape, bound_to, stations, etas, platforms, congestion):
+    """프로시저의 CTE 를 순서대로 옮긴 행 단위 구현"""
+    eta = dict(etas)
+    eta_sorted = sorted(etas)
+    if route_shape == 'CIRCULAR' and bound_to == 0:
+        eta_sorted = eta_sorted[::-1]
+    lead = {}
+    for i, (station_id, _) in enumerate(eta_sorted):
+        lead[station_id] = eta_sorted[i + 1][1] if i + 1 < len(eta_sorted) else None
+
+    line_ids = sorted(row[0] for row in stations if row[2] == line_id)
+    base = []
+    if route_shape == 'CIRCULAR':
+        for station_id in line_ids:
+            et = eta.get(station_id) if bound_to == 1 else lead.get(station_id)
+            base.append((station_id if bound_to == 1 else -station_id, station_id, bound_to, et or 0))
+    else:
+        last = max(line_ids) if line_ids else None
+        line_set = set(line_ids)
+        for station_id, bound in platforms:
+            if station_id not in line_set or (bound == 1 and station_id == last):
+                continue
+            et = eta.get(station_id) if bound == 1 else lead.get(station_id)
+            base.append(((-bound, station_id if bound == 1 else -station_id), station_id, bound, et or 0))
+    base.sort(key=lambda row: row[0])
+
+    cumulated = []
+    running = 0
+    for _, station_id, bound, et in base:
+        running += et
+        cumulated.append((station_id, bound, running))
+
+    summary = {}
+    for station_id, bound, seconds, value in congestion:
+        if route_shape == 'CIRCULAR' and bound != bound_to:
+            continue
+        summary[(station_id, bound, seconds)] = value
+
+    groups = {}
+    for base_time, slot_id in TIME_SLOTS:
+        for station_id, bound, cum in cumulated:
+            if route_shape == 'CIRCULAR':
+                arrival = base_time + cum
+                if arrival >= 86400:
+                    continue
+                time_slot = arrival // 1800 * 1800
+            else:
+                time_slot = base_time + cum // 1800 * 1800
+            group = groups.setdefault(base_time, [slot_id + 1, 0.0])
+            group[1] += summary.get((station_id, bound, time_slot)) or 0
+
+    histogram = [(5 * 3600 + 15 * 60, 0, 0.0)]
+    for base_time, (slot_id, total) in sorted(groups.items(), key=lambda item: item[1][0]):
+        histogram.append(((base_time + 900) % 86400, slot_id, total))
+    histogram.append((3600 + 15 * 60, 40, 0.0))
+
+    grand_total = sum(row[2] for row in histogram)
+    rows = []
+    preceding = 0.0
+    for start, _, total in histogram:
+        if grand_total:
+            pdf = round(total / grand_total, 4)
+            cdf = round((preceding + total * 0.5) / grand_total, 4)
+        else:
+            pdf = cdf = None
+        hours, remainder = divmod(start, 3600)
+        rows.append((f"{hours:02d}:{remainder // 60:02d}:00", total, pdf, cdf))
+        preceding += total
+    return rows
+
+
+def line_inputs_from_tables(line_id, stations, etas, platforms, congestion):
+    """load_line_inputs 와 같은 범위의 행만 골라 LineInputs 를 만든다"""
+    line_stations = sorted((row[0], row[1]) for row in stations if row[2] == line_id)
+    line_set = {row[0] for row in line_stations}
+    eta_rows = []
+    if line_stations:
+        first_id, last_id = line_stations[0][0], line_stations[-1][0]
+        below = [row for row in etas if row[0] < first_id]
+        above = [row for row in etas if row[0] > last_id]
+        eta_rows = [row for row in etas if first_id <= row[0] <= last_id]
+        if below:
+            eta_rows.append(max(below))
+        if above:
+            eta_rows.append(min(above))
+    return build_line_inputs(
+        line_id,
+        line_stations,
+        eta_rows,
+        [row for row in platforms if row[0] in line_set],
+        [row for row in congestion if row[0] in line_set],
+    )
+
+
+def assert_same(expected, actual):
+    assert len(expected) == len(actual), (len(expected), len(actual))
+    for e, a in zip(expected, actual):
+        assert e[0] == a[0] and e[2] == a[2] and e[3] == a[3], (e, a)
+        assert abs(e[1] - a[1]) < 1e-9, (e, a)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--line-id", type=int, help="설정된 DB 의 실제 노선과 프로시저 결과 비교")
+    args = parser.parse_args()
+
+    # 앞뒤에 다른 노선을 두어 eta 이웃 행 처리까지 확인한다
+    tables = [[], [], [], []]
+    first_id = 1
+    for line_id, count in ((1, 10), (2, args.stations), (3, 10)):
+        for table, rows in zip(tables, generate_line_rows(line_id, first_id, count, seed=line_id)):
+            table.extend(rows)
+        first_id += count
+    stations, etas, platforms, congestion = tables
+
+    results = {"stations": args.stations}
+    for route_shape, bound_to in (("ROUND-TRIP", 1), ("CIRCULAR", 1), ("CIRCULAR", 0)):
+        inputs = line_inputs_from_tables(2, stations, etas, platforms, congestion)
+        expected = reference_histogram(2, route_shape, bound_to, stations, etas, platforms, congestion)
+        assert_same(expected, compute_histogram(inputs, route_shape, bound_to).rows())
+
+        key = f"{route_shape.lower()}_{bound_to}"
+        results[key] = {
+            "reference_ms": timed(lambda: reference_histogram(
+                2, route_shape, bound_to, stations, etas, platforms, congestion), args.repeat) * 1000,
+            "engine_ms": timed(lambda: compute_histogram(inputs, route_shape, bound_to), args.repeat) * 1000,
+        }
+        results[key]["speedup"] = results[key]["reference_ms"] / results[key]["engine_ms"]
+
+    if args.line_id is not None:
+        from database import get_db_connection
+
+        with get_db_connection() as (conn, cur):
+            cur.execute("SELECT route_shape FROM line WHERE ID = %s", (args.line_id,))
+            route_shape = cur.fetchone()[0]
+            for bound_to in ((0, 1) if route_shape == 'CIRCULAR' else (1,)):
+                def call_procedure():
+                    if route_shape == 'CIRCULAR':
+                        cur.execute("CALL GetCircularHistogram(%s, %s)", (args.line_id, bound_to))
+                    else:
+                        cur.execute("CALL GetRoundTripHistogram(%s)", (args.line_id,))
+                    rows = cur.fetchall()
+                    while cur.nextset():
+                        pass
+                    return [(str(row[0]), row[1], row[2], row[3]) for row in rows]
+
+                inputs = load_line_inputs(cur, args.line_id)
+                assert_same(call_procedure(), compute_histogram(inputs, route_shape, bound_to).rows())
+                results[f"mysql_{bound_to}"] = {
+                    "procedure_ms": timed(call_procedure, args.repeat) * 1000,
+                    "load_and_engine_ms": timed(lambda: compute_histogram(
+                        load_line_inputs(cur, args.line_id), route_shape, bound_to), args.repeat) * 1000,
+                }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
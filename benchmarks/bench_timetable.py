@@ -0,0 +1,127 @@
+"""Timetable 메모리/직렬화 마이크로벤치마크
+
+    python benchmarks/bench_timetable.py [--trains 200] [--stations 50] [--repeat 200]
+
+이전 방식(열차/역마다 dict 를 만들어 캐시에 보관하고 FastAPI 가 jsonable_encoder 로 직렬화)과
+Timetable(정수 초 배열 보관, 응답 시 bytes 로 직접 직렬화)을 비교한다.
+두 방식의 응답 JSON 이 다르면 AssertionError 로 종료한다.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import numpy as np  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from timetable import Timetable  # noqa: E402
+
+
+def legacy_response(line_id, route_shape, departure_seconds, station_names, eta_seconds):
+    """user-015 이전 get_departure_times 가 만들던 응답 dict"""
+    train_count = len(departure_seconds)
+    departure_times = []
+    for i, seconds in enumerate(departure_seconds.tolist()):
+        hours, remainder = divmod(seconds, 3600)
+        minutes, secs = divmod(remainder, 60)
+        departure_times.append({
+            "departure_time": f"{hours:02d}:{minutes:02d}:{secs:02d}",
+            "cdf_value": round(i / train_count, 4)
+        })
+    etas = []
+    for name, total_seconds in zip(station_names, eta_seconds.tolist()):
+        etas.append({
+            "station_name": name,
+            "et": f"{total_seconds // 60:02d}:{total_seconds % 60:02d}"
+        })
+    return {
+        "line_id": line_id,
+        "train_count": train_count,
+        "departure_times": departure_times,
+        "etas": etas,
+        "route_shape": route_shape
+    }
+
+
+def legacy_render(response):
+    return JSONResponse(content=jsonable_encoder(response)).body
+
+
+def retained_bytes(build, count):
+    """build() 결과를 count 개 보관했을 때 늘어난 메모리 (개당 바이트)"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return total / count
+
+
+def peak_bytes(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trains", type=int, default=200)
+    parser.add_argument("--stations", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    departure_seconds = np.sort(np.array([rng.randint(5 * 3600, 25 * 3600) for _ in range(args.trains)])) % 86400
+    station_names = [f"역{index}" for index in range(args.stations)]
+    eta_seconds = np.array([0] + [rng.randint(60, 240) for _ in range(args.stations - 1)])
+
+    def build_legacy():
+        return legacy_response(1, "ROUND-TRIP", departure_seconds, station_names, eta_seconds)
+
+    def build_timetable():
+        return Timetable(1, "ROUND-TRIP", departure_seconds, station_names, eta_seconds)
+
+    legacy = build_legacy()
+    timetable = build_timetable()
+    assert legacy_render(legacy) == timetable.to_json(), "응답 JSON 이 다릅니다"
+
+    results = {
+        "trains": args.trains,
+        "stations": args.stations,
+        "stored_bytes": {
+            "legacy_dict": retained_bytes(build_legacy, 50),
+            "timetable": retained_bytes(build_timetable, 50),
+        },
+        "cache_hit": {
+            "legacy_ms": timed(lambda: legacy_render(legacy), args.repeat) * 1000,
+            "timetable_ms": timed(timetable.to_json, args.repeat) * 1000,
+            "legacy_peak_bytes": peak_bytes(lambda: legacy_render(legacy)),
+            "timetable_peak_bytes": peak_bytes(timetable.to_json),
+        },
+        "cache_miss": {
+            "legacy_ms": timed(lambda: legacy_render(build_legacy()), args.repeat) * 1000,
+            "timetable_ms": timed(lambda: build_timetable().to_json(), args.repeat) * 1000,
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
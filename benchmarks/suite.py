@@ -0,0 +1,239 @@
+"""API 벤치마크 모음
+
+    python benchmarks/suite.py [--lines 8] [--stations 50] [--circular 2] [--trains 30]
+                               [--repeat 20] [--batch-size 500]
+                               [--database subway_scheduler_bench] [--output result.json]
+
+DATABASE_HOST / DATABASE_ID / DATABASE_PASSWORD 로 접속하는 로컬 MySQL 에 --database 이름의
+벤치마크 전용 스키마를 새로 만들고 (있으면 지우고 다시 만든다), 합성 노선망을 실제 API
+(노선/열차 생성, line_csv import) 로 적재한 뒤 FastAPI TestClient 로 주요 엔드포인트 응답 시간을 잰다.
+같은 --seed 와 옵션이면 같은 데이터가 만들어지므로 결과 JSON 을 커밋 간에 비교할 수 있다.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from synthetic import generate_network  # noqa: E402
+
+
+def prepare_database(name):
+    """subway_scheduler_ai.sql 의 스키마 이름을 name 으로 바꿔 빈 스키마를 만든다"""
+    import pymysql
+
+    if not name.replace('_', '').isalnum():
+        raise SystemExit(f"invalid database name: {name}")
+    schema = (ROOT / "subway_scheduler_ai.sql").read_text(encoding="utf-8")
+    schema = schema.replace("`subway_scheduler`", f"`{name}`")
+
+    conn = pymysql.connect(
+        host=os.getenv("DATABASE_HOST", "127.0.0.1"),
+        port=int(os.getenv("DATABASE_PORT") or 3306),
+        user=os.getenv("DATABASE_ID", "root"),
+        password=os.getenv("DATABASE_PASSWORD") or "",
+        charset="utf8mb4",
+    )
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS `{name}`")
+            for statement in schema.split(";"):
+                lines = [line for line in statement.splitlines() if not line.strip().startswith("--")]
+                if "".join(lines).strip():
+                    cur.execute("\n".join(lines))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "min_ms": samples[0] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+class Recorder:
+    def __init__(self, client, headers):
+        self.client = client
+        self.headers = headers
+        self.samples = {}
+
+    def call(self, name, method, url, expect=200, **kwargs):
+        start = time.perf_counter()
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        response = self.client.request(method, url, headers=headers, **kwargs)
+        _ = response.content  # 스트리밍 응답은 본문을 끝까지 읽은 시간까지 잰다
+        elapsed = time.perf_counter() - start
+        if response.status_code != expect:
+            raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text[:200]}")
+        self.samples.setdefault(name, []).append(elapsed)
+        return response
+
+    def results(self):
+        return {name: summarize(samples) for name, samples in self.samples.items()}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--stations", type=int, default=50)
+    parser.add_argument("--circular", type=int, default=2, help="순환선 개수 (나머지는 왕복선)")
+    parser.add_argument("--trains", type=int, default=30, help="노선당 열차 수")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500, help="단건/일괄 생성 처리량 비교에 쓸 항목 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="subway_scheduler_bench")
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    prepare_database(args.database)
+    # 앱 모듈은 import 시점에 설정을 읽으므로 스키마를 만든 뒤에 불러온다
+    os.environ["DATABASE_NAME"] = args.database
+    os.environ.setdefault("DATABASE_HOST", "127.0.0.1")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+    from fastapi.testclient import TestClient
+    from main import app
+    from schedule_cache import schedule_cache
+
+    client = TestClient(app)
+    credentials = {"name": "bench", "password": "bench-password"}
+    client.post("/administrator/administrator/signup", json=credentials).raise_for_status()
+    token = client.post(
+        "/administrator/administrator/login",
+        data={"username": credentials["name"], "password": credentials["password"]},
+    ).json()["access_token"]
+    bench = Recorder(client, {"Authorization": f"Bearer {token}"})
+
+    network = generate_network(args.lines, args.stations, args.circular, args.trains, args.seed)
+
+    # 적재: 노선/열차 생성과 CSV import 도 실제 엔드포인트를 거친다
+    for line in network:
+        bench.call("create_line", "POST", "/line/", json={"name": line["name"], "route_shape": line["route_shape"]})
+    line_ids = {row["name"]: row["ID"] for row in bench.call("list_lines", "GET", "/line/").json()}
+    for line in network:
+        line["id"] = line_ids[line["name"]]
+        for _ in range(line["trains"]):
+            bench.call("create_train", "POST", "/train/", json={"Line_ID": line["id"]})
+        bench.call("import_stations", "POST", f"/line_csv/{line['id']}/import/stations",
+                   files={"file": ("stations.csv", line["stations_csv"], "text/csv")})
+        bench.call("import_congestion", "POST", f"/line_csv/{line['id']}/import/congestion",
+                   files={"file": ("congestion.csv", line["congestion_csv"], "text/csv")})
+
+    for _ in range(args.repeat):
+        for line in network:
+            bench.call("export_stations", "GET", f"/line_csv/{line['id']}/export/stations")
+            bench.call("export_congestion", "GET", f"/line_csv/{line['id']}/export/congestion")
+
+            schedule_cache.invalidate_line(line["id"])
+            bench.call("departure_times_cold", "GET", f"/scheduler/line/{line['id']}/departure-times",
+                       params={"bound_to": 1})
+            bench.call("departure_times_warm", "GET", f"/scheduler/line/{line['id']}/departure-times",
+                       params={"bound_to": 1})
+            bench.call("timetable", "GET", f"/scheduler/line/{line['id']}/timetable", params={"bound_to": 1})
+
+        schedule_cache.invalidate_all()
+        bench.call("batch_departure_times_cold", "GET", "/scheduler/departure-times")
+        bench.call("batch_departure_times_warm", "GET", "/scheduler/departure-times")
+
+        bench.call("list_lines", "GET", "/line/")
+        bench.call("list_trains", "GET", "/train/")
+        bench.call("list_trains_page", "GET", "/train/", params={"limit": 100, "fields": "ID"})
+        bench.call("list_motormen", "GET", "/motorman/")
+
+    # 생성 처리량: 같은 수의 기관사/열차/배치를 단건 엔드포인트와 일괄 엔드포인트로 만든다
+    # (스케줄러 측정에 영향을 주지 않도록 마지막에 측정한다)
+    line_id = network[0]["id"]
+    count = args.batch_size
+    throughput = {}
+
+    def timed_items(name, items, func):
+        start = time.perf_counter()
+        func()
+        throughput[name] = {"items": items, "items_per_second": items / (time.perf_counter() - start)}
+
+    timed_items("create_motorman_single", count, lambda: [
+        bench.call("create_motorman", "POST", "/motorman/", json={"name": f"단건기관사{index}"})
+        for index in range(count)
+    ])
+    batch_motormen = []
+    timed_items("create_motorman_batch", count, lambda: batch_motormen.extend(bench.call(
+        "create_motorman_batch", "POST", "/motorman/batch",
+        json=[{"name": f"일괄기관사{index}"} for index in range(count)],
+    ).json()["items"]))
+
+    timed_items("create_train_single", count, lambda: [
+        bench.call("create_train", "POST", "/train/", json={"Line_ID": line_id}) for _ in range(count)
+    ])
+    batch_trains = []
+    timed_items("create_train_batch", count, lambda: batch_trains.extend(bench.call(
+        "create_train_batch", "POST", "/train/batch",
+        content="".join(json.dumps({"Line_ID": line_id}) + "\n" for _ in range(count)),
+        headers={"Content-Type": "application/x-ndjson"},
+    ).json()["items"]))
+
+    pairs = [(train["ID"], motorman["ID"]) for train, motorman in zip(batch_trains, batch_motormen)]
+    # 배치는 절반은 단건으로, 나머지 절반은 일괄로 만든다
+    single_pairs, batch_pairs = pairs[:len(pairs) // 2], pairs[len(pairs) // 2:]
+    timed_items("create_drive_single", len(single_pairs), lambda: [
+        bench.call("create_drive", "POST", "/train_motorman/", json={"Train_ID": train_id, "Motorman_ID": motorman_id})
+        for train_id, motorman_id in single_pairs
+    ])
+    timed_items("create_drive_batch", len(batch_pairs), lambda: bench.call(
+        "create_drive_batch", "POST", "/train_motorman/batch",
+        json=[{"Train_ID": train_id, "Motorman_ID": motorman_id} for train_id, motorman_id in batch_pairs],
+    ))
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": {
+            "lines": args.lines,
+            "stations": args.stations,
+            "circular": args.circular,
+            "trains": args.trains,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "batch_size": args.batch_size,
+        },
+        "endpoints": bench.results(),
+        "throughput": throughput,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""벤치마크용 합성 노선 데이터 생성기"""
+import random
+
+# CSV 혼잡도 시간대: 05:30 ~ 23:30, 00:00, 00:30
+CONGESTION_SLOT_SECONDS = [19800 + 1800 * i for i in range(37)] + [0, 1800]
+
+
+def generate_line_rows(line_id, first_station_id, stations, seed=0, route_shape='ROUND-TRIP'):
+    """한 노선의 테이블 행을 만든다
+
+    반환: stations [(ID, name, line_ID)], etas [(station_ID, 초)], platforms [(station_ID, bound_to)],
+    congestion [(station_ID, bound_to, 초, congest_status)]
+    """
+    rng = random.Random(seed)
+    station_rows = []
+    eta_rows = []
+    platform_rows = []
+    congestion_rows = []
+    for index in range(stations):
+        station_id = first_station_id + index
+        station_rows.append((station_id, f"역{line_id}-{index}", line_id))
+        eta_rows.append((station_id, 0 if index == 0 else rng.randint(60, 240)))
+        for bound_to in (0, 1):
+            platform_rows.append((station_id, bound_to))
+            peak = rng.uniform(0.2, 1.0)
+            for slot_seconds in CONGESTION_SLOT_SECONDS:
+                hour = (slot_seconds // 3600) % 24
+                rush = 1.0 if hour in (7, 8, 18, 19) else 0.4
+                value = round(min(1.0, peak * rush * rng.uniform(0.6, 1.0)), 3)
+                congestion_rows.append((station_id, bound_to, slot_seconds, value))
+    return station_rows, eta_rows, platform_rows, congestion_rows
+
+
+def stations_csv(station_rows, eta_rows) -> bytes:
+    """line_csv 역 import 형식 (역번호, 역명, 소요시간 MM:SS) 의 EUC-KR CSV"""
+    eta = dict(eta_rows)
+    lines = ['역번호,역명,소요시간']
+    for station_id, name, _ in station_rows:
+        minutes, seconds = divmod(eta[station_id], 60)
+        lines.append(f"{station_id},{name},{minutes:02d}:{seconds:02d}")
+    return '\n'.join(lines).encode('euc-kr')
+
+
+def congestion_csv(station_rows, congestion_rows, route_shape='ROUND-TRIP') -> bytes:
+    """line_csv 혼잡도 import 형식 (역번호, 역명, 상하구분, 시간대...) 의 EUC-KR CSV"""
+    names = {row[0]: row[1] for row in station_rows}
+    labels = ('외선', '내선') if route_shape == 'CIRCULAR' else ('하선', '상선')
+    header = ['역번호', '역명', '상하구분'] + [
+        f"{(seconds // 3600):02d}:{(seconds % 3600) // 60:02d}" for seconds in CONGESTION_SLOT_SECONDS
+    ]
+    profiles = {}
+    for station_id, bound_to, seconds, value in congestion_rows:
+        profiles.setdefault((station_id, bound_to), {})[seconds] = value
+    lines = [','.join(header)]
+    for (station_id, bound_to), profile in sorted(profiles.items()):
+        values = [str(profile.get(seconds, 0)) for seconds in CONGESTION_SLOT_SECONDS]
+        lines.append(','.join([str(station_id), names[station_id], labels[bound_to]] + values))
+    return '\n'.join(lines).encode('euc-kr')
+
+
+def generate_network(lines, stations, circular=0, trains=20, seed=0):
+    """노선 lines 개 (그중 마지막 circular 개는 순환선) 의 입력 데이터
+
+    반환: 노선별 {"name", "route_shape", "trains", "stations_csv", "congestion_csv"} 목록.
+    역 ID 는 노선 순서대로 이어 붙여 1 부터 매긴다.
+    """
+    network = []
+    first_station_id = 1
+    for index in range(lines):
+        route_shape = 'CIRCULAR' if index >= lines - circular else 'ROUND-TRIP'
+        station_rows, eta_rows, _, congestion_rows = generate_line_rows(
+            index + 1, first_station_id, stations, seed=seed + index, route_shape=route_shape
+        )
+        network.append({
+            "name": f"bench-{seed}-{index + 1}",
+            "route_shape": route_shape,
+            "trains": trains,
+            "stations_csv": stations_csv(station_rows, eta_rows),
+            "congestion_csv": congestion_csv(station_rows, congestion_rows, route_shape),
+        })
+        first_station_id += stations
+    return network
@@ -106,6 +106,26 @@ DEFAULT CHARACTER SET = utf8mb4
 COLLATE = utf8mb4_0900_ai_ci;
 
 
+-- -----------------------------------------------------
+-- Table `subway_scheduler`.`congestion_profile`
+-- CONGESTION_STORAGE=profile 일 때 congestion 대신 사용. profile 은 05:30 ~ 00:30 시간대 39개의
+-- 혼잡도를 순서대로 이어 붙인 little-endian DOUBLE (39 * 8 바이트)
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `subway_scheduler`.`congestion_profile` (
+  `platform_station_ID` INT NOT NULL,
+  `platform_bound_to` TINYINT(1) NOT NULL,
+  `profile` BINARY(312) NOT NULL,
+  PRIMARY KEY (`platform_station_ID`, `platform_bound_to`),
+  CONSTRAINT `fk_congestion_profile_platform1`
+    FOREIGN KEY (`platform_station_ID` , `platform_bound_to`)
+    REFERENCES `subway_scheduler`.`platform` (`station_ID` , `bound_to`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8mb4
+COLLATE = utf8mb4_0900_ai_ci;
+
+
 -- -----------------------------------------------------
 -- Table `subway_scheduler`.`eta`
 -- -----------------------------------------------------
@@ -155,7 +175,9 @@ COLLATE = utf8mb4_0900_ai_ci;
 CREATE TABLE IF NOT EXISTS `subway_scheduler`.`motorman` (
   `ID` INT NOT NULL AUTO_INCREMENT,
   `name` VARCHAR(50) NOT NULL,
-  PRIMARY KEY (`ID`))
+  PRIMARY KEY (`ID`),
+  INDEX `name_prefix_idx` (`name` ASC) VISIBLE,
+  FULLTEXT INDEX `name_ngram_idx` (`name`) WITH PARSER ngram)
 ENGINE = InnoDB
 DEFAULT CHARACTER SET = utf8mb4
 COLLATE = utf8mb4_0900_ai_ci;
@@ -196,6 +218,50 @@ DEFAULT CHARACTER SET = utf8mb4
 COLLATE = utf8mb4_0900_ai_ci;
 
 
+-- -----------------------------------------------------
+-- Table `subway_scheduler`.`timetable_version`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `subway_scheduler`.`timetable_version` (
+  `line_ID` INT NOT NULL,
+  `input_version` INT NOT NULL DEFAULT 0,
+  `data_version` INT NOT NULL DEFAULT 0,
+  `built_version` INT NULL DEFAULT NULL,
+  `status` ENUM('STALE', 'BUILDING', 'FRESH', 'FAILED') NOT NULL DEFAULT 'STALE',
+  `route_shape` ENUM('ROUND-TRIP', 'CIRCULAR') NULL DEFAULT NULL,
+  `train_count` INT NULL DEFAULT NULL,
+  `error` VARCHAR(255) NULL DEFAULT NULL,
+  `built_at` DATETIME NULL DEFAULT NULL,
+  PRIMARY KEY (`line_ID`),
+  CONSTRAINT `fk_timetable_version_line1`
+    FOREIGN KEY (`line_ID`)
+    REFERENCES `subway_scheduler`.`line` (`ID`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8mb4
+COLLATE = utf8mb4_0900_ai_ci;
+
+
+-- -----------------------------------------------------
+-- Table `subway_scheduler`.`timetable`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `subway_scheduler`.`timetable` (
+  `line_ID` INT NOT NULL,
+  `bound_to` TINYINT(1) NOT NULL,
+  `seq` INT NOT NULL,
+  `departure_time` TIME NOT NULL,
+  `cdf_value` DOUBLE NOT NULL,
+  PRIMARY KEY (`line_ID`, `bound_to`, `seq`),
+  CONSTRAINT `fk_timetable_line1`
+    FOREIGN KEY (`line_ID`)
+    REFERENCES `subway_scheduler`.`line` (`ID`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8mb4
+COLLATE = utf8mb4_0900_ai_ci;
+
+
 SET SQL_MODE=@OLD_SQL_MODE;
 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS;
 SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS;
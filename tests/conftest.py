@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 앱 모듈은 app/ 를 기준으로 import 한다 (uvicorn 실행 위치와 같게)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
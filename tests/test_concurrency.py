@@ -0,0 +1,66 @@
+"""동기(def) 엔드포인트가 느린 DB 호출 중에도 이벤트 루프를 막지 않는지 확인"""
+import asyncio
+import time
+from contextlib import contextmanager
+
+import httpx
+
+import main
+from auth import get_current_user
+from database import get_db
+from routers import scheduler
+
+DB_DELAY = 0.2
+REQUESTS = 8
+
+
+class SlowCursor:
+    """모든 쿼리가 DB_DELAY 초 걸리고 빈 결과를 돌려주는 커서"""
+
+    def execute(self, sql, params=None):
+        time.sleep(DB_DELAY)
+
+    def fetchall(self):
+        return ()
+
+    def fetchone(self):
+        return None
+
+
+@contextmanager
+def slow_connection():
+    yield None, SlowCursor()
+
+
+def slow_db():
+    yield None, SlowCursor()
+
+
+async def _fetch_concurrently(path):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path) for _ in range(REQUESTS)))
+        return time.perf_counter() - start, responses
+
+
+def test_departure_times_requests_overlap(monkeypatch):
+    monkeypatch.setattr(scheduler, "get_db_connection", slow_connection)
+
+    elapsed, responses = asyncio.run(_fetch_concurrently("/scheduler/departure-times"))
+
+    assert all(response.status_code == 200 for response in responses)
+    # 요청이 차례로 처리되면 REQUESTS * DB_DELAY 가 걸린다
+    assert elapsed < DB_DELAY * 3
+
+
+def test_get_db_requests_overlap():
+    main.app.dependency_overrides[get_db] = slow_db
+    main.app.dependency_overrides[get_current_user] = lambda: {"sub": "test"}
+    try:
+        elapsed, responses = asyncio.run(_fetch_concurrently("/line/"))
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert elapsed < DB_DELAY * 3
@@ -0,0 +1,44 @@
+"""fleet_size.smallest_fleet 이 전체 후보를 훑은 결과와 같은지, 답이 가까우면 일찍 멈추는지"""
+import numpy as np
+import pytest
+
+import fleet_size
+from fleet_size import DemandCurve, peak_shares, smallest_fleet
+from histogram import build_line_inputs, compute_histogram
+
+MAX_TRAINS = 600
+
+
+@pytest.fixture(scope="module")
+def curve():
+    stations = [(station_id, f"역{station_id}") for station_id in range(1, 11)]
+    etas = [(station_id, 120) for station_id, _ in stations]
+    platforms = [(station_id, bound_to) for station_id, _ in stations for bound_to in (0, 1)]
+    # 출근 시간대(07:00 ~ 09:00)가 나머지보다 세 배 붐비는 노선
+    congestion = [(station_id, bound_to, seconds, 0.9 if 25200 <= seconds < 32400 else 0.3)
+                  for station_id, bound_to in platforms
+                  for seconds in range(19800, 86400, 1800)]
+    inputs = build_line_inputs(1, stations, etas, platforms, congestion)
+    return DemandCurve.from_histogram(compute_histogram(inputs, "ROUND-TRIP", 1))
+
+
+@pytest.mark.parametrize("target", [0.5, 0.1, 0.03, 0.01, 0.004, 0.0017])
+def test_matches_full_scan(curve, target):
+    shares = peak_shares(curve, np.arange(1, MAX_TRAINS + 1))
+    passing = np.flatnonzero(shares <= target)
+    expected = int(passing[0]) + 1 if passing.size else None
+
+    assert smallest_fleet(curve, target, MAX_TRAINS) == expected
+
+
+def test_stops_at_first_chunk_when_answer_is_near(curve, monkeypatch):
+    computed = []
+
+    def counting_peak_shares(curve, train_counts):
+        computed.extend(train_counts)
+        return peak_shares(curve, train_counts)
+
+    monkeypatch.setattr(fleet_size, "peak_shares", counting_peak_shares)
+
+    assert smallest_fleet(curve, 0.1, MAX_TRAINS) is not None
+    assert sum(computed) <= fleet_size._FIRST_SCAN_TRAINS
@@ -0,0 +1,135 @@
+"""histogram.compute_histogram 이 프로시저(GetRoundTripHistogram / GetCircularHistogram)와 같은 값을 내는지
+
+고정된 eta / 승강장 / 혼잡도 행으로 손으로 계산한 히스토그램과 비교한다.
+
+    노선 1 (ROUND-TRIP): 역 10, 11, 12
+    노선 2 (ROUND-TRIP): 역 13, 14, 15
+    노선 3 (CIRCULAR):   역 16, 17, 18
+"""
+import sqlite3
+
+import pytest
+
+import histogram
+from histogram import compute_histogram, format_seconds
+
+# 역 ID -> 소요시간(초)
+ETA = {10: 0, 11: 600, 12: 600, 13: 1800, 14: 900, 15: 900, 16: 3600, 17: 3600, 18: 3600}
+LINES = {1: (10, 11, 12), 2: (13, 14, 15), 3: (16, 17, 18)}
+# (역, bound_to, 시간대, 혼잡도)
+CONGESTION = [
+    (12, 0, "06:00:00", 4),
+    (10, 1, "07:00:00", 2),
+    (15, 1, "07:00:00", 5),
+    (15, 0, "08:00:00", 3),
+    (16, 1, "23:30:00", 7),
+    (18, 1, "00:30:00", 6),
+    (18, 1, "03:00:00", 1),
+]
+
+
+def _seconds(clock):
+    hours, minutes, seconds = map(int, clock.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+class SqliteCursor:
+    """pymysql 커서처럼 %s 자리표시자를 받는 sqlite 커서 (TIME_TO_SEC 은 초로 저장해 그대로 돌려준다)"""
+
+    def __init__(self, db):
+        self.db = db
+        self.result = None
+
+    def execute(self, sql, params=()):
+        self.result = self.db.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        return self.result.fetchall()
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    db = sqlite3.connect(":memory:")
+    db.create_function("TIME_TO_SEC", 1, lambda value: value)
+    db.execute("CREATE TABLE station (ID, name, line_ID)")
+    db.execute("CREATE TABLE eta (station_ID, ET)")
+    db.execute("CREATE TABLE platform (station_ID, bound_to)")
+    db.execute("CREATE TABLE congestion (platform_station_ID, platform_bound_to, time_slot, congest_status)")
+    for line_id, station_ids in LINES.items():
+        for station_id in station_ids:
+            db.execute("INSERT INTO station VALUES (?, ?, ?)", (station_id, f"역{station_id}", line_id))
+            db.execute("INSERT INTO eta VALUES (?, ?)", (station_id, ETA[station_id]))
+            db.executemany("INSERT INTO platform VALUES (?, ?)", [(station_id, 0), (station_id, 1)])
+    db.executemany("INSERT INTO congestion VALUES (?, ?, ?, ?)",
+                   [(station_id, bound_to, _seconds(slot), value) for station_id, bound_to, slot, value in CONGESTION])
+    return histogram.load_network_inputs(SqliteCursor(db), list(LINES))
+
+
+def _round_trip_start_times():
+    return (["05:15:00"] + [format_seconds(19800 + 1800 * i + 900) for i in range(37)]
+            + ["00:15:00", "00:45:00", "01:15:00"])
+
+
+def _assert_histogram(result, start_times, totals, pdf, cdf):
+    assert [format_seconds(seconds) for seconds in result.start_seconds.tolist()] == start_times
+    assert result.totals.tolist() == totals
+    assert result.pdf.tolist() == pdf
+    assert result.cdf.tolist() == cdf
+
+
+def test_round_trip_lead_reads_next_station_across_lines(inputs):
+    # 상행 10(0), 11(600) / 하행 12, 11, 10 은 다음 역 ID 의 소요시간을 쓴다.
+    # 12 의 다음 행은 노선 2 의 역 13(1800) 이므로 누적 0, 600, 2400, 3000, 3600 초
+    # -> 하행 12 는 출발 05:30 에 06:00 시간대(4), 상행 10 은 출발 07:00 에 07:00 시간대(2)
+    result = compute_histogram(inputs[1], "ROUND-TRIP", 1)
+
+    totals = [0.0] * 41
+    totals[1] = 4.0
+    totals[4] = 2.0
+    _assert_histogram(
+        result,
+        _round_trip_start_times(),
+        totals,
+        [0.0, 0.6667, 0.0, 0.0, 0.3333] + [0.0] * 36,
+        [0.0, 0.3333, 0.6667, 0.6667, 0.8333] + [1.0] * 36,
+    )
+    # 왕복 노선은 bound_to 와 관계없이 같은 히스토그램
+    assert compute_histogram(inputs[1], "ROUND-TRIP", 0).totals.tolist() == totals
+
+
+def test_round_trip_excludes_up_platform_of_last_station(inputs):
+    # 마지막 역 15 의 상행 승강장(혼잡도 5)은 제외한다.
+    # 상행 13(1800), 14(900) / 하행 15(다음 행 16: 3600), 14(900), 13(900)
+    # -> 누적 1800, 2700, 6300, 7200, 8100 초, 하행 15 는 출발 06:30 에 08:00 시간대(3)
+    result = compute_histogram(inputs[2], "ROUND-TRIP", 1)
+
+    totals = [0.0] * 41
+    totals[3] = 3.0
+    _assert_histogram(
+        result,
+        _round_trip_start_times(),
+        totals,
+        [0.0, 0.0, 0.0, 1.0] + [0.0] * 37,
+        [0.0, 0.0, 0.0, 0.5] + [1.0] * 37,
+    )
+
+
+def test_circular_drops_arrivals_at_or_after_midnight(inputs):
+    # 상행 16, 17, 18 누적 3600, 7200, 10800 초
+    # - 출발 23:00, 23:30 은 첫 역 도착부터 24시 이후라 구간이 빠진다
+    # - 18 의 00:30 시간대(6)는 출발 21:30 의 도착 24:30 으로만 닿으므로 세지 않는다
+    # - 출발 22:30 에 16 의 23:30 시간대(7), 출발 00:00 에 18 의 03:00 시간대(1)
+    result = compute_histogram(inputs[3], "CIRCULAR", 1)
+
+    start_times = (["05:15:00"] + [format_seconds(19800 + 1800 * i + 900) for i in range(35)]
+                   + ["00:15:00", "00:45:00", "01:15:00"])
+    totals = [0.0] * 39
+    totals[35] = 7.0
+    totals[36] = 1.0
+    _assert_histogram(
+        result,
+        start_times,
+        totals,
+        [0.0] * 35 + [0.875, 0.125, 0.0, 0.0],
+        [0.0] * 35 + [0.4375, 0.9375, 1.0, 1.0],
+    )
@@ -0,0 +1,162 @@
+"""혼잡도 CSV 내보내기"""
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_current_user
+from routers import line_csv
+
+
+class SqliteCursor:
+    """pymysql 커서처럼 %s 자리표시자를 받고 행을 순회할 수 있는 sqlite 커서"""
+
+    def __init__(self, db):
+        self.db = db
+        self.result = None
+
+    def execute(self, sql, params=()):
+        self.result = self.db.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        return self.result.fetchall()
+
+    def __iter__(self):
+        return iter(self.result)
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    db.create_function("TIME_TO_SEC", 1, lambda value: value)
+    db.execute("CREATE TABLE line (ID, route_shape)")
+    db.execute("CREATE TABLE station (ID, name, line_ID)")
+    db.execute("CREATE TABLE platform (station_ID, bound_to)")
+    db.execute("CREATE TABLE congestion (platform_station_ID, platform_bound_to, time_slot, congest_status)")
+    db.execute("INSERT INTO line VALUES (1, 'ROUND-TRIP')")
+    db.executemany("INSERT INTO station VALUES (?, ?, 1)", [(10, "시청"), (11, "종각")])
+    db.executemany("INSERT INTO platform VALUES (?, ?)", [(10, 0), (10, 1), (11, 0)])
+    db.executemany("INSERT INTO congestion VALUES (?, ?, ?, ?)", [(10, 1, 19800, 30), (11, 0, 0, 12)])
+
+    opened = []
+
+    @contextmanager
+    def get_db_connection(cursor=None):
+        opened.append("open")
+        try:
+            yield db, SqliteCursor(db)
+        finally:
+            opened.append("close")
+
+    monkeypatch.setattr(line_csv, "get_db_connection", get_db_connection)
+    monkeypatch.setattr(line_csv, "CONGESTION_STORAGE", "rows")
+    main.app.dependency_overrides[get_current_user] = lambda: {"sub": "test"}
+    yield opened
+    main.app.dependency_overrides.clear()
+
+
+def test_export_congestion_streams_from_one_connection(connections):
+    response = TestClient(main.app).get("/line_csv/1/export/congestion")
+
+    assert response.status_code == 200
+    lines = response.content.decode("euc-kr").split("\n")
+    assert lines[0].startswith("역번호,역명,상하구분,05:30,06:00")
+    assert lines[0].endswith(",23:30,00:00,00:30")
+    assert lines[1:] == [
+        "10,시청,하선," + ",".join(["0"] * 39),
+        "10,시청,상선,30," + ",".join(["0"] * 38),
+        "11,종각,하선," + ",".join(["0"] * 37) + ",12,0",
+    ]
+    assert connections == ["open", "close"]
+
+
+def test_export_congestion_unknown_line_is_404(connections):
+    response = TestClient(main.app).get("/line_csv/2/export/congestion")
+
+    assert response.status_code == 404
+    assert connections == ["open", "close"]
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchall(self):
+        return [(1,), (2,)]
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def migration(monkeypatch):
+    from database import get_db
+
+    cur = RecordingCursor()
+    conn = RecordingConnection()
+    monkeypatch.setattr(line_csv, "CONGESTION_STORAGE", "rows")
+    main.app.dependency_overrides[get_db] = lambda: (conn, cur)
+    main.app.dependency_overrides[get_current_user] = lambda: {"sub": "test"}
+    yield conn, cur
+    main.app.dependency_overrides.clear()
+
+
+def test_migrate_to_active_storage_is_rejected(migration):
+    conn, cur = migration
+
+    response = TestClient(main.app).post("/line_csv/migrate/congestion", params={"storage": "rows"})
+
+    assert response.status_code == 400
+    assert cur.statements == []
+
+
+def test_drop_source_while_source_is_active_is_rejected(migration):
+    conn, cur = migration
+
+    response = TestClient(main.app).post("/line_csv/migrate/congestion",
+                                         params={"storage": "profile", "drop_source": "true"})
+
+    assert response.status_code == 400
+    assert cur.statements == []
+
+
+def test_migrate_marks_lines_stale_and_schedules_rebuilds(migration, monkeypatch):
+    conn, cur = migration
+    calls = []
+    monkeypatch.setattr(line_csv.congestion_store, "migrate_line", lambda cur, line_id, storage: 2)
+    monkeypatch.setattr(line_csv.timetable_store, "mark_stale",
+                        lambda cur, line_ids, data_changed=False: calls.append(("stale", line_ids, data_changed)))
+    monkeypatch.setattr(line_csv.timetable_store, "rebuild_lines", lambda line_ids: calls.append(("rebuild", line_ids)))
+    monkeypatch.setattr(line_csv.snapshot, "rebuild_in_background", lambda: calls.append(("snapshot",)))
+
+    response = TestClient(main.app).post("/line_csv/migrate/congestion", params={"storage": "profile"})
+
+    assert response.status_code == 200
+    assert response.json() == {"storage": "profile", "lines": 2, "platforms": 4}
+    assert calls == [("stale", [1], True), ("stale", [2], True), ("snapshot",), ("rebuild", [1, 2])]
+    assert conn.commits == 2
+
+
+def test_drop_source_after_switch_only_deletes_old_storage(migration):
+    conn, cur = migration
+
+    response = TestClient(main.app).post("/line_csv/migrate/congestion",
+                                         params={"storage": "rows", "drop_source": "true"})
+
+    assert response.status_code == 200
+    assert response.json()["dropped"] == "profile"
+    deletes = [sql for sql in cur.statements if "DELETE" in sql]
+    assert len(deletes) == 2 and all("congestion_profile" in sql for sql in deletes)
@@ -0,0 +1,42 @@
+"""MetricsMiddleware: 요청 안 / 밖 쿼리 집계"""
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        return 0
+
+
+def _run_query():
+    metrics.InstrumentedCursor(FakeCursor()).execute("SELECT 1")
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics-test/query")
+    def query(background_tasks: BackgroundTasks):
+        _run_query()
+        background_tasks.add_task(_run_query)
+        return {}
+
+    return app
+
+
+def _queries(route):
+    return metrics.DB_QUERIES._series.get((route,), 0)
+
+
+def test_background_task_queries_count_outside_request():
+    before_request = _queries("/metrics-test/query")
+    before_outside = _queries("-")
+
+    response = TestClient(_app()).get("/metrics-test/query")
+
+    assert response.status_code == 200
+    assert _queries("/metrics-test/query") - before_request == 1
+    assert _queries("-") - before_outside == 1
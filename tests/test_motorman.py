@@ -0,0 +1,44 @@
+"""기관사 이름 검색 조건"""
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_current_user
+from database import get_db
+from routers.motorman import _name_search_query
+from settings import MOTORMAN_SEARCH_DEFAULT_LIMIT
+
+
+def test_short_term_matches_anywhere_in_name():
+    condition, params, order, order_params = _name_search_query("민")
+
+    assert condition == "name LIKE %s"
+    assert params == ["%민%"]
+    assert order_params == ["민", "민%"]
+
+
+def test_short_term_escapes_like_wildcards():
+    _, params, _, _ = _name_search_query("%")
+
+    assert params == ["%\\%%"]
+
+
+class RecordingCursor:
+    def execute(self, sql, params=None):
+        self.sql, self.params = sql, params
+
+    def fetchall(self):
+        return ()
+
+
+def test_name_search_without_limit_uses_default():
+    cur = RecordingCursor()
+    main.app.dependency_overrides[get_db] = lambda: (None, cur)
+    main.app.dependency_overrides[get_current_user] = lambda: {"sub": "test"}
+    try:
+        response = TestClient(main.app).get("/motorman/", params={"motorman_name": "김"})
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert cur.sql.endswith("LIMIT %s")
+    assert cur.params[-1] == MOTORMAN_SEARCH_DEFAULT_LIMIT
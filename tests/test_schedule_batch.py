@@ -0,0 +1,59 @@
+"""schedule_batch 프로세스 풀: 노선 하나의 실패가 다른 노선 결과를 막지 않는지"""
+import os
+
+import pytest
+
+import schedule_batch
+from histogram import build_line_inputs
+from timetable import Timetable
+
+
+class ExitOnUnpickle:
+    """워커에서 인자를 unpickle 하는 순간 프로세스를 끝낸다 (메모리 부족 등으로 워커가 죽는 경우)"""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+def _inputs(line_id):
+    stations = [(line_id * 10 + i, f"역{i}") for i in range(3)]
+    etas = [(station_id, 600) for station_id, _ in stations]
+    platforms = [(station_id, bound_to) for station_id, _ in stations for bound_to in (0, 1)]
+    congestion = [(station_id, bound_to, 19800 + 1800 * slot, 1.0 + slot)
+                  for station_id, bound_to in platforms for slot in range(10)]
+    return build_line_inputs(line_id, stations, etas, platforms, congestion)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(schedule_batch, "SCHEDULE_BATCH_WORKERS", 2)
+    schedule_batch.start()
+    yield
+    schedule_batch.shutdown()
+
+
+def test_failed_line_is_reported_and_others_finish(pool):
+    jobs = [
+        (1, _inputs(1), "ROUND-TRIP", 1, 5),
+        (2, None, "ROUND-TRIP", 1, 5),
+        (3, _inputs(3), "CIRCULAR", 0, 5),
+    ]
+
+    results = dict(schedule_batch.run_schedules(jobs))
+
+    assert isinstance(results[1], Timetable)
+    assert isinstance(results[2], Exception)
+    assert isinstance(results[3], Timetable)
+
+
+def test_broken_pool_is_replaced(pool):
+    broken = schedule_batch.get_executor()
+    jobs = [(1, _inputs(1), "ROUND-TRIP", 1, 5), (2, ExitOnUnpickle(), "ROUND-TRIP", 1, 5)]
+
+    results = dict(schedule_batch.run_schedules(jobs))
+
+    assert isinstance(results[2], Exception)
+    assert schedule_batch.get_executor() is not broken
+    results = dict(schedule_batch.run_schedules([(1, _inputs(1), "ROUND-TRIP", 1, 5),
+                                                 (3, _inputs(3), "CIRCULAR", 1, 5)]))
+    assert all(isinstance(result, Timetable) for result in results.values())
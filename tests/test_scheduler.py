@@ -0,0 +1,66 @@
+"""scheduler 라우터 오류 응답"""
+import json
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+
+import main
+from histogram import build_line_inputs
+from routers import scheduler
+
+
+class FakeCursor:
+    """fetchone 은 rows 의 다음 값, fetchall 은 all_rows 를 돌려준다"""
+
+    def __init__(self, rows, all_rows=()):
+        self.rows = list(rows)
+        self.all_rows = all_rows
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def fetchall(self):
+        return self.all_rows
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+def _connection(*rows, all_rows=()):
+    @contextmanager
+    def get_db_connection():
+        yield None, FakeCursor(rows, all_rows)
+    return get_db_connection
+
+
+def test_departure_times_without_trains_is_404(monkeypatch):
+    monkeypatch.setattr(scheduler, "get_db_connection", _connection((0,)))
+
+    response = TestClient(main.app).get("/scheduler/line/1/departure-times", params={"bound_to": 1})
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "No trains found for this line"
+
+
+def test_departure_times_with_invalid_bound_to_is_400(monkeypatch):
+    monkeypatch.setattr(scheduler, "get_db_connection", _connection((3,)))
+
+    response = TestClient(main.app).get("/scheduler/line/1/departure-times", params={"bound_to": 2})
+
+    assert response.status_code == 400
+
+
+def test_network_departure_times_reports_failed_line_and_continues(monkeypatch):
+    # (ID, route_shape, 열차 수, input_version)
+    monkeypatch.setattr(scheduler, "get_db_connection",
+                        _connection(all_rows=[(1, "ROUND-TRIP", 5, 0), (2, "ROUND-TRIP", 0, 0)]))
+    # 노선 1 은 입력이 잘못되어 계산 중 예외가 난다
+    monkeypatch.setattr(scheduler, "load_network_inputs",
+                        lambda cur, line_ids: {1: None, 2: build_line_inputs(2, [], [], [], [])})
+
+    response = TestClient(main.app).get("/scheduler/departure-times", params={"bound_to": 1})
+
+    assert response.status_code == 200
+    records = {record["line_id"]: record for record in map(json.loads, response.text.splitlines())}
+    assert records[1]["error"]["status_code"] == 500
+    assert records[2]["error"] == {"status_code": 404, "detail": "No trains found for this line"}
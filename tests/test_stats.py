@@ -0,0 +1,20 @@
+"""운영 지표 엔드포인트 접근 제어"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.mark.parametrize("path", [
+    "/stats/db-pool", "/stats/schedule-cache", "/stats/auth-cache",
+    "/stats/password-hasher", "/stats/slow-queries", "/stats/snapshot",
+])
+def test_stats_require_token(path):
+    assert TestClient(main.app).get(path).status_code in (401, 403)
+
+
+def test_metrics_stays_open_for_scrapers():
+    response = TestClient(main.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,44 @@
+"""timetable_store.rebuild_lines 실패 처리"""
+import logging
+from contextlib import contextmanager
+
+import timetable_store
+
+
+class RecordingCursor:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+
+class RecordingConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_failed_rebuild_is_logged_and_reset_to_stale(monkeypatch, caplog):
+    statements = []
+
+    @contextmanager
+    def get_db_connection(cursor=None):
+        yield RecordingConnection(), RecordingCursor(statements)
+
+    def rebuild_line(line_id):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(timetable_store, "get_db_connection", get_db_connection)
+    monkeypatch.setattr(timetable_store, "rebuild_line", rebuild_line)
+
+    with caplog.at_level(logging.ERROR, logger="timetable_store"):
+        timetable_store.rebuild_lines([7])
+
+    assert statements == [(
+        "UPDATE timetable_version SET status = %s, error = %s WHERE line_ID = %s AND status = %s",
+        (timetable_store.STATUS_STALE, "connection lost", 7, timetable_store.STATUS_BUILDING),
+    )]
+    assert any(record.exc_info and "line 7" in record.getMessage() for record in caplog.records)